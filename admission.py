@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Admission control for the Browser Launcher Pro native host.
+
+A stuck key or a runaway content script can send dozens of launch messages
+a second, and every one of them used to start a shell and a browser. Each
+message is now admitted before it is queued:
+
+- Token buckets per action and per launch target (browser or distro) refill
+  at a steady rate and allow a short burst; a message that finds a bucket
+  empty is rejected with the time after which it would be admitted.
+- The backlog of queued (not yet running) work is bounded, so a flood
+  cannot pile up behind the workers either.
+
+The extension sends most messages with sendNativeMessage, which starts a
+new host for each one, so a storm is spread over many short-lived hosts.
+The buckets and the count of requests in flight are therefore kept in a
+state file all hosts share (`AdmissionState.json`, updated under a file
+lock): work in flight in other hosts counts towards the backlog.
+
+Limits come from the `[Admission]` section of config.ini:
+
+  [Admission]
+  enabled = true
+  max_backlog = 64
+  target = 2/5
+  runCommand = 5/10
+  openInSandbox = 0.5/2
+
+`<action> = rate/burst` limits an action (rate in requests per second,
+`command` for legacy messages without an action), `target` limits each
+launch target, and `max_backlog` caps the queued work (0 means no cap).
+`state_file` names the shared state file; empty keeps the state in this
+host only.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional
+
+import psutil
+
+ADMISSION_SECTION = "Admission"
+# Legacy messages carry a command but no action
+LEGACY_ACTION = "command"
+
+DEFAULT_MAX_BACKLOG = 64
+# Seconds a caller rejected for a full backlog is asked to wait
+BACKLOG_RETRY_AFTER = 1.0
+ADMISSION_STATE_FILENAME = "AdmissionState.json"
+# Buckets untouched this long are full again and are dropped from the state file
+STATE_IDLE_SECONDS = 3600
+
+logger = logging.getLogger('BrowserLauncher')
+
+
+class Limit(NamedTuple):
+    """A token bucket rate (tokens per second) and burst (bucket size)."""
+    rate: float
+    burst: int
+
+
+DEFAULT_ACTION_LIMITS = {
+    LEGACY_ACTION: Limit(5.0, 10),
+    "runCommand": Limit(5.0, 10),
+    "openUrls": Limit(5.0, 10),
+    "openWithProfile": Limit(5.0, 10),
+    "openInSandbox": Limit(0.5, 2),
+    "executePowerShellScript": Limit(1.0, 3),
+}
+DEFAULT_TARGET_LIMIT = Limit(2.0, 5)
+
+
+class AdmissionConfigError(ValueError):
+    """Raised for an invalid limit in the [Admission] section."""
+
+
+def parse_limit(value: str) -> Limit:
+    """Parses `rate/burst` (e.g. `5/10`); a bare rate gets a burst of one second's worth."""
+    rate_text, _, burst_text = value.partition("/")
+    try:
+        rate = float(rate_text)
+        burst = int(burst_text) if burst_text.strip() else max(1, math.ceil(rate))
+    except ValueError:
+        raise AdmissionConfigError(f"Invalid limit {value!r}; expected rate/burst, e.g. 5/10")
+    if rate <= 0 or burst < 1:
+        raise AdmissionConfigError(f"Invalid limit {value!r}; rate and burst must be positive")
+    return Limit(rate, burst)
+
+
+class TokenBucket:
+    """A token bucket; not thread-safe on its own (the controller holds a lock)."""
+
+    def __init__(self, limit: Limit, clock: Callable[[], float] = time.time,
+                 state: Optional[Dict[str, float]] = None):
+        self.limit = limit
+        self._clock = clock
+        self._tokens = float(limit.burst)
+        self._updated = clock()
+        if state:
+            self._tokens = min(float(limit.burst), float(state.get("tokens", limit.burst)))
+            self._updated = float(state.get("updated", self._updated))
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is now)."""
+        now = self._clock()
+        # The clock is shared between hosts (wall time) and may step back
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.limit.burst, self._tokens + elapsed * self.limit.rate)
+        self._updated = now
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.limit.rate
+
+    def take(self) -> None:
+        self._tokens -= 1
+
+    def to_state(self) -> Dict[str, float]:
+        return {"tokens": self._tokens, "updated": self._updated}
+
+
+class SharedState:
+    """The admission state file shared by every host process, read and written under a file lock."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @contextmanager
+    def locked(self):
+        """Yields the state (a dict); changes are saved when the block exits without an error."""
+        with open(f"{self.path}.lock", "a+b") as handle:
+            if os.name == "nt":
+                import msvcrt
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                state = self._load()
+                yield state
+                self._save(state)
+            finally:
+                if os.name == "nt":
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        if not isinstance(state, dict):
+            state = {}
+        state.setdefault("buckets", {})
+        state.setdefault("inflight", {})
+        return state
+
+    def _save(self, state: Dict[str, Any]) -> None:
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.error(f"Error writing admission state {self.path}: {e}")
+
+
+class AdmissionController:
+    """Admits or rejects messages against per-action and per-target buckets and a backlog cap."""
+
+    def __init__(self, action_limits: Optional[Mapping[str, Limit]] = None,
+                 target_limit: Optional[Limit] = DEFAULT_TARGET_LIMIT,
+                 max_backlog: int = DEFAULT_MAX_BACKLOG, enabled: bool = True,
+                 clock: Callable[[], float] = time.time, state_path: Optional[str] = None):
+        """
+        Args:
+            clock: Wall clock for the buckets (shared between hosts, so not monotonic)
+            state_path: File shared with other hosts for the buckets and the
+                requests in flight; None keeps them in this host only
+        """
+        # Keyed case-insensitively, as configparser lower-cases option names
+        limits = DEFAULT_ACTION_LIMITS if action_limits is None else action_limits
+        self.action_limits = {name.lower(): limit for name, limit in limits.items()}
+        self.target_limit = target_limit
+        self.max_backlog = max_backlog
+        self.enabled = enabled
+        self.state_path = state_path
+        self._shared = SharedState(state_path) if state_path else None
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._admitted = 0
+        self._rejected = {"action": 0, "target": 0, "backlog": 0}
+        self._rejected_by_action: Dict[str, int] = {}
+        self._rejected_by_target: Dict[str, int] = {}
+
+    def admit(self, action: str, targets: Iterable[str] = (), backlog: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        Admits a message, taking a token from each of its buckets.
+
+        An admitted message counts as in flight for other hosts until
+        release() is called for it.
+
+        Args:
+            action: The message's action (LEGACY_ACTION for plain commands)
+            targets: Launch targets (worker pool resource keys) it touches
+            backlog: Work currently queued in this host and not yet running
+
+        Returns:
+            None if admitted, otherwise the error response to send, with
+            `retryAfterMs`
+        """
+        if not self.enabled:
+            return None
+        targets = list(targets)
+        with self._lock:
+            if self._shared is not None:
+                try:
+                    with self._shared.locked() as state:
+                        return self._admit(action, targets, backlog, state)
+                except OSError as e:
+                    logger.error(f"Admission state {self.state_path} unavailable, admitting in this host only: {e}")
+            return self._admit(action, targets, backlog, None)
+
+    def release(self) -> None:
+        """Records that a message admitted by this host has finished."""
+        if not self.enabled or self._shared is None:
+            return
+        pid = str(os.getpid())
+        with self._lock:
+            try:
+                with self._shared.locked() as state:
+                    count = state["inflight"].get(pid, 0) - 1
+                    if count > 0:
+                        state["inflight"][pid] = count
+                    else:
+                        state["inflight"].pop(pid, None)
+            except OSError as e:
+                logger.error(f"Admission state {self.state_path} unavailable: {e}")
+
+    def _admit(self, action: str, targets: List[str], backlog: int,
+               state: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        pid = str(os.getpid())
+        if state is not None:
+            # Hosts that exited (or crashed) no longer have anything in flight
+            state["inflight"] = {host: count for host, count in state["inflight"].items()
+                                 if count > 0 and (host == pid or psutil.pid_exists(int(host)))}
+            backlog += sum(count for host, count in state["inflight"].items() if host != pid)
+        if self.max_backlog and backlog >= self.max_backlog:
+            self._count_rejection("backlog", action, ())
+            return self._rejection(f"Host is busy: {backlog} requests queued", BACKLOG_RETRY_AFTER, "backlog")
+        buckets = []
+        action_limit = self.action_limits.get(action.lower())
+        if action_limit is not None:
+            key = f"action:{action.lower()}"
+            buckets.append(("action", action, key, self._bucket(key, action_limit, state)))
+        if self.target_limit is not None:
+            for target in targets:
+                key = f"target:{target}"
+                buckets.append(("target", target, key, self._bucket(key, self.target_limit, state)))
+        # Nothing is taken unless every bucket has a token, so a rejection costs nothing
+        waits = [(bucket.wait_time(), reason, name) for reason, name, _, bucket in buckets]
+        blocked = [wait for wait in waits if wait[0] > 0]
+        if blocked:
+            retry_after, reason, name = max(blocked)
+            self._count_rejection(reason, action, [name] if reason == "target" else ())
+            limit = action_limit if reason == "action" else self.target_limit
+            subject = action if reason == "action" else name
+            return self._rejection(f"Too many requests for {subject}: limited to {limit.rate:g}/s "
+                                   f"(burst {limit.burst})", retry_after, reason)
+        for _, _, key, bucket in buckets:
+            bucket.take()
+            if state is not None:
+                state["buckets"][key] = bucket.to_state()
+        if state is not None:
+            state["inflight"][pid] = state["inflight"].get(pid, 0) + 1
+            now = self._clock()
+            state["buckets"] = {key: bucket for key, bucket in state["buckets"].items()
+                                if now - bucket.get("updated", 0) < STATE_IDLE_SECONDS}
+        self._admitted += 1
+        return None
+
+    def _bucket(self, key: str, limit: Limit, state: Optional[Dict[str, Any]]) -> TokenBucket:
+        if state is not None:
+            return TokenBucket(limit, self._clock, state["buckets"].get(key))
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(limit, self._clock)
+        return bucket
+
+    def _count_rejection(self, reason: str, action: str, targets: Iterable[str]) -> None:
+        self._rejected[reason] += 1
+        self._rejected_by_action[action] = self._rejected_by_action.get(action, 0) + 1
+        for target in targets:
+            self._rejected_by_target[target] = self._rejected_by_target.get(target, 0) + 1
+
+    @staticmethod
+    def _rejection(error: str, retry_after: float, reason: str) -> Dict[str, Any]:
+        logger.debug(f"Rejected request: {error}")
+        # `result` too: the extension's command callbacks read response.result
+        return {"error": error, "result": f"Error: {error}", "throttled": True, "reason": reason,
+                "retryAfterMs": max(1, math.ceil(retry_after * 1000))}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "shared": self._shared is not None,
+                "maxBacklog": self.max_backlog,
+                "admitted": self._admitted,
+                "rejected": dict(self._rejected, total=sum(self._rejected.values())),
+                "rejectedByAction": dict(self._rejected_by_action),
+                "rejectedByTarget": dict(self._rejected_by_target),
+            }
+
+
+def admission_from_config(config) -> AdmissionController:
+    """Builds the controller from the [Admission] section; invalid entries are logged and skipped."""
+    action_limits = {name.lower(): limit for name, limit in DEFAULT_ACTION_LIMITS.items()}
+    target_limit = DEFAULT_TARGET_LIMIT
+    max_backlog = DEFAULT_MAX_BACKLOG
+    enabled = True
+    state_path = ADMISSION_STATE_FILENAME
+    if config.has_section(ADMISSION_SECTION):
+        section = config[ADMISSION_SECTION]
+        enabled = section.getboolean("enabled", fallback=True)
+        max_backlog = section.getint("max_backlog", fallback=DEFAULT_MAX_BACKLOG)
+        state_path = section.get("state_file", fallback=ADMISSION_STATE_FILENAME).strip()
+        for key, value in section.items():
+            if key in ("enabled", "max_backlog", "state_file") or key in config.defaults():
+                continue
+            try:
+                limit = parse_limit(value)
+            except AdmissionConfigError as e:
+                logger.error(f"[{ADMISSION_SECTION}] {key}: {e}")
+                continue
+            if key == "target":
+                target_limit = limit
+            else:
+                action_limits[key] = limit
+    return AdmissionController(action_limits, target_limit, max_backlog, enabled, state_path=state_path or None)
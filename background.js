@@ -1,3 +1,6 @@
+// Shared license key metadata decoder (legacy JSON and compact keys)
+importScripts('license-format.js');
+
 // Add this at the top of your file
 const searchConfig = {
   youtube: true,
@@ -1801,9 +1804,8 @@ async function extractAndVerifyLicenseMetadata(licenseKey) {
     
     // Decode and parse the metadata
     try {
-      // Decode base64 string to JSON
-      const decodedData = atob(metadataBase64);
-      const metadata = JSON.parse(decodedData);
+      // Decode the legacy base64 JSON or compact metadata
+      const metadata = decodeLicenseMetadata(keyPart, metadataBase64);
       
       // Verify the license key matches the hardware ID
       const targetHardwareId = metadata.hardwareId;
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the native messaging host bundles.
+
+Builds the one-file bundle (native_messaging.spec) and the fast-start onedir
+bundle (native_messaging_fast.spec) with PyInstaller, then spawns each one the
+way the browser does for sendNativeMessage: start the process, write one
+length-prefixed `ping` message and time until the reply has been read.
+
+Runs on Windows and Linux (PyInstaller must be installed):
+
+  python benchmark_startup.py [--runs 20] [--skip-build] [--python] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(REPO_DIR, "build", "startup-benchmark")
+DIST_DIR = os.path.join(BENCH_DIR, "dist")
+WORK_DIR = os.path.join(BENCH_DIR, "work")
+EXE_SUFFIX = ".exe" if os.name == "nt" else ""
+REPLY_TIMEOUT = 60
+
+VARIANTS = {
+    "onefile": ("native_messaging.spec", os.path.join(DIST_DIR, "native_messaging" + EXE_SUFFIX)),
+    "fast-start": ("native_messaging_fast.spec",
+                   os.path.join(DIST_DIR, "native_messaging_fast", "native_messaging_fast" + EXE_SUFFIX)),
+}
+
+
+def build(spec):
+    """Builds a spec into the benchmark dist directory."""
+    subprocess.run(
+        [sys.executable, "-m", "PyInstaller", "--noconfirm", "--log-level", "WARN",
+         "--distpath", DIST_DIR, "--workpath", WORK_DIR, spec],
+        cwd=REPO_DIR, check=True)
+
+
+def spawn_to_first_reply(argv, cwd):
+    """Spawns the host, sends a ping and returns the seconds until the reply was read."""
+    message = json.dumps({"action": "ping"}).encode("utf-8")
+    start = time.perf_counter()
+    process = subprocess.Popen(argv, cwd=cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL)
+    # A host that fails to start never answers; don't wait for it forever
+    timer = threading.Timer(REPLY_TIMEOUT, process.kill)
+    timer.start()
+    try:
+        process.stdin.write(struct.pack("@I", len(message)) + message)
+        process.stdin.flush()
+        header = process.stdout.read(4)
+        if len(header) != 4:
+            raise RuntimeError(f"Host exited without replying (exit code {process.wait()})")
+        reply = process.stdout.read(struct.unpack("@I", header)[0])
+        elapsed = time.perf_counter() - start
+        if b"pong" not in reply:
+            raise RuntimeError(f"Unexpected reply: {reply[:200]!r}")
+        return elapsed
+    finally:
+        timer.cancel()
+        # Closing stdin is how the browser ends a sendNativeMessage session
+        process.stdin.close()
+        try:
+            process.wait(timeout=REPLY_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "minMs": round(samples[0] * 1000, 1),
+        "medianMs": round(statistics.median(samples) * 1000, 1),
+        "p95Ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1),
+        "maxMs": round(samples[-1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Native host spawn-to-first-reply benchmark")
+    parser.add_argument("--runs", type=int, default=20, help="Spawns per variant")
+    parser.add_argument("--skip-build", action="store_true", help="Reuse the bundles from a previous run")
+    parser.add_argument("--python", action="store_true", help="Also time the unfrozen script as a baseline")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    variants = {name: [path] for name, (spec, path) in VARIANTS.items()}
+    if not args.skip_build:
+        for name, (spec, _) in VARIANTS.items():
+            print(f"Building {name} ({spec})...", file=sys.stderr)
+            build(spec)
+    if args.python:
+        variants["python"] = [sys.executable, os.path.join(REPO_DIR, "native_messaging.py")]
+
+    results = {}
+    # Each spawn runs in an empty directory, like a fresh install without config.ini
+    with tempfile.TemporaryDirectory() as cwd:
+        for name, argv in variants.items():
+            try:
+                # The first spawn warms the OS file cache and is not counted
+                spawn_to_first_reply(argv, cwd)
+                results[name] = summarize([spawn_to_first_reply(argv, cwd) for _ in range(args.runs)])
+            except (OSError, RuntimeError) as e:
+                results[name] = {"error": str(e)}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:<11} error: {result['error']}")
+        else:
+            print(f"{name:<11} median {result['medianMs']:>8} ms  p95 {result['p95Ms']:>8} ms  "
+                  f"min {result['minMs']:>8} ms  ({result['runs']} runs)")
+
+
+if __name__ == "__main__":
+    main()
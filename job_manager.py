@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Background job manager for the Browser Launcher Pro native messaging host.
+
+Long-running host operations (unregistering or reinstalling a WSL instance,
+installing browsers inside a distro) are submitted as jobs. A job is a named
+pipeline of steps that runs on its own worker thread, so the message handler
+can reply with a job ID immediately. Every state change is appended to an
+on-disk journal, which lets a later host process answer status queries for
+jobs started by an earlier one. Since each message may arrive in a new host
+process, cancelling a job owned by another host drops a marker file next to
+the journal, which the owning host polls for.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import psutil
+
+# Constants for the job journal
+JOB_JOURNAL_FILENAME = "BrowserLauncherJobs.journal"
+JOB_HISTORY_LIMIT = 100
+JOB_JOURNAL_COMPACT_LINES = 1000
+# How often the host running a job checks for cancel markers left by other hosts
+JOB_CANCEL_POLL_INTERVAL = 1.0
+
+# Job states
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+JOB_INTERRUPTED = "interrupted"
+
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED, JOB_INTERRUPTED)
+
+logger = logging.getLogger('BrowserLauncher')
+
+
+class JobStepError(Exception):
+    """Raised by a step to mark the job as failed."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested."""
+
+
+class Job:
+    """A single pipeline of steps tracked by the JobManager."""
+
+    def __init__(self, job_id: str, name: str, step_names: List[str],
+                 params: Optional[Dict[str, Any]] = None):
+        self.id = job_id
+        self.name = name
+        self.params = params or {}
+        self.steps = [{"name": step_name, "status": JOB_PENDING} for step_name in step_names]
+        self.status = JOB_PENDING
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.pid = os.getpid()
+        # Free-form progress a step reports while it runs (see JobManager.set_progress)
+        self.progress: Dict[str, Any] = {}
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self) -> None:
+        """Raise JobCancelled if cancellation has been requested."""
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "params": self.params,
+            "status": self.status,
+            "steps": [dict(step) for step in self.steps],
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "pid": self.pid,
+            "progress": self.progress,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Job":
+        job = cls(data["id"], data.get("name", ""), [], data.get("params"))
+        job.steps = [dict(step) for step in data.get("steps", [])]
+        job.status = data.get("status", JOB_PENDING)
+        job.error = data.get("error")
+        job.created = data.get("created", job.created)
+        job.started = data.get("started")
+        job.finished = data.get("finished")
+        job.pid = data.get("pid")
+        job.progress = data.get("progress") or {}
+        return job
+
+
+class JobManager:
+    """Runs step pipelines on worker threads and journals their progress."""
+
+    def __init__(self, journal_path: str = JOB_JOURNAL_FILENAME,
+                 history_limit: int = JOB_HISTORY_LIMIT):
+        self.journal_path = journal_path
+        self.history_limit = history_limit
+        self._lock = threading.RLock()
+        self._jobs: Dict[str, Job] = {}
+        self._journal_lines = 0
+        self._cancel_watcher: Optional[threading.Thread] = None
+        self._load_journal()
+
+    # ------------------------------------------------------------------
+    # Journal handling
+    # ------------------------------------------------------------------
+    def _load_journal(self) -> None:
+        """Replays the journal and marks jobs orphaned by a dead host as interrupted."""
+        if not os.path.exists(self.journal_path):
+            return
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    self._journal_lines += 1
+                    try:
+                        record = json.loads(line)
+                        self._jobs[record["id"]] = Job.from_dict(record)
+                    except (ValueError, KeyError) as e:
+                        logger.warning(f"Skipping corrupt job journal entry: {e}")
+        except OSError as e:
+            logger.error(f"Error reading job journal {self.journal_path}: {e}")
+            return
+
+        interrupted = False
+        for job in self._jobs.values():
+            # Another host process may still be running the job
+            if job.status not in FINISHED_STATES and not (job.pid and psutil.pid_exists(job.pid)):
+                interrupted = True
+                job.status = JOB_INTERRUPTED
+                job.error = "Host process exited before the job finished"
+                job.finished = job.finished or time.time()
+                for step in job.steps:
+                    if step["status"] == JOB_RUNNING:
+                        step["status"] = JOB_INTERRUPTED
+                try:
+                    os.remove(self._cancel_marker(job.id))
+                except OSError:
+                    pass
+                logger.warning(f"Job {job.id} ({job.name}) marked as interrupted")
+        if interrupted or self._journal_lines > JOB_JOURNAL_COMPACT_LINES:
+            self._compact_journal()
+
+    def _write_record(self, job: Job) -> None:
+        """Appends the current state of a job to the journal."""
+        try:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(job.to_dict()) + "\n")
+            self._journal_lines += 1
+        except OSError as e:
+            logger.error(f"Error writing job journal {self.journal_path}: {e}")
+            return
+        if self._journal_lines > JOB_JOURNAL_COMPACT_LINES:
+            self._compact_journal()
+
+    def _compact_journal(self) -> None:
+        """Rewrites the journal with one line per retained job."""
+        finished = sorted(
+            (job for job in self._jobs.values() if job.status in FINISHED_STATES),
+            key=lambda job: job.created,
+        )
+        for job in finished[:max(0, len(finished) - self.history_limit)]:
+            del self._jobs[job.id]
+
+        temp_path = f"{self.journal_path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for job in sorted(self._jobs.values(), key=lambda job: job.created):
+                    f.write(json.dumps(job.to_dict()) + "\n")
+            os.replace(temp_path, self.journal_path)
+            self._journal_lines = len(self._jobs)
+        except OSError as e:
+            logger.error(f"Error compacting job journal {self.journal_path}: {e}")
+
+    def _cancel_marker(self, job_id: str) -> str:
+        return f"{self.journal_path}.{job_id}.cancel"
+
+    def _owned_unfinished(self) -> List[Job]:
+        pid = os.getpid()
+        return [job for job in self._jobs.values() if job.pid == pid and job.status not in FINISHED_STATES]
+
+    def _start_cancel_watcher(self) -> None:
+        """Starts the thread that turns other hosts' cancel markers into cancel_event."""
+        with self._lock:
+            if self._cancel_watcher is not None and self._cancel_watcher.is_alive():
+                return
+            self._cancel_watcher = threading.Thread(
+                target=self._watch_cancel_markers, name="job-cancel-watcher", daemon=True)
+            self._cancel_watcher.start()
+
+    def _watch_cancel_markers(self) -> None:
+        while True:
+            with self._lock:
+                jobs = self._owned_unfinished()
+                if not jobs:
+                    self._cancel_watcher = None
+                    return
+            for job in jobs:
+                if not job.cancel_event.is_set() and os.path.exists(self._cancel_marker(job.id)):
+                    logger.info(f"Job {job.id} cancelled by another host process")
+                    job.cancel_event.set()
+            time.sleep(JOB_CANCEL_POLL_INTERVAL)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def submit(self, name: str, steps: List[Tuple[str, Callable[[Job], Any]]],
+               params: Optional[Dict[str, Any]] = None,
+               runner: Optional[Callable[[Callable[[], None]], Any]] = None) -> str:
+        """
+        Starts a new job and returns its ID without waiting for it.
+
+        Args:
+            name: Short job name, e.g. 'reinstateWSLInstance'
+            steps: Ordered (step name, callable) pairs. Each callable receives
+                the Job and may raise JobStepError to fail the pipeline.
+            params: Parameters recorded with the job for display
+            runner: Optional callable that schedules the job body, e.g. on a
+                worker pool. Defaults to a dedicated thread.
+
+        Returns:
+            The new job ID
+        """
+        job = Job(uuid.uuid4().hex[:12], name, [step_name for step_name, _ in steps], params)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._write_record(job)
+
+        if runner is not None:
+            runner(lambda: self._run(job, steps))
+        else:
+            # Non-daemon on purpose: a job keeps the host alive after the
+            # extension closes stdin so the pipeline is not cut off half way.
+            threading.Thread(
+                target=self._run, args=(job, steps), name=f"job-{job.id}", daemon=False
+            ).start()
+        self._start_cancel_watcher()
+        logger.info(f"Started job {job.id} ({name}) with {len(steps)} steps")
+        return job.id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Returns a snapshot of a job or None if it is unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def list(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Returns snapshots of all known jobs, newest first."""
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda job: job.created, reverse=True)
+            return [job.to_dict() for job in jobs if status is None or job.status == status]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Requests cancellation of a job.
+
+        The running step is allowed to return; remaining steps are skipped.
+        A job owned by another host process is signalled through a marker
+        file that its host picks up within JOB_CANCEL_POLL_INTERVAL.
+        Returns False if the job is unknown or already finished.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return False
+            if job.pid != os.getpid():
+                try:
+                    with open(self._cancel_marker(job_id), 'w', encoding='utf-8') as f:
+                        f.write(str(os.getpid()))
+                except OSError as e:
+                    logger.error(f"Error requesting cancellation of job {job_id}: {e}")
+                    return False
+                logger.info(f"Cancellation of job {job_id} requested from host {job.pid}")
+                return True
+            job.cancel_event.set()
+            if job.status == JOB_PENDING:
+                self._finish(job, JOB_CANCELLED, "Cancelled before start")
+        logger.info(f"Cancellation requested for job {job_id}")
+        return True
+
+    def set_progress(self, job: Job, progress: Dict[str, Any]) -> None:
+        """
+        Replaces a running job's progress and journals it, since status
+        queries are answered by other host processes. Every call appends a
+        journal line, so callers throttle their reports (WSLBrowserUpdater
+        reports at most every PROGRESS_INTERVAL).
+        """
+        with self._lock:
+            job.progress = progress
+            self._write_record(job)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Blocks until a job started by this process finishes, then returns it."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None and job.pid == os.getpid():
+            job.done_event.wait(timeout)
+        return self.get(job_id)
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    def _finish(self, job: Job, status: str, error: Optional[str] = None) -> None:
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        for step in job.steps:
+            if step["status"] == JOB_PENDING and status != JOB_SUCCEEDED:
+                step["status"] = JOB_CANCELLED if status == JOB_CANCELLED else "skipped"
+        self._write_record(job)
+        try:
+            os.remove(self._cancel_marker(job.id))
+        except OSError:
+            pass
+        job.done_event.set()
+
+    def _run(self, job: Job, steps: List[Tuple[str, Callable[[Job], Any]]]) -> None:
+        with self._lock:
+            if job.status != JOB_PENDING:
+                return
+            job.status = JOB_RUNNING
+            job.started = time.time()
+            self._write_record(job)
+
+        for index, (step_name, step) in enumerate(steps):
+            record = job.steps[index]
+            try:
+                job.check_cancelled()
+                with self._lock:
+                    record["status"] = JOB_RUNNING
+                    record["started"] = time.time()
+                    self._write_record(job)
+
+                output = step(job)
+
+                with self._lock:
+                    record["status"] = JOB_SUCCEEDED
+                    record["finished"] = time.time()
+                    if output is not None:
+                        record["output"] = str(output)[:2000]
+                    self._write_record(job)
+            except JobCancelled as e:
+                with self._lock:
+                    if record["status"] == JOB_RUNNING:
+                        record["status"] = JOB_CANCELLED
+                    self._finish(job, JOB_CANCELLED, str(e))
+                logger.info(f"Job {job.id} cancelled during step '{step_name}'")
+                return
+            except Exception as e:
+                with self._lock:
+                    record["status"] = JOB_FAILED
+                    record["finished"] = time.time()
+                    record["error"] = str(e)
+                    self._finish(job, JOB_FAILED, f"Step '{step_name}' failed: {e}")
+                logger.error(f"Job {job.id} failed in step '{step_name}': {e}")
+                return
+
+        with self._lock:
+            self._finish(job, JOB_SUCCEEDED)
+        logger.info(f"Job {job.id} ({job.name}) finished with status {job.status}")
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+End-to-end launch latency for the Browser Launcher Pro native host.
+
+How long run_command_with_url() takes says little about what the user sees:
+a first launch blocks until its timeout while the browser is long up, and a
+hand-off to a running browser returns before the new tab exists. Each launch
+is now timed from the moment its message was received until a process of
+the target browser appears:
+
+- local and direct launches: a process with one of the browser's image
+  names, started after the message arrived, found through psutil (the
+  host's own process tree first, then every process, as `start` and browser
+  stubs hand the work to processes outside the tree);
+- WSL launches on Windows: the browser runs inside the distro, where psutil
+  cannot see it, so one `wsl -d <distro>` probe waits there with pgrep for
+  one started after the message arrived;
+- Windows Sandbox: the sandbox's own processes.
+
+The watch runs next to the launch and gives up after a bounded window. Once
+the launch has returned, its reply waits at most REPLY_WAIT seconds for the
+measurement (reporting "pending" after that), so a browser that never shows
+up does not hold the reply for the whole window. Latencies are kept per
+launch kind and browser as histograms (`launch_latency.snapshot()`), and
+every launch reply carries its measurement and its target's histogram.
+"""
+
+import functools
+import logging
+import math
+import os
+import re
+import subprocess
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import psutil
+
+from platform_backend import strip_wsl_prefix
+from process_tree import ConfinedPopen, kill_tree
+
+# Launch kinds
+KIND_LOCAL = "local"
+KIND_WSL = "wsl"
+KIND_SANDBOX = "sandbox"
+
+# Seconds to watch for the browser process, per launch kind
+DEFAULT_WATCH_WINDOWS = {KIND_LOCAL: 15.0, KIND_WSL: 30.0, KIND_SANDBOX: 60.0}
+POLL_INTERVAL = 0.05
+# Seconds a launch reply waits for its browser to appear once the launch returned
+REPLY_WAIT = 5.0
+# A process started this long before the message arrived still counts as
+# started by it (create times are rounded to clock ticks on Linux)
+CREATE_TIME_SLACK = 0.25
+
+# Histogram bucket upper bounds in ms; slower launches land in "+Inf"
+BUCKET_BOUNDS_MS = (100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+# Outcomes of a watch
+OUTCOME_STARTED = "started"
+OUTCOME_NOT_SEEN = "notSeen"
+OUTCOME_FAILED = "failed"
+# Still being watched when the launch replied
+OUTCOME_PENDING = "pending"
+
+# Launcher names whose browser process has another name
+BROWSER_IMAGES = {
+    "google-chrome": ("chrome",),
+    "google-chrome-stable": ("chrome",),
+    "google-chrome-beta": ("chrome",),
+    "google-chrome-unstable": ("chrome",),
+    "microsoft-edge": ("msedge",),
+    "microsoft-edge-stable": ("msedge",),
+    "microsoft-edge-beta": ("msedge",),
+    "microsoft-edge-dev": ("msedge",),
+    "brave-browser": ("brave",),
+    "chromium-browser": ("chromium", "chromium-browser"),
+    "firefox": ("firefox", "firefox-bin"),
+}
+SANDBOX_IMAGES = ("windowssandbox.exe", "windowssandboxclient.exe")
+
+# When the current message was received (time.time()); set when it is queued
+message_received_at: ContextVar[Optional[float]] = ContextVar("message_received_at", default=None)
+
+logger = logging.getLogger('BrowserLauncher')
+
+
+class LaunchTarget(NamedTuple):
+    """What a launch command starts: its kind, browser and the image names to look for."""
+    kind: str
+    browser: str
+    images: Tuple[str, ...]
+    distro: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind}:{self.browser}"
+
+
+_PROGRAM = re.compile(r'^\s*(?:"([^"]+)"|(\S+))')
+
+
+def browser_images(program: str) -> Tuple[str, ...]:
+    """Returns the lower-cased process names a browser program runs as."""
+    name = re.split(r"[\\/]", program)[-1].lower()
+    stem = name[:-4] if name.endswith(".exe") else name
+    images = BROWSER_IMAGES.get(stem, (stem,))
+    return tuple(dict.fromkeys([name] + [image for stem in images for image in (stem, f"{stem}.exe")]))
+
+
+def wsl_program_args(wsl_args: str) -> List[str]:
+    """Returns the program and its arguments from what follows the distro, skipping `-u <user>` and `--`."""
+    return strip_wsl_prefix(["wsl"] + wsl_args.split())
+
+
+def classify_launch(command: str, distro: Optional[str] = None, wsl_args: str = "") -> Optional[LaunchTarget]:
+    """
+    Returns the target of a launch command, or None for commands that start
+    no browser (runas, PowerShell, empty commands).
+
+    Args:
+        command: The browser command as the extension sends it
+        distro: The WSL distro of a `wsl -d <distro> ...` command
+        wsl_args: What follows the distro in that command
+    """
+    stripped = command.strip()
+    if stripped.lower() == "windowssandbox":
+        return LaunchTarget(KIND_SANDBOX, "windowssandbox", SANDBOX_IMAGES)
+    if distro:
+        args = wsl_program_args(wsl_args)
+        if not args:
+            return None
+        images = browser_images(args[0])
+        return LaunchTarget(KIND_WSL, f"{distro.lower()}/{images[0]}", images, distro)
+    if stripped.lower().startswith(("runas", "cmd /c start powershell.exe")):
+        return None
+    match = _PROGRAM.match(stripped)
+    if not match:
+        return None
+    images = browser_images(match.group(1) or match.group(2))
+    return LaunchTarget(KIND_LOCAL, images[0], images)
+
+
+@functools.lru_cache(maxsize=None)
+def create_time_offset() -> float:
+    """
+    Seconds to add to psutil create times to compare them with time.time().
+
+    On Linux psutil counts from the boot time in /proc/stat, which is whole
+    seconds, so its create times run up to a second early; /proc/uptime
+    gives the boot time to the hundredth.
+    """
+    try:
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return 0.0
+    return (time.time() - uptime) - psutil.boot_time()
+
+
+def find_new_process(images: Sequence[str], since: float) -> Optional[float]:
+    """Returns when the earliest process named like one of images started after since (epoch seconds)."""
+    images = {image.lower() for image in images}
+    since -= create_time_offset()
+    try:
+        # The host's own tree first: cheaper, and it holds most direct launches
+        children = psutil.Process().children(recursive=True)
+    except psutil.Error:
+        children = []
+    for candidates in (children, psutil.process_iter()):
+        found = []
+        for proc in candidates:
+            try:
+                if proc.name().lower() in images:
+                    created = proc.create_time()
+                    if created >= since - CREATE_TIME_SLACK:
+                        found.append(created)
+            except psutil.Error:
+                pass
+        if found:
+            return min(found) + create_time_offset()
+    return None
+
+
+def watch_local(target: LaunchTarget, since: float, deadline: float, stop: threading.Event) -> Optional[float]:
+    """Polls psutil until the browser appears; returns when it started (epoch seconds)."""
+    while True:
+        created = find_new_process(target.images, since)
+        if created is not None:
+            return max(created, since)
+        if stop.wait(max(0.0, min(POLL_INTERVAL, deadline - time.monotonic()))) or time.monotonic() >= deadline:
+            return None
+
+
+# Runs in the distro: waits until a process named like one of its arguments
+# starts, at most $1 seconds before the script itself (etimes is whole seconds,
+# hence the extra second); browsers already running do not count
+WSL_WAIT_SCRIPT = (
+    'elapsed=$1; shift; '
+    'while :; do for name; do '
+    'pid=$(pgrep -n -x "$name") && age=$(ps -o etimes= -p "$pid") && [ -n "$age" ] '
+    '&& [ $((age)) -le $(($(ps -o etimes= -p $$) + elapsed + 1)) ] && exit 0; '
+    'done; sleep 0.05; done'
+)
+
+
+def wsl_watch_argv(wsl_executable: str, target: LaunchTarget, elapsed: float = 0.0) -> List[str]:
+    """Returns the probe command; elapsed is how long ago the message was received, in seconds."""
+    # pgrep matches the 15-character kernel name, without .exe
+    names = [image[:15] for image in target.images if not image.endswith(".exe")]
+    return [wsl_executable, "-d", target.distro, "--", "sh", "-c", WSL_WAIT_SCRIPT, "sh",
+            str(max(0, math.ceil(elapsed)))] + names
+
+
+def make_wsl_watcher(wsl_executable: str = "wsl") -> Callable[..., Optional[float]]:
+    """Returns a watcher that waits for the browser inside its distro with a single wsl.exe probe."""
+    def watch_wsl(target: LaunchTarget, since: float, deadline: float, stop: threading.Event) -> Optional[float]:
+        kwargs = {"creationflags": subprocess.CREATE_NO_WINDOW} if os.name == "nt" else {}
+        try:
+            process = ConfinedPopen(wsl_watch_argv(wsl_executable, target, time.time() - since), stdin=subprocess.DEVNULL,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **kwargs)
+        except OSError as e:
+            logger.debug(f"Could not watch for {target.browser}: {e}")
+            return None
+        try:
+            while process.poll() is None:
+                if stop.wait(max(0.0, min(POLL_INTERVAL, deadline - time.monotonic()))) \
+                        or time.monotonic() >= deadline:
+                    return None
+            # Seen when the probe returned: includes the probe's own exit, not its start
+            return time.time() if process.returncode == 0 else None
+        finally:
+            if process.poll() is None:
+                kill_tree(process)
+    return watch_wsl
+
+
+class LatencyHistogram:
+    """Launch latencies of one target; not thread-safe on its own (the tracker holds a lock)."""
+
+    def __init__(self, bounds: Sequence[int] = BUCKET_BOUNDS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total_ms = 0.0
+        self.min_ms: Optional[float] = None
+        self.max_ms: Optional[float] = None
+        self.not_seen = 0
+        self.failed = 0
+
+    def add(self, ms: float) -> None:
+        index = next((i for i, bound in enumerate(self.bounds) if ms <= bound), len(self.bounds))
+        self.counts[index] += 1
+        self.total_ms += ms
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+        self.max_ms = ms if self.max_ms is None else max(self.max_ms, ms)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Estimates a percentile as the upper bound of its bucket, within the observed min and max."""
+        count = sum(self.counts)
+        if not count:
+            return None
+        rank = fraction * count
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if bucket and seen >= rank:
+                bound = self.bounds[index] if index < len(self.bounds) else self.max_ms
+                return max(self.min_ms, min(float(bound), self.max_ms))
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        count = sum(self.counts)
+        labels = [str(bound) for bound in self.bounds] + ["+Inf"]
+        return {
+            "count": count,
+            "notSeen": self.not_seen,
+            "failed": self.failed,
+            "minMs": _round(self.min_ms),
+            "avgMs": round(self.total_ms / count, 1) if count else None,
+            "maxMs": _round(self.max_ms),
+            "p50Ms": _round(self.percentile(0.5)),
+            "p95Ms": _round(self.percentile(0.95)),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+class LaunchWatch:
+    """Watches for one launch's browser process in a background thread, which records the outcome."""
+
+    def __init__(self, tracker: "LaunchLatencyTracker", target: LaunchTarget, since: float, window: float,
+                 watcher: Callable[..., Optional[float]]):
+        self.tracker = tracker
+        self.target = target
+        self.since = since
+        self.window = window
+        self.result: Optional[Dict[str, Any]] = None
+        self._deadline = time.monotonic() + window
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._failed = False
+        self._thread = threading.Thread(target=self._run, args=(watcher,), name="launch-watch", daemon=True)
+        self._thread.start()
+
+    def _run(self, watcher) -> None:
+        seen_at = None
+        try:
+            seen_at = watcher(self.target, self.since, self._deadline, self._stop)
+        except Exception as e:
+            logger.debug(f"Launch watch for {self.target.key} failed: {e}")
+        if self._failed:
+            outcome, ms = OUTCOME_FAILED, None
+        elif seen_at is None:
+            outcome, ms = OUTCOME_NOT_SEEN, None
+        else:
+            outcome, ms = OUTCOME_STARTED, round((seen_at - self.since) * 1000, 1)
+        histogram = self.tracker.record(self.target, outcome, ms)
+        logger.debug(f"Launch of {self.target.key}: {outcome}" + (f" after {ms} ms" if ms is not None else ""))
+        self.result = self._describe(outcome, ms, histogram)
+        self._done.set()
+
+    def finish(self, failed: bool = False, wait: float = REPLY_WAIT) -> Dict[str, Any]:
+        """
+        Returns the measurement and the target's histogram for the launch
+        reply, waiting up to wait seconds for the browser to appear. A failed
+        launch ends the watch right away.
+
+        A watch still running after wait is reported as pending; it goes on
+        until its window closes and lands in the histogram then.
+        """
+        if failed:
+            self._failed = True
+            self._stop.set()
+        if self._done.wait(wait):
+            return self.result
+        return self._describe(OUTCOME_PENDING, None, self.tracker.histogram(self.target))
+
+    def _describe(self, outcome: str, ms: Optional[float], histogram: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"kind": self.target.kind, "browser": self.target.browser, "outcome": outcome, "ms": ms,
+                "windowMs": round(self.window * 1000), "histogram": histogram}
+
+
+class LaunchLatencyTracker:
+    """Thread-safe launch latency histograms per launch kind and browser."""
+
+    def __init__(self, windows: Optional[Dict[str, float]] = None):
+        self.windows = dict(DEFAULT_WATCH_WINDOWS, **(windows or {}))
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._started = time.time()
+
+    def watch(self, target: LaunchTarget, since: Optional[float] = None,
+              watcher: Callable[..., Optional[float]] = watch_local) -> LaunchWatch:
+        """Starts watching for a launch's browser; since defaults to now."""
+        return LaunchWatch(self, target, since if since is not None else time.time(),
+                           self.windows.get(target.kind, DEFAULT_WATCH_WINDOWS[KIND_LOCAL]), watcher)
+
+    def record(self, target: LaunchTarget, outcome: str, ms: Optional[float]) -> Dict[str, Any]:
+        """Records one launch and returns its target's histogram."""
+        with self._lock:
+            histogram = self._histograms.get(target.key)
+            if histogram is None:
+                histogram = self._histograms[target.key] = LatencyHistogram()
+            if outcome == OUTCOME_STARTED:
+                histogram.add(ms)
+            elif outcome == OUTCOME_FAILED:
+                histogram.failed += 1
+            else:
+                histogram.not_seen += 1
+            return histogram.snapshot()
+
+    def histogram(self, target: LaunchTarget) -> Optional[Dict[str, Any]]:
+        """Returns a target's histogram, or None before its first launch was recorded."""
+        with self._lock:
+            histogram = self._histograms.get(target.key)
+            return histogram.snapshot() if histogram is not None else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the histograms by kind, then browser."""
+        with self._lock:
+            by_kind: Dict[str, Dict[str, Any]] = {}
+            for key, histogram in self._histograms.items():
+                kind, _, browser = key.partition(":")
+                by_kind.setdefault(kind, {})[browser] = histogram.snapshot()
+            return {"since": round(self._started, 3), "bucketBoundsMs": list(BUCKET_BOUNDS_MS), "byKind": by_kind}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._started = time.time()
+
+
+launch_latency = LaunchLatencyTracker()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Named launch profiles for the Browser Launcher Pro native host.
+
+A profile describes how a browser takes URLs, so a launch no longer has to
+re-derive that from the command string on every click. Profiles are read
+from `[LaunchProfile:<name>]` sections in config.ini and compiled once at
+startup into immutable argv templates; a launch is then a dictionary lookup
+plus joining the URLs into the template.
+
+  [LaunchProfile:ubuntu-chrome]
+  executable = wsl
+  args = -d Ubuntu google-chrome
+  flags = --no-sandbox
+  timeout = 30
+
+  [LaunchProfile:ubuntu-firefox]
+  executable = wsl
+  args = -d Ubuntu firefox
+  url_flag = -new-tab
+
+  [LaunchProfile:chrome-work]
+  executable = %ProgramFiles%\\Google\\Chrome\\Application\\chrome.exe
+  args = --profile-directory="Profile 1" {urls} --new-window
+
+Keys:
+  executable   Program to run (environment variables are expanded)
+  args         Arguments; `{urls}` marks where the URLs go (default: at the end)
+  flags        Extra flags placed before the URLs (e.g. --no-sandbox)
+  url_flag     Flag repeated before every URL (e.g. -new-tab for Firefox)
+  url_placement  `args` (default) or `none` for programs that take no URLs
+  timeout      Seconds to wait for the launcher process (default 30)
+"""
+
+import logging
+import os
+import shlex
+import subprocess
+from types import MappingProxyType
+from typing import List, Mapping, NamedTuple, Sequence, Tuple
+
+LAUNCH_PROFILE_SECTION_PREFIX = "LaunchProfile:"
+URLS_PLACEHOLDER = "{urls}"
+DEFAULT_LAUNCH_TIMEOUT = 30
+URL_PLACEMENTS = ("args", "none")
+
+logger = logging.getLogger('BrowserLauncher')
+
+
+class LaunchProfileError(ValueError):
+    """Raised for an invalid launch profile definition."""
+
+
+class LaunchProfile(NamedTuple):
+    """A compiled, immutable launch template."""
+    name: str
+    prefix: Tuple[str, ...]
+    suffix: Tuple[str, ...]
+    url_flag: str
+    accepts_urls: bool
+    timeout: float
+    # The command line without URLs (used for logging and resource keys)
+    command: str
+
+    def build_argv(self, urls: Sequence[str]) -> List[str]:
+        """Returns the argv that opens the URLs with this profile."""
+        if not self.accepts_urls:
+            return list(self.prefix + self.suffix)
+        argv = list(self.prefix)
+        for url in urls:
+            if self.url_flag:
+                argv.append(self.url_flag)
+            argv.append(url)
+        argv.extend(self.suffix)
+        return argv
+
+
+def split_arguments(value: str) -> List[str]:
+    """Splits an argument string; quotes group words, backslashes stay literal (Windows paths)."""
+    lexer = shlex.shlex(value, posix=True)
+    lexer.whitespace_split = True
+    lexer.escape = ""
+    lexer.commenters = ""
+    return list(lexer)
+
+
+def compile_launch_profile(name: str, section: Mapping[str, str]) -> LaunchProfile:
+    """Compiles one profile definition; raises LaunchProfileError if it is invalid."""
+    executable = os.path.expandvars(section.get("executable", "").strip())
+    if not executable:
+        raise LaunchProfileError(f"Launch profile '{name}' has no executable")
+    try:
+        args = split_arguments(section.get("args", ""))
+        flags = split_arguments(section.get("flags", ""))
+        url_flag = split_arguments(section.get("url_flag", ""))
+    except ValueError as e:
+        raise LaunchProfileError(f"Launch profile '{name}': {e}")
+    if len(url_flag) > 1:
+        raise LaunchProfileError(f"Launch profile '{name}': url_flag must be a single flag")
+    placement = section.get("url_placement", "args").strip().lower()
+    if placement not in URL_PLACEMENTS:
+        raise LaunchProfileError(f"Launch profile '{name}': url_placement must be one of {URL_PLACEMENTS}")
+    try:
+        timeout = float(section.get("timeout", DEFAULT_LAUNCH_TIMEOUT))
+    except ValueError:
+        raise LaunchProfileError(f"Launch profile '{name}': timeout must be a number")
+    if timeout <= 0:
+        raise LaunchProfileError(f"Launch profile '{name}': timeout must be positive")
+
+    if args.count(URLS_PLACEHOLDER) > 1:
+        raise LaunchProfileError(f"Launch profile '{name}': {URLS_PLACEHOLDER} may appear only once")
+    if URLS_PLACEHOLDER in args:
+        index = args.index(URLS_PLACEHOLDER)
+        before, after = args[:index], args[index + 1:]
+    else:
+        before, after = args, []
+    prefix = tuple([executable] + before + flags)
+    return LaunchProfile(
+        name=name,
+        prefix=prefix,
+        suffix=tuple(after),
+        url_flag=url_flag[0] if url_flag else "",
+        accepts_urls=placement == "args",
+        timeout=timeout,
+        command=subprocess.list2cmdline(prefix + tuple(after)),
+    )
+
+
+def compile_launch_profiles(config) -> Mapping[str, LaunchProfile]:
+    """
+    Compiles every `[LaunchProfile:<name>]` section of a ConfigParser.
+
+    Values are read raw, so `%ProgramFiles%` style variables need no escaping.
+    Invalid profiles are logged and left out. Returns a read-only mapping.
+    """
+    profiles = {}
+    for section in config.sections():
+        if not section.startswith(LAUNCH_PROFILE_SECTION_PREFIX):
+            continue
+        name = section[len(LAUNCH_PROFILE_SECTION_PREFIX):].strip()
+        try:
+            profiles[name] = compile_launch_profile(name, dict(config.items(section, raw=True)))
+        except LaunchProfileError as e:
+            logger.error(str(e))
+    return MappingProxyType(profiles)
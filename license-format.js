@@ -0,0 +1,112 @@
+/**
+ * License key metadata decoder.
+ *
+ * Mirrors decode_license_key() in license_format.py: the part after '#' is
+ * either base64 JSON (legacy keys) or unpadded base64url of the compact
+ * binary record (version 1):
+ *
+ *   version:u8 flags:u8 hwlen:u8 hardware-id purchase:u16 [expiry:u16]
+ *   namelen:u8 name emaillen:u8 email [crc32:u32]
+ *
+ * Either way the metadata is returned with the legacy field names.
+ */
+
+const LICENSE_COMPACT_VERSION = 1;
+const LICENSE_FLAG_SUBSCRIPTION = 0x01;
+const LICENSE_FLAG_EXPIRY = 0x02;
+const LICENSE_FLAG_HEX_HARDWARE_ID = 0x04;
+const LICENSE_FLAG_CHECKSUM = 0x08;
+const LICENSE_DATE_EPOCH = Date.UTC(2000, 0, 1);
+const LICENSE_SALT_LENGTH = 5;
+
+let licenseCrcTable = null;
+
+/**
+ * CRC32 (IEEE), as computed by Python's zlib.crc32
+ */
+function licenseCrc32(bytes) {
+  if (!licenseCrcTable) {
+    licenseCrcTable = new Uint32Array(256);
+    for (let n = 0; n < 256; n++) {
+      let c = n;
+      for (let k = 0; k < 8; k++) {
+        c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+      }
+      licenseCrcTable[n] = c >>> 0;
+    }
+  }
+  let crc = 0xFFFFFFFF;
+  for (const byte of bytes) {
+    crc = licenseCrcTable[(crc ^ byte) & 0xFF] ^ (crc >>> 8);
+  }
+  return (crc ^ 0xFFFFFFFF) >>> 0;
+}
+
+/**
+ * Decodes the metadata of a license key
+ * @param {string} keyPart - The part of the key before '#'
+ * @param {string} payload - The part of the key after '#'
+ * @returns {Object} Metadata (name, email, hardwareId, licenseType, purchaseDate, expiryDate, salt)
+ * @throws {Error} If the metadata cannot be decoded
+ */
+function decodeLicenseMetadata(keyPart, payload) {
+  const base64 = payload.replace(/-/g, '+').replace(/_/g, '/');
+  const binary = atob(base64 + '='.repeat((4 - base64.length % 4) % 4));
+  const bytes = Uint8Array.from(binary, ch => ch.charCodeAt(0));
+  const decoder = new TextDecoder('utf-8', { fatal: true });
+
+  if (binary.charAt(0) === '{') {
+    return JSON.parse(decoder.decode(bytes));
+  }
+  if (bytes[0] !== LICENSE_COMPACT_VERSION) {
+    throw new Error('Unsupported license key version');
+  }
+
+  const view = new DataView(bytes.buffer);
+  const flags = bytes[1];
+  const hardwareLength = bytes[2];
+  let offset = 3;
+  const readBytes = length => {
+    if (offset + length > bytes.length) {
+      throw new Error('Truncated license key data');
+    }
+    const value = bytes.subarray(offset, offset + length);
+    offset += length;
+    return value;
+  };
+  const readDate = () => {
+    const days = view.getUint16(readBytes(2).byteOffset);
+    return new Date(LICENSE_DATE_EPOCH + days * 86400000).toISOString().slice(0, 10);
+  };
+
+  const hardwareBytes = readBytes(hardwareLength);
+  const metadata = {};
+  metadata.purchaseDate = readDate();
+  const expiryDate = flags & LICENSE_FLAG_EXPIRY ? readDate() : null;
+  metadata.name = decoder.decode(readBytes(readBytes(1)[0]));
+  metadata.email = decoder.decode(readBytes(readBytes(1)[0]));
+
+  if (flags & LICENSE_FLAG_CHECKSUM) {
+    const signed = new Uint8Array([
+      ...new TextEncoder().encode(keyPart.replace(/-/g, '')),
+      ...bytes.subarray(0, offset)
+    ]);
+    const checksum = view.getUint32(readBytes(4).byteOffset);
+    if (checksum !== licenseCrc32(signed)) {
+      throw new Error('License key checksum mismatch');
+    }
+  }
+  if (offset !== bytes.length) {
+    throw new Error('Unexpected trailing license key data');
+  }
+
+  metadata.hardwareId = flags & LICENSE_FLAG_HEX_HARDWARE_ID
+    ? Array.from(hardwareBytes, b => b.toString(16).padStart(2, '0')).join('')
+    : decoder.decode(hardwareBytes);
+  metadata.licenseType = flags & LICENSE_FLAG_SUBSCRIPTION ? 'subscription' : 'lifetime';
+  metadata.salt = keyPart.replace(/-/g, '').substring(0, LICENSE_SALT_LENGTH);
+  if (expiryDate) {
+    metadata.expiryDate = expiryDate;
+  }
+  return metadata;
+}
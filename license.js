@@ -354,9 +354,8 @@ function tryExtractLicenseMetadata(licenseKey, hardwareId) {
         const parts = licenseKey.split('#');
         if (parts.length === 2) {
           const metadataBase64 = parts[1];
-          // Try to decode the base64 part
-          const decodedData = atob(metadataBase64);
-          const metadata = JSON.parse(decodedData);
+          // Try to decode the metadata part
+          const metadata = decodeLicenseMetadata(parts[0], metadataBase64);
           
           // If metadata extracted successfully, use the values from it
           if (metadata) {
@@ -499,8 +498,7 @@ async function extractAndVerifyLicenseMetadata(licenseKey) {
       
       try {
         // Decode the metadata
-        const decodedData = atob(metadataBase64);
-        const metadata = JSON.parse(decodedData);
+        const metadata = decodeLicenseMetadata(keyPart, metadataBase64);
         
         // Strict hardware ID validation
         if (!metadata.hardwareId || metadata.hardwareId !== hardwareId) {
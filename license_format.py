@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+License key encoding, decoding and verification for Browser Launcher Pro
+
+Shared by the native messaging host (validateLicense), the issued-license
+registry and the generators. A license_generator.py key is
+`<key part>#<metadata>`; the key part is the salt followed by the first 8
+characters of the hardware ID, padded to 20 characters and grouped by dashes.
+The hardware ID is the SHA-256 hex digest of the hardware fingerprint as
+computed by background.js.
+
+The metadata comes in two formats, told apart by the first decoded byte:
+
+  legacy   base64 of the JSON metadata ('{')
+  compact  unpadded base64url of a packed binary record (version byte):
+
+    version:u8 flags:u8 hwlen:u8 hardware-id purchase:u16 [expiry:u16]
+    namelen:u8 name emaillen:u8 email [crc32:u32]
+
+    Dates are days since 2000-01-01, a hex hardware ID is stored as bytes,
+    the salt is not repeated (it is the start of the key part) and the
+    optional CRC32 covers the key part and the record.
+
+license_tool.py keys (`YYMMDD-<16 random>-<hardware prefix>`) carry no
+metadata but are decoded as well; check_license rejects them as
+invalid_format, as background.js does. license-format.js is the extension's
+copy of the decoder.
+
+Usage:
+  python license_format.py --benchmark 100000
+"""
+
+import argparse
+import base64
+import datetime
+import hashlib
+import json
+import re
+import struct
+import time
+import zlib
+
+# Error codes, as used by background.js
+ERROR_INVALID_FORMAT = "invalid_format"
+ERROR_EXTRACTION_FAILED = "extraction_failed"
+ERROR_HARDWARE_MISMATCH = "hardware_mismatch"
+ERROR_EXPIRED = "expired_key"
+ERROR_TAMPERED = "tampered_key"
+
+SALT_LENGTH = 5
+HARDWARE_PREFIX_LENGTH = 8
+
+# Key formats
+FORMAT_LEGACY = "legacy"
+FORMAT_COMPACT = "compact"
+FORMAT_LICENSE_TOOL = "license_tool"
+
+COMPACT_VERSION = 1
+FLAG_SUBSCRIPTION = 0x01
+FLAG_EXPIRY = 0x02
+FLAG_HEX_HARDWARE_ID = 0x04
+FLAG_CHECKSUM = 0x08
+DATE_EPOCH = datetime.date(2000, 1, 1)
+
+LICENSE_TOOL_KEY = re.compile(r'^(\d{6})-([A-Z0-9]{16})-(\S{1,8})$')
+HEX_HARDWARE_ID = re.compile(r'^(?:[0-9a-f]{2})+$')
+URLSAFE_TO_STANDARD = str.maketrans('-_', '+/')
+
+
+class LicenseFormatError(ValueError):
+    """Raised when a license key cannot be decoded."""
+
+
+def hardware_id_from_info(hardware_info):
+    """
+    Returns the hardware ID for a getHardwareInfo dictionary.
+
+    Matches background.js: SHA-256 of JSON.stringify(hardwareInfo), which
+    keeps insertion order and uses no whitespace.
+    """
+    data = json.dumps(hardware_info, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def _pack_date(value):
+    days = (datetime.datetime.strptime(value[:10], '%Y-%m-%d').date() - DATE_EPOCH).days
+    if not 0 <= days <= 0xFFFF:
+        raise LicenseFormatError(f"Date out of range: {value}")
+    return struct.pack('>H', days)
+
+
+def _pack_text(value):
+    data = (value or '').encode('utf-8')
+    if len(data) > 0xFF:
+        raise LicenseFormatError("Name and email must be at most 255 bytes")
+    return bytes([len(data)]) + data
+
+
+def _checksum(key_part, record):
+    return zlib.crc32(key_part.replace('-', '').encode('utf-8') + record) & 0xFFFFFFFF
+
+
+def encode_compact_metadata(metadata, key_part, checksum=True):
+    """
+    Encodes license metadata in the compact format.
+
+    Args:
+        metadata: Metadata in the legacy field names (name, email, hardwareId, ...)
+        key_part: The key part the metadata will be attached to
+        checksum: Append a CRC32 of the key part and the record
+    """
+    hardware_id = metadata["hardwareId"]
+    flags = FLAG_CHECKSUM if checksum else 0
+    if metadata.get("licenseType") == "subscription":
+        flags |= FLAG_SUBSCRIPTION
+    if metadata.get("expiryDate"):
+        flags |= FLAG_EXPIRY
+    if HEX_HARDWARE_ID.match(hardware_id):
+        flags |= FLAG_HEX_HARDWARE_ID
+        hardware_bytes = bytes.fromhex(hardware_id)
+    else:
+        hardware_bytes = hardware_id.encode('utf-8')
+    if len(hardware_bytes) > 0xFF:
+        raise LicenseFormatError("Hardware ID is too long")
+
+    record = bytes([COMPACT_VERSION, flags, len(hardware_bytes)]) + hardware_bytes
+    record += _pack_date(metadata["purchaseDate"])
+    if flags & FLAG_EXPIRY:
+        record += _pack_date(metadata["expiryDate"])
+    record += _pack_text(metadata.get("name")) + _pack_text(metadata.get("email"))
+    if checksum:
+        record += struct.pack('>I', _checksum(key_part, record))
+    return base64.urlsafe_b64encode(record).decode('ascii').rstrip('=')
+
+
+def _decode_compact(key_part, record):
+    try:
+        flags, hardware_length = record[1], record[2]
+        offset = 3 + hardware_length
+        hardware_bytes = record[3:offset]
+        if len(hardware_bytes) != hardware_length:
+            raise LicenseFormatError("Truncated license key data")
+        dates = [DATE_EPOCH + datetime.timedelta(days=struct.unpack_from('>H', record, offset)[0])]
+        offset += 2
+        if flags & FLAG_EXPIRY:
+            dates.append(DATE_EPOCH + datetime.timedelta(days=struct.unpack_from('>H', record, offset)[0]))
+            offset += 2
+        texts = []
+        for _ in range(2):
+            length = record[offset]
+            texts.append(record[offset + 1:offset + 1 + length].decode('utf-8'))
+            offset += 1 + length
+        if flags & FLAG_CHECKSUM:
+            if struct.unpack_from('>I', record, offset)[0] != _checksum(key_part, record[:offset]):
+                raise LicenseFormatError("License key checksum mismatch")
+            offset += 4
+    except (IndexError, struct.error, UnicodeDecodeError):
+        raise LicenseFormatError("Truncated license key data")
+    if offset != len(record):
+        raise LicenseFormatError("Unexpected trailing license key data")
+
+    metadata = {
+        "name": texts[0],
+        "email": texts[1],
+        "hardwareId": hardware_bytes.hex() if flags & FLAG_HEX_HARDWARE_ID else hardware_bytes.decode('utf-8'),
+        "licenseType": "subscription" if flags & FLAG_SUBSCRIPTION else "lifetime",
+        "purchaseDate": dates[0].isoformat(),
+        "salt": key_part.replace('-', '')[:SALT_LENGTH],
+    }
+    if flags & FLAG_EXPIRY:
+        metadata["expiryDate"] = dates[1].isoformat()
+    return metadata
+
+
+def decode_license_key(license_key):
+    """
+    Decodes a license key in any of the supported formats.
+
+    Returns:
+        (key_part, metadata dict) - metadata uses the legacy field names plus
+        "format"; license_tool.py keys only yield hardwarePrefix and purchaseDate
+
+    Raises:
+        LicenseFormatError: If the key is malformed or the metadata cannot be decoded
+    """
+    license_key = license_key.strip()
+    match = LICENSE_TOOL_KEY.match(license_key)
+    if match:
+        issued = match.group(1)
+        return license_key, {
+            "format": FORMAT_LICENSE_TOOL,
+            "hardwarePrefix": match.group(3),
+            "purchaseDate": f"20{issued[0:2]}-{issued[2:4]}-{issued[4:6]}",
+        }
+
+    parts = license_key.split('#')
+    if len(parts) != 2 or not parts[0] or not parts[1]:
+        raise LicenseFormatError("Invalid license key format")
+    key_part, payload = parts
+    try:
+        record = base64.b64decode(payload.translate(URLSAFE_TO_STANDARD) + '=' * (-len(payload) % 4),
+                                  validate=True)
+    except ValueError as e:
+        raise LicenseFormatError(f"Could not decode license key data: {e}")
+    if record[:1] == b'{':
+        try:
+            metadata = json.loads(record.decode('utf-8'))
+        except (ValueError, UnicodeDecodeError) as e:
+            raise LicenseFormatError(f"Could not decode license key data: {e}")
+        if not isinstance(metadata, dict):
+            raise LicenseFormatError("Could not decode license key data")
+        metadata["format"] = FORMAT_LEGACY
+        return key_part, metadata
+    if record[:1] == bytes([COMPACT_VERSION]):
+        metadata = _decode_compact(key_part, record)
+        metadata["format"] = FORMAT_COMPACT
+        return key_part, metadata
+    raise LicenseFormatError("Unsupported license key version")
+
+
+def check_license(license_key, hardware_id, today=None):
+    """
+    Verifies a license key against this device's hardware ID.
+
+    Args:
+        license_key: The license key entered by the user
+        hardware_id: This device's hardware ID (see hardware_id_from_info)
+        today: Date to check the expiry against (defaults to today)
+
+    Returns:
+        {"valid": bool, "errorCode"?, "message"?, "licenseType", "expiryDate",
+         "daysRemaining", "name", "email"} - small enough to send as is
+    """
+    try:
+        key_part, metadata = decode_license_key(license_key)
+    except LicenseFormatError as e:
+        code = ERROR_INVALID_FORMAT if "format" in str(e) else ERROR_EXTRACTION_FAILED
+        return {"valid": False, "errorCode": code, "message": str(e)}
+
+    if metadata["format"] == FORMAT_LICENSE_TOOL:
+        # background.js only accepts `key#metadata` keys; keep the verdicts the same
+        return {"valid": False, "errorCode": ERROR_INVALID_FORMAT, "message": "Invalid license key format"}
+
+    expiry_date = metadata.get("expiryDate")
+    verdict = {
+        "valid": False,
+        "licenseType": metadata.get("licenseType", "lifetime"),
+        "expiryDate": expiry_date,
+        "daysRemaining": None,
+        "name": metadata.get("name"),
+        "email": metadata.get("email"),
+    }
+    if not hardware_id or metadata.get("hardwareId") != hardware_id:
+        verdict.update(errorCode=ERROR_HARDWARE_MISMATCH,
+                       message="This license key is bound to a different device")
+        return verdict
+    if key_part.replace('-', '')[SALT_LENGTH:SALT_LENGTH + HARDWARE_PREFIX_LENGTH] != \
+            hardware_id[:HARDWARE_PREFIX_LENGTH]:
+        verdict.update(errorCode=ERROR_TAMPERED, message="Invalid license key for this device")
+        return verdict
+    if expiry_date:
+        today = today or datetime.date.today()
+        try:
+            expiry = datetime.datetime.strptime(expiry_date[:10], '%Y-%m-%d').date()
+        except ValueError:
+            verdict.update(errorCode=ERROR_EXTRACTION_FAILED, message="Invalid expiry date")
+            return verdict
+        verdict["daysRemaining"] = (expiry - today).days
+        # background.js treats a key as expired from the start of its expiry date
+        if expiry <= today:
+            verdict.update(errorCode=ERROR_EXPIRED, message="This license key has expired")
+            return verdict
+    verdict["valid"] = True
+    return verdict
+
+
+def benchmark(count):
+    """Measures decode throughput (keys/s) and average key length for each format."""
+    from license_generator import LicenseGenerator
+    from license_tool import generate_license_key as generate_tool_key
+
+    keys = {FORMAT_LEGACY: [], FORMAT_COMPACT: [], FORMAT_LICENSE_TOOL: []}
+    generators = {FORMAT_LEGACY: LicenseGenerator(), FORMAT_COMPACT: LicenseGenerator(FORMAT_COMPACT)}
+    for i in range(count):
+        hardware_id = hashlib.sha256(str(i).encode()).hexdigest()
+        for key_format, generator in generators.items():
+            keys[key_format].append(generator.generate_license_key(
+                hardware_id, f"User {i}", f"user{i}@example.com", "subscription", "2025-01-01", "2026-01-01"))
+        keys[FORMAT_LICENSE_TOOL].append(generate_tool_key(hardware_id))
+
+    results = {}
+    for key_format, format_keys in keys.items():
+        start = time.perf_counter()
+        for key in format_keys:
+            decode_license_key(key)
+        elapsed = time.perf_counter() - start
+        results[key_format] = {
+            "keysPerSecond": round(count / elapsed),
+            "averageKeyLength": round(sum(map(len, format_keys)) / count, 1),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Browser Launcher Pro license key format tools")
+    parser.add_argument("--benchmark", type=int, metavar="COUNT", default=100000,
+                        help="Decode COUNT keys of each format and report throughput")
+    args = parser.parse_args()
+    for key_format, result in benchmark(args.benchmark).items():
+        print(f"{key_format:<13} {result['keysPerSecond']:>9} keys/s  "
+              f"average key length {result['averageKeyLength']}")
+
+
+if __name__ == "__main__":
+    main()
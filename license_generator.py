@@ -9,25 +9,38 @@ Features:
 - Hardware ID binding to prevent license sharing
 - Embedded metadata (name, email, dates, etc.)
 - Support for subscription or lifetime licenses
+- Bulk mode streaming CSV/JSONL input through a process pool
 """
 
 import argparse
 import base64
+import csv
 import datetime
 import hashlib
 import json
+import multiprocessing
 import os
 import random
 import string
 import sys
+import time
+
+from license_format import FORMAT_COMPACT, FORMAT_LEGACY, decode_license_key, encode_compact_metadata
+from license_registry import DEFAULT_REGISTRY_PATH, IMPORT_BATCH_SIZE, LicenseRegistry, record_issued
 
 # Simple obfuscation key (not secure, but good enough for demo)
 OBFUSCATION_KEY = "PGdYL2f8RQzcBm4KsX9JtEwU3vN7V6h5"
 
 class LicenseGenerator:
-    def __init__(self):
-        """Initialize the license generator."""
-        pass
+    def __init__(self, key_format: str = FORMAT_LEGACY):
+        """
+        Initialize the license generator.
+        
+        Args:
+            key_format: Metadata encoding, FORMAT_LEGACY (base64 JSON) or
+                FORMAT_COMPACT (packed binary, about half the key length)
+        """
+        self.key_format = key_format
     
     def generate_salt(self, length: int = 5) -> str:
         """Generate a random salt string of specified length."""
@@ -120,15 +133,202 @@ class LicenseGenerator:
         if license_type == 'subscription' and expiry_date:
             metadata["expiryDate"] = expiry_date
             
-        # Obfuscate the metadata
-        obfuscated_metadata = self.obfuscate_metadata(metadata)
-        
         # Generate the key part
         key_part = self.generate_key_part(hardware_id, salt)
         
+        # Obfuscate the metadata
+        if self.key_format == FORMAT_COMPACT:
+            obfuscated_metadata = encode_compact_metadata(metadata, key_part)
+        else:
+            obfuscated_metadata = self.obfuscate_metadata(metadata)
+        
         # Combine to form the complete license key
         return f"{key_part}#{obfuscated_metadata}"
 
+def default_expiry_date(purchase_date: str) -> str:
+    """Returns the default subscription expiry: one year after the purchase date."""
+    purchase_dt = datetime.datetime.strptime(purchase_date, '%Y-%m-%d')
+    try:
+        expiry_dt = purchase_dt.replace(year=purchase_dt.year + 1)
+    except ValueError:
+        # 29 February has no counterpart next year
+        expiry_dt = purchase_dt.replace(year=purchase_dt.year + 1, day=28)
+    return expiry_dt.strftime('%Y-%m-%d')
+
+# Bulk mode: accepted input columns and their aliases (metadata field names)
+BULK_FIELD_ALIASES = {
+    'hardware_id': ('hardware_id', 'hardwareId', 'hardware-id'),
+    'name': ('name', 'licensee_name'),
+    'email': ('email', 'licensee_email'),
+    'type': ('type', 'licenseType', 'license_type'),
+    'purchase_date': ('purchase_date', 'purchaseDate', 'purchase-date'),
+    'expiry': ('expiry', 'expiryDate', 'expiry_date'),
+}
+BULK_OUTPUT_FIELDS = ['hardware_id', 'name', 'email', 'type', 'purchase_date', 'expiry', 'license_key', 'error']
+BULK_CHUNK_SIZE = 256
+
+def detect_bulk_format(path: str) -> str:
+    """Returns 'jsonl' or 'csv' based on the file extension (CSV by default)."""
+    return 'jsonl' if path.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+def read_bulk_records(stream, fmt: str):
+    """Yields normalized license requests from a CSV or JSONL stream, one at a time."""
+    rows = csv.DictReader(stream) if fmt == 'csv' else (
+        json.loads(line) for line in stream if line.strip())
+    for row in rows:
+        record = {}
+        for field, aliases in BULK_FIELD_ALIASES.items():
+            value = next((row[alias] for alias in aliases if row.get(alias)), None)
+            record[field] = value.strip() if isinstance(value, str) else value
+        yield record
+
+def _init_bulk_worker(key_format=FORMAT_LEGACY):
+    """Process pool initializer: forked workers must not share the parent's random state."""
+    global _bulk_generator
+    random.seed()
+    _bulk_generator = LicenseGenerator(key_format)
+
+def generate_bulk_record(record, generator=None):
+    """Generates the license key for one bulk record; errors are reported in the record."""
+    generator = generator or _bulk_generator
+    result = dict(record)
+    try:
+        if not validate_hardware_id(record.get('hardware_id') or ''):
+            raise ValueError("Hardware ID must be at least 8 characters long")
+        if not record.get('name') or not record.get('email'):
+            raise ValueError("Name and email are required")
+        license_type = record.get('type') or 'lifetime'
+        if license_type not in ('lifetime', 'subscription'):
+            raise ValueError(f"Invalid license type: {license_type}")
+        purchase_date = record.get('purchase_date') or datetime.datetime.now().strftime('%Y-%m-%d')
+        expiry_date = record.get('expiry')
+        if license_type == 'subscription' and not expiry_date:
+            expiry_date = default_expiry_date(purchase_date)
+        result.update(type=license_type, purchase_date=purchase_date, expiry=expiry_date)
+        result['license_key'] = generator.generate_license_key(
+            hardware_id=record['hardware_id'],
+            licensee_name=record['name'],
+            licensee_email=record['email'],
+            license_type=license_type,
+            purchase_date=purchase_date,
+            expiry_date=expiry_date
+        )
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def generate_bulk(records, workers=None, chunksize=BULK_CHUNK_SIZE, stats=None, key_format=FORMAT_LEGACY):
+    """
+    Generates license keys for a stream of records across a process pool.
+
+    Results are yielded in input order as they are produced, so neither the
+    input nor the output batch is held in memory. Only the issued key parts
+    are remembered, to detect salt/key collisions; a colliding key is
+    regenerated with a fresh salt.
+
+    Args:
+        records: Iterable of normalized records (see read_bulk_records)
+        workers: Number of worker processes (defaults to the CPU count)
+        chunksize: Records handed to a worker at a time
+        stats: Optional dict updated with 'generated', 'errors' and 'collisions'
+        key_format: Metadata encoding of the generated keys
+    """
+    stats = stats if stats is not None else {}
+    stats.update(generated=0, errors=0, collisions=0)
+    seen_key_parts = set()
+    generator = LicenseGenerator(key_format)
+    with multiprocessing.Pool(processes=workers, initializer=_init_bulk_worker, initargs=(key_format,)) as pool:
+        for result in pool.imap(generate_bulk_record, records, chunksize):
+            if 'error' in result:
+                stats['errors'] += 1
+                yield result
+                continue
+            key_part = result['license_key'].split('#')[0]
+            while key_part in seen_key_parts:
+                stats['collisions'] += 1
+                result = generate_bulk_record({k: v for k, v in result.items() if k != 'license_key'},
+                                              generator)
+                key_part = result['license_key'].split('#')[0]
+            seen_key_parts.add(key_part)
+            stats['generated'] += 1
+            yield result
+
+def write_bulk_results(results, stream, fmt: str) -> None:
+    """Streams bulk results to a CSV or JSONL output."""
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=BULK_OUTPUT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for result in results:
+            writer.writerow(result)
+    else:
+        for result in results:
+            stream.write(json.dumps(result) + "\n")
+
+def record_bulk_results(results, registry):
+    """Passes bulk results through, recording the generated keys in the registry in batches."""
+    batch = []
+    for result in results:
+        if 'license_key' in result:
+            batch.append(result['license_key'])
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                registry.add_many(batch)
+                batch = []
+        yield result
+    registry.add_many(batch)
+
+def run_bulk(input_path: str, output_path=None, fmt=None, workers=None, registry_path=None,
+             key_format=FORMAT_LEGACY) -> dict:
+    """
+    Runs bulk mode from a file (or '-' for stdin) to a file (or stdout) and returns statistics.
+
+    Generated keys are recorded in the registry at registry_path, if given.
+    """
+    input_format = fmt or ('csv' if input_path == '-' else detect_bulk_format(input_path))
+    output_format = fmt or (detect_bulk_format(output_path) if output_path else input_format)
+    stats = {}
+    start = time.perf_counter()
+    input_stream = sys.stdin if input_path == '-' else open(input_path, 'r', newline='', encoding='utf-8')
+    output_stream = open(output_path, 'w', newline='', encoding='utf-8') if output_path else sys.stdout
+    try:
+        records = read_bulk_records(input_stream, input_format)
+        results = generate_bulk(records, workers, stats=stats, key_format=key_format)
+        if registry_path:
+            with LicenseRegistry(registry_path) as registry:
+                write_bulk_results(record_bulk_results(results, registry), output_stream, output_format)
+        else:
+            write_bulk_results(results, output_stream, output_format)
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+def run_benchmark(count: int, workers=None) -> dict:
+    """Measures bulk generation throughput (keys/s) on synthetic records."""
+    def synthetic_records():
+        for i in range(count):
+            yield {'hardware_id': f"{i:016x}", 'name': f"User {i}", 'email': f"user{i}@example.com",
+                   'type': 'subscription' if i % 2 else 'lifetime', 'purchase_date': '2025-01-01',
+                   'expiry': None}
+
+    results = {}
+    start = time.perf_counter()
+    generator = LicenseGenerator()
+    for record in synthetic_records():
+        generate_bulk_record(record, generator)
+    results['single_process_keys_per_second'] = count / (time.perf_counter() - start)
+
+    stats = {}
+    start = time.perf_counter()
+    for _ in generate_bulk(synthetic_records(), workers, stats=stats):
+        pass
+    results['pool_keys_per_second'] = count / (time.perf_counter() - start)
+    results.update(stats)
+    results['workers'] = workers or os.cpu_count()
+    return results
+
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -141,14 +341,20 @@ Examples:
     
   Generate a subscription license:
     python license_generator.py --hardware-id f86774665722036dd --name "Jane Doe" --email "jane@example.com" --type subscription --expiry 2023-12-31
+
+  Generate licenses in bulk (CSV or JSONL with hardware_id,name,email,type,purchase_date,expiry):
+    python license_generator.py --bulk rollout.csv --output rollout-keys.csv --workers 8
+
+  Measure bulk throughput:
+    python license_generator.py --benchmark 100000
         '''
     )
     
-    parser.add_argument('--hardware-id', required=True, 
+    parser.add_argument('--hardware-id', 
                         help='Hardware ID of the target device')
-    parser.add_argument('--name', required=True, 
+    parser.add_argument('--name', 
                         help='Licensee name (person or organization)')
-    parser.add_argument('--email', required=True, 
+    parser.add_argument('--email', 
                         help='Licensee email')
     parser.add_argument('--type', choices=['lifetime', 'subscription'], 
                         default='lifetime', 
@@ -161,8 +367,25 @@ Examples:
                         help='Output file path, if not specified print to stdout')
     parser.add_argument('--salt', 
                         help='Custom salt for key generation (optional)')
+    parser.add_argument('--bulk', metavar='INPUT',
+                        help="Generate keys for every record in a CSV/JSONL file ('-' for stdin)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'],
+                        help='Bulk input/output format (defaults to the file extension)')
+    parser.add_argument('--workers', type=int,
+                        help='Worker processes for bulk mode (defaults to the CPU count)')
+    parser.add_argument('--benchmark', type=int, metavar='COUNT',
+                        help='Benchmark bulk generation with COUNT synthetic records')
+    parser.add_argument('--key-format', choices=[FORMAT_LEGACY, FORMAT_COMPACT], default=FORMAT_LEGACY,
+                        help='Metadata encoding: base64 JSON (legacy) or packed binary (compact, shorter keys)')
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY_PATH,
+                        help=f'Issued-license registry to record keys in (default: {DEFAULT_REGISTRY_PATH})')
+    parser.add_argument('--no-registry', action='store_true',
+                        help='Do not record generated keys in the registry')
     
-    return parser.parse_args()
+    args = parser.parse_args()
+    if not args.bulk and not args.benchmark and not (args.hardware_id and args.name and args.email):
+        parser.error('--hardware-id, --name and --email are required unless --bulk or --benchmark is used')
+    return args
 
 def validate_hardware_id(hardware_id: str) -> bool:
     """Validate that the hardware ID has the correct format."""
@@ -173,6 +396,24 @@ def validate_hardware_id(hardware_id: str) -> bool:
 def main():
     """Main entry point for the script."""
     args = parse_arguments()
+
+    if args.benchmark:
+        results = run_benchmark(args.benchmark, args.workers)
+        print(f"Generated {args.benchmark} keys with {results['workers']} workers")
+        print(f"Single process: {results['single_process_keys_per_second']:.0f} keys/s")
+        print(f"Process pool:   {results['pool_keys_per_second']:.0f} keys/s")
+        print(f"Collisions:     {results['collisions']}")
+        return
+
+    if args.bulk:
+        stats = run_bulk(args.bulk, args.output, args.format, args.workers,
+                         None if args.no_registry else args.registry, args.key_format)
+        rate = stats['generated'] / stats['seconds'] if stats['seconds'] else 0
+        print(f"Generated {stats['generated']} license keys in {stats['seconds']:.2f}s ({rate:.0f} keys/s), "
+              f"{stats['errors']} errors, {stats['collisions']} collisions regenerated", file=sys.stderr)
+        if stats['errors']:
+            sys.exit(1)
+        return
     
     # Validate hardware ID
     if not validate_hardware_id(args.hardware_id):
@@ -186,13 +427,11 @@ def main():
     # Check that expiry date is provided for subscription licenses
     if args.type == 'subscription' and not expiry_date:
         # Set default expiry to one year from purchase
-        purchase_dt = datetime.datetime.strptime(purchase_date, '%Y-%m-%d')
-        expiry_dt = purchase_dt.replace(year=purchase_dt.year + 1)
-        expiry_date = expiry_dt.strftime('%Y-%m-%d')
+        expiry_date = default_expiry_date(purchase_date)
         print(f"No expiry date provided for subscription license. Using default: {expiry_date}")
     
     # Generate license key
-    generator = LicenseGenerator()
+    generator = LicenseGenerator(args.key_format)
     license_key = generator.generate_license_key(
         hardware_id=args.hardware_id,
         licensee_name=args.name,
@@ -203,10 +442,11 @@ def main():
         salt=args.salt
     )
     
+    if not args.no_registry:
+        record_issued([license_key], 'license_generator', args.registry)
+    
     # Extract metadata from the key for display
-    metadata_base64 = license_key.split('#')[1]
-    metadata_json = base64.b64decode(metadata_base64).decode('utf-8')
-    metadata = json.loads(metadata_json)
+    _, metadata = decode_license_key(license_key)
     
     # Output the key
     if args.output:
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Issued-license registry for Browser Launcher Pro
+
+Keeps a local SQLite record of every license key produced by
+license_generator.py and license_tool.py, indexed by hardware ID, hardware
+prefix, email and expiry date, so support can answer "which licenses are
+bound to hardware prefix X" or "is this key revoked" with an index lookup.
+
+Usage:
+  python license_registry.py import keys.txt rollout-keys.jsonl
+  python license_registry.py find --prefix f8677466
+  python license_registry.py find --email jane@example.com
+  python license_registry.py find --expires-before 2026-01-01
+  python license_registry.py check <license key>
+  python license_registry.py revoke <license key> --reason "refunded"
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from license_format import LicenseFormatError, decode_license_key
+
+DEFAULT_REGISTRY_PATH = os.environ.get("BROWSER_LAUNCHER_LICENSE_REGISTRY", "issued_licenses.db")
+HARDWARE_PREFIX_LENGTH = 8
+IMPORT_BATCH_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS licenses (
+    license_key   TEXT NOT NULL UNIQUE,
+    key_part      TEXT NOT NULL,
+    hardware_id   TEXT,
+    hw_prefix     TEXT,
+    name          TEXT,
+    email         TEXT COLLATE NOCASE,
+    license_type  TEXT,
+    purchase_date TEXT,
+    expiry_date   TEXT,
+    source        TEXT,
+    issued_at     REAL NOT NULL,
+    revoked_at    REAL,
+    revoke_reason TEXT
+);
+CREATE INDEX IF NOT EXISTS licenses_key_part ON licenses (key_part);
+CREATE INDEX IF NOT EXISTS licenses_hardware_id ON licenses (hardware_id);
+CREATE INDEX IF NOT EXISTS licenses_hw_prefix ON licenses (hw_prefix);
+CREATE INDEX IF NOT EXISTS licenses_email ON licenses (email);
+CREATE INDEX IF NOT EXISTS licenses_expiry_date ON licenses (expiry_date) WHERE expiry_date IS NOT NULL;
+"""
+
+COLUMNS = ["license_key", "key_part", "hardware_id", "hw_prefix", "name", "email", "license_type",
+           "purchase_date", "expiry_date", "source", "issued_at", "revoked_at", "revoke_reason"]
+
+
+def describe_license_key(license_key):
+    """Extracts the registry fields from a license key in any format license_format decodes."""
+    license_key = license_key.strip()
+    fields = {"license_key": license_key, "key_part": license_key.split('#')[0]}
+    try:
+        _, metadata = decode_license_key(license_key)
+    except LicenseFormatError:
+        return fields
+    fields.update(
+        hardware_id=metadata.get("hardwareId"),
+        hw_prefix=metadata.get("hardwarePrefix"),
+        name=metadata.get("name"),
+        email=metadata.get("email"),
+        license_type=metadata.get("licenseType"),
+        purchase_date=metadata.get("purchaseDate"),
+        expiry_date=metadata.get("expiryDate"),
+    )
+    return fields
+
+
+def _prefix_range(prefix):
+    """Returns (low, high) bounds matching every string that starts with prefix."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class LicenseRegistry:
+    """SQLite-backed record of issued license keys."""
+
+    def __init__(self, path=DEFAULT_REGISTRY_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _row(self, license_key, fields, source):
+        row = describe_license_key(license_key)
+        row.update({k: v for k, v in fields.items() if v is not None})
+        if row.get("hardware_id") and not row.get("hw_prefix"):
+            row["hw_prefix"] = row["hardware_id"][:HARDWARE_PREFIX_LENGTH]
+        row["source"] = source
+        row["issued_at"] = time.time()
+        return tuple(row.get(column) for column in COLUMNS[:11])
+
+    def add_many(self, entries, source="license_generator"):
+        """
+        Records license keys in one transaction; keys already present are kept as they are.
+
+        Args:
+            entries: Iterable of license keys or (license_key, fields) pairs, where
+                fields override what can be decoded from the key (e.g. the full
+                hardware ID for license_tool.py keys)
+            source: Name of the tool that issued the keys
+
+        Returns:
+            The number of newly recorded keys
+        """
+        rows = (self._row(*((entry, {}) if isinstance(entry, str) else entry), source) for entry in entries)
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO licenses ({', '.join(COLUMNS[:11])}) VALUES ({', '.join('?' * 11)})",
+                rows)
+            return self.conn.total_changes - before
+
+    def add(self, license_key, source="license_generator", **fields):
+        """Records a single license key. Returns False if it was already recorded."""
+        return self.add_many([(license_key, fields)], source) == 1
+
+    def import_file(self, path, source="import"):
+        """
+        Imports existing keys from a file in batches.
+
+        Accepts bulk output from license_generator.py (CSV or JSONL with a
+        license_key column) or plain text with one key per line.
+        """
+        def keys():
+            with open(path, "r", newline="", encoding="utf-8") as f:
+                lower = path.lower()
+                if lower.endswith((".jsonl", ".ndjson", ".json")):
+                    rows = (json.loads(line) for line in f if line.strip())
+                elif lower.endswith(".csv"):
+                    rows = csv.DictReader(f)
+                else:
+                    rows = ({"license_key": line} for line in f
+                            if line.strip() and not line.lstrip().startswith("#"))
+                for row in rows:
+                    key = row.get("license_key") or row.get("licenseKey")
+                    if key:
+                        yield key.strip()
+
+        imported = 0
+        batch = []
+        for key in keys():
+            batch.append(key)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                imported += self.add_many(batch, source)
+                batch = []
+        return imported + self.add_many(batch, source)
+
+    def get(self, license_key):
+        """Returns the record of a key as a dict, or None."""
+        row = self.conn.execute("SELECT * FROM licenses WHERE license_key = ?",
+                                (license_key.strip(),)).fetchone()
+        return dict(row) if row else None
+
+    def find(self, hardware_id=None, hardware_prefix=None, email=None,
+             expires_before=None, expires_after=None, include_revoked=True, limit=None):
+        """
+        Returns records matching all given criteria.
+
+        Args:
+            hardware_id: Exact hardware ID
+            hardware_prefix: Leading characters of the hardware ID
+            email: Licensee email (case-insensitive)
+            expires_before / expires_after: ISO dates bounding the expiry date
+            include_revoked: Whether revoked keys are returned
+            limit: Maximum number of records
+        """
+        clauses, params = [], []
+        if hardware_id:
+            clauses.append("hardware_id = ?")
+            params.append(hardware_id)
+        if hardware_prefix:
+            # Range scans, so the prefix lookup uses the index
+            column = "hw_prefix" if len(hardware_prefix) <= HARDWARE_PREFIX_LENGTH else "hardware_id"
+            clauses.append(f"{column} >= ? AND {column} < ?")
+            params.extend(_prefix_range(hardware_prefix))
+        if email:
+            clauses.append("email = ?")
+            params.append(email)
+        if expires_before:
+            clauses.append("expiry_date < ?")
+            params.append(expires_before)
+        if expires_after:
+            clauses.append("expiry_date >= ?")
+            params.append(expires_after)
+        if not include_revoked:
+            clauses.append("revoked_at IS NULL")
+        query = "SELECT * FROM licenses"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY issued_at"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def revoke(self, license_key, reason=None):
+        """
+        Marks a key as revoked, recording it first if it was issued before the registry existed.
+
+        Returns False if the key was already revoked.
+        """
+        self.add(license_key, source="revocation")
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE licenses SET revoked_at = ?, revoke_reason = ? "
+                "WHERE license_key = ? AND revoked_at IS NULL",
+                (time.time(), reason, license_key.strip()))
+        return cursor.rowcount == 1
+
+    def is_revoked(self, license_key):
+        """Returns True if the key, or another key with the same key part, has been revoked."""
+        license_key = license_key.strip()
+        row = self.conn.execute(
+            "SELECT 1 FROM licenses WHERE (license_key = ? OR key_part = ?) AND revoked_at IS NOT NULL LIMIT 1",
+            (license_key, license_key.split('#')[0])).fetchone()
+        return row is not None
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM licenses").fetchone()[0]
+
+
+def record_issued(license_keys, source, path=None, **fields):
+    """Records freshly generated keys; a registry failure is reported but never loses the keys."""
+    try:
+        with LicenseRegistry(path or DEFAULT_REGISTRY_PATH) as registry:
+            if fields:
+                return registry.add_many([(key, fields) for key in license_keys], source)
+            return registry.add_many(license_keys, source)
+    except sqlite3.Error as e:
+        print(f"Warning: could not record license keys in the registry: {e}", file=sys.stderr)
+        return 0
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Browser Launcher Pro issued-license registry")
+    parser.add_argument("--db", default=DEFAULT_REGISTRY_PATH, help="Registry database path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Import existing key files")
+    import_parser.add_argument("files", nargs="+", help="Key files (.txt, .csv or .jsonl)")
+
+    find_parser = commands.add_parser("find", help="Look up issued licenses")
+    find_parser.add_argument("--hardware-id", help="Exact hardware ID")
+    find_parser.add_argument("--prefix", help="Hardware ID prefix")
+    find_parser.add_argument("--email", help="Licensee email")
+    find_parser.add_argument("--expires-before", help="Expiry date upper bound (YYYY-MM-DD)")
+    find_parser.add_argument("--expires-after", help="Expiry date lower bound (YYYY-MM-DD)")
+    find_parser.add_argument("--active", action="store_true", help="Exclude revoked licenses")
+    find_parser.add_argument("--limit", type=int, help="Maximum number of results")
+
+    check_parser = commands.add_parser("check", help="Show a key's record and revocation status")
+    check_parser.add_argument("key", help="License key")
+
+    revoke_parser = commands.add_parser("revoke", help="Revoke a license key")
+    revoke_parser.add_argument("key", help="License key")
+    revoke_parser.add_argument("--reason", help="Reason for the revocation")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    with LicenseRegistry(args.db) as registry:
+        if args.command == "import":
+            for path in args.files:
+                print(f"{path}: {registry.import_file(path)} new keys")
+            print(f"Registry now holds {registry.count()} keys")
+        elif args.command == "find":
+            for record in registry.find(args.hardware_id, args.prefix, args.email, args.expires_before,
+                                        args.expires_after, include_revoked=not args.active, limit=args.limit):
+                print(json.dumps(record))
+        elif args.command == "check":
+            record = registry.get(args.key)
+            if record is None:
+                print("Key not found in the registry")
+                sys.exit(2)
+            revoked = registry.is_revoked(args.key)
+            print(json.dumps(record, indent=2))
+            print("REVOKED" if revoked else "Not revoked")
+            sys.exit(1 if revoked else 0)
+        elif args.command == "revoke":
+            if registry.revoke(args.key, args.reason):
+                print("License key revoked")
+            else:
+                print("License key was already revoked")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ import hashlib
 import datetime
 import sys
 
+from license_registry import DEFAULT_REGISTRY_PATH, record_issued
+
 def generate_license_key(hardware_id, expires=None):
     """
     Generate a license key for a given hardware ID.
@@ -34,10 +36,15 @@ def main():
     parser = argparse.ArgumentParser(description='Browser Launcher Pro License Key Generator')
     parser.add_argument('hardware_id', help='Hardware ID to generate license key for')
     parser.add_argument('--expires', help='Expiration date (YYYY-MM-DD)', default=None)
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY_PATH, help='Issued-license registry path')
+    parser.add_argument('--no-registry', action='store_true', help='Do not record the key in the registry')
     
     args = parser.parse_args()
     
     license_key = generate_license_key(args.hardware_id, args.expires)
+    if not args.no_registry:
+        record_issued([license_key], 'license_tool', args.registry,
+                      hardware_id=args.hardware_id, expiry_date=args.expires)
     
     print("\nBrowser Launcher Pro - License Key Generator")
     print("--------------------------------------------")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Memory monitor for long-lived Browser Launcher Pro native host sessions.
+
+Behind a connectNative port the host can run for days, so it samples its own
+RSS with psutil and, when enabled, traces allocations with tracemalloc so
+getMemoryProfile can show the top allocation sites and what grew since the
+previous profile. A configurable RSS ceiling flags the host for a graceful
+restart, which the main loop performs between messages.
+"""
+
+import logging
+import threading
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+DEFAULT_SAMPLE_INTERVAL = 30
+DEFAULT_TRACE_FRAMES = 1
+DEFAULT_TOP_SITES = 10
+# RSS samples kept for the growth trend (an hour at the default interval)
+RSS_HISTORY_SIZE = 120
+# A ceiling hit this soon after start does not restart the host again, which
+# would only loop if the ceiling is set below the host's baseline
+DEFAULT_MIN_UPTIME = 5 * 60
+
+logger = logging.getLogger('BrowserLauncher')
+
+
+def _format_site(trace) -> str:
+    frame = trace.traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+class MemoryMonitor:
+    """Samples RSS, optionally traces allocations and watches a memory ceiling."""
+
+    def __init__(self, trace: bool = False, trace_frames: int = DEFAULT_TRACE_FRAMES,
+                 sample_interval: float = DEFAULT_SAMPLE_INTERVAL, ceiling_bytes: int = 0,
+                 min_uptime: float = DEFAULT_MIN_UPTIME):
+        """
+        Args:
+            trace: Start tracemalloc to record allocation sites (costs CPU and memory)
+            trace_frames: Frames stored per allocation traceback
+            sample_interval: Seconds between background RSS samples
+            ceiling_bytes: RSS that requests a restart (0 disables the ceiling)
+            min_uptime: Seconds the host must have run before the ceiling applies
+        """
+        self.trace = trace
+        self.trace_frames = max(1, trace_frames)
+        self.sample_interval = sample_interval
+        self.ceiling_bytes = ceiling_bytes
+        self.min_uptime = min_uptime
+        self.started = time.time()
+        self._process = psutil.Process()
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=RSS_HISTORY_SIZE)
+        self._last_snapshot = None
+        self._restart = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Starts tracing (if enabled) and background RSS sampling."""
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="memory-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.trace and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _loop(self) -> None:
+        self.sample()
+        while not self._stop.wait(self.sample_interval):
+            self.sample()
+
+    def sample(self) -> int:
+        """Records the current RSS and checks it against the ceiling."""
+        rss = self._process.memory_info().rss
+        now = time.time()
+        with self._lock:
+            self._samples.append((now, rss))
+        if self.ceiling_bytes and rss > self.ceiling_bytes and not self._restart.is_set():
+            if now - self.started >= self.min_uptime:
+                logger.warning(f"RSS {rss} bytes exceeds the ceiling of {self.ceiling_bytes} bytes, "
+                               f"restarting the host after in-flight requests finish")
+                self._restart.set()
+            else:
+                logger.warning(f"RSS {rss} bytes exceeds the ceiling of {self.ceiling_bytes} bytes "
+                               f"within {self.min_uptime}s of start; not restarting")
+        return rss
+
+    @property
+    def restart_requested(self) -> bool:
+        return self._restart.is_set()
+
+    def _snapshot(self):
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def profile(self, top: int = DEFAULT_TOP_SITES) -> Dict[str, Any]:
+        """
+        Returns RSS history and, when tracing, the top allocation sites and the
+        change since the previous profile (which becomes the new baseline).
+        """
+        rss = self.sample()
+        with self._lock:
+            samples = list(self._samples)
+        result: Dict[str, Any] = {
+            "rssBytes": rss,
+            "rssGrowthBytes": rss - samples[0][1],
+            "rssSamples": [{"timestamp": round(t, 3), "rssBytes": value} for t, value in samples],
+            "uptimeSeconds": round(time.time() - self.started, 3),
+            "ceilingBytes": self.ceiling_bytes or None,
+            "restartRequested": self.restart_requested,
+        }
+        if not tracemalloc.is_tracing():
+            result["tracemalloc"] = {"enabled": False}
+            return result
+
+        snapshot = self._snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        top_sites: List[Dict[str, Any]] = [
+            {"site": _format_site(stat), "sizeBytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:top]
+        ]
+        diff: Optional[List[Dict[str, Any]]] = None
+        with self._lock:
+            previous, self._last_snapshot = self._last_snapshot, snapshot
+        if previous is not None:
+            diff = [
+                {"site": _format_site(stat), "sizeDiffBytes": stat.size_diff, "countDiff": stat.count_diff,
+                 "sizeBytes": stat.size}
+                for stat in snapshot.compare_to(previous, "lineno")[:top] if stat.size_diff
+            ]
+        result["tracemalloc"] = {
+            "enabled": True,
+            "tracedBytes": current,
+            "peakTracedBytes": peak,
+            "top": top_sites,
+            # None on the first profile, which only sets the baseline
+            "diff": diff,
+        }
+        return result
@@ -8,8 +8,9 @@ import struct
 import subprocess
 import logging
 from logging.handlers import RotatingFileHandler
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import ujson
+import threading
 import time
 import signal
 import configparser
@@ -17,10 +18,37 @@ import psutil
 import os
 import re
 import platform
-import winreg
+import secrets
 import socket
 import uuid
 import json
+import zlib
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from job_manager import JobManager, JobStepError, JOB_JOURNAL_FILENAME
+from worker_pool import WorkerPool, PRIORITY_INTERACTIVE, PRIORITY_MAINTENANCE
+from wsl_warmup import WSLWarmupManager
+from license_format import check_license, hardware_id_from_info
+from launch_profiles import compile_launch_profiles
+from memory_monitor import MemoryMonitor
+from powershell_worker import PowerShellPool, PowerShellStartError, PowerShellTimeout, PowerShellWorkerError, powershell_argv
+from admission import LEGACY_ACTION, AdmissionController, admission_from_config
+from wsl_updates import (DEFAULT_DISTRO_TIMEOUT, DEFAULT_INVENTORY_MAX_AGE, DEFAULT_UPDATE_WORKERS,
+                         VERSION_INVENTORY_FILENAME, VersionInventory, WSLBrowserUpdater)
+from launch_latency import (KIND_SANDBOX, KIND_WSL, REPLY_WAIT, LaunchWatch, classify_launch, launch_latency,
+                            make_wsl_watcher, message_received_at, watch_local, wsl_program_args)
+from process_tree import ConfinedPopen, kill_tree, tree_stats
+from platform_backend import command_length, get_platform_backend, run_launch_command
+from request_control import (NO_REQUEST, CancelToken, RequestCancelled, RequestRegistry, TokenGroup,
+                             communicate, current_token, deadline_from_message)
+from single_flight import SingleFlight, request_key
+from spawn_stats import account_spawn, current_action, install_audit_hook, run as run_accounted, spawn_stats
+
+# Helpers shared with the scripts that run inside WSL live in wslscripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "wslscripts"))
+from connectivity_probe import run_probes, probe_in_wsl
+import wsl_health
 
 # Function to check and install required modules
 def check_and_install_modules(modules):
@@ -115,82 +143,113 @@ def setup_browser_path_logger():
 logger = setup_logger()
 browser_path_logger = setup_browser_path_logger()
 
+def read_exact(size: int) -> bytes:
+    """
+    Reads exactly size bytes from stdin (fewer only at EOF).
+
+    Reads go to the unbuffered stream so no bytes of the next message are ever
+    held in a Python buffer; the host can then restart itself between messages
+    without losing input.
+    """
+    stream = getattr(sys.stdin.buffer, "raw", sys.stdin.buffer)
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
 def get_message() -> Optional[Dict[str, Any]]:
     """Reads a message from the input stream (stdin) and returns it as a dictionary."""
-    raw_length = sys.stdin.buffer.read(4)
+    raw_length = read_exact(4)
     if len(raw_length) == 0:
         logging.info("No raw_length received")
         return None
     message_length = struct.unpack("@I", raw_length)[0]
-    message = sys.stdin.buffer.read(message_length).decode("utf-8")
+    message = read_exact(message_length).decode("utf-8")
     logging.debug(f"Received message: {message}")
     return ujson.loads(message)
 
+# Serializes writes to stdout from the worker threads
+stdout_lock = threading.Lock()
+
 def send_message(message: Dict[str, Any]) -> None:
     """Sends a message to the output stream (stdout)."""
     message_json = ujson.dumps(message).encode("utf-8")
     packed_message = struct.pack("@I", len(message_json)) + message_json
-    sys.stdout.buffer.write(packed_message)
-    sys.stdout.buffer.flush()
+    with stdout_lock:
+        sys.stdout.buffer.write(packed_message)
+        sys.stdout.buffer.flush()
     logging.debug(f'Sent message: {message_json.decode("utf-8")}')
 
-def run_command(command: str) -> str:
+def run_command(command: str, timeout: int = 10) -> str:
     """Runs a shell command with improved error handling and timeout."""
     try:
         logging.debug(f"Running command: {command}")
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            shell=True,
-            text=True,
-            encoding='utf-8',
-            errors='replace'
-        )
-        
-        try:
-            stdout, stderr = process.communicate(timeout=10)  # 10 second timeout
-            if process.returncode != 0:
-                error_message = f'Command failed with return code {process.returncode}: {stderr}'
-                logging.error(error_message)
-                return error_message
-            
-            result = stdout.strip()
-            logging.debug(f"Command result: {result}")
-            return result
-            
-        except subprocess.TimeoutExpired:
-            process.kill()
-            logging.error("Command timed out")
-            return "Error: Command timed out"
+        with account_spawn(command):
+            process = ConfinedPopen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                shell=True,
+                text=True,
+                encoding='utf-8',
+                errors='replace'
+            )
+
+            try:
+                stdout, stderr = communicate(process, timeout)
+            except subprocess.TimeoutExpired:
+                # Kill what the shell started too, not only the shell
+                kill_tree(process)
+                process.communicate()
+                logging.error("Command timed out")
+                return "Error: Command timed out"
+
+        if process.returncode != 0:
+            error_message = f'Command failed with return code {process.returncode}: {stderr}'
+            logging.error(error_message)
+            return error_message
+
+        result = stdout.strip()
+        logging.debug(f"Command result: {result}")
+        return result
             
     except Exception as e:
         error_message = f"Error running command: {str(e)}"
         logging.error(error_message)
         return error_message
 
-def run_command_with_retry(command: str, url: Optional[str], max_retries: int = 3, retry_delay: float = 1.0) -> str:
-    """Runs a command with retry logic, handling 'runas' if required."""
+def run_command_with_retry(command: str, url: Optional[str], max_retries: int = 3, retry_delay: float = 1.0,
+                           urls: Optional[List[str]] = None) -> str:
+    """Runs a command with retry logic, handling 'runas' if required.
+
+    When 'urls' is given, all of them are opened by a single launch instead of 'url'.
+    Retry sleeps end early if the request is cancelled or reaches its deadline.
+    """
+    token = current_token.get()
     for attempt in range(max_retries):
+        token.check()
         try:
-            result = run_command_with_url(command, url)
+            if urls is not None:
+                result = run_command_with_urls(command, urls)
+            else:
+                result = run_command_with_url(command, url)
             if "Error" not in result:
                 return result
             logging.warning(f"Command failed (attempt {attempt + 1}/{max_retries}): {result}")
-            time.sleep(retry_delay)
+            token.sleep(retry_delay)
         except Exception as e:
             logging.error(f"Exception occurred (attempt {attempt + 1}/{max_retries}): {e}")
-            time.sleep(retry_delay)
+            token.sleep(retry_delay)
     return f"Command failed after {max_retries} attempts"
 
 import psutil
 
 def is_sandbox_running():
     """Check if Windows Sandbox is already running."""
-    for proc in psutil.process_iter(['name']):
-        if proc.info['name'] and proc.info['name'].lower() == 'windowssandbox.exe':
-            return True
-    return False
+    return get_platform_backend().is_process_running('windowssandbox.exe')
 
 def open_url_in_sandbox_edge(url):
     """
@@ -328,10 +387,11 @@ def open_in_sandbox(url):
         logging.info(f"Executing command: {cmd}")
         
         # Use subprocess.Popen to launch the sandbox
-        subprocess.Popen(cmd, shell=True)
+        with account_spawn(cmd):
+            subprocess.Popen(cmd, shell=True)
         
         # Allow some time for Windows Sandbox to launch before returning
-        time.sleep(2)
+        current_token.get().sleep(2)
         
         return f"Opening {url} in Windows Sandbox"
     except Exception as e:
@@ -339,60 +399,23 @@ def open_in_sandbox(url):
         logging.error(error_msg)
         return error_msg
 
-def get_browser_version(registry_key: str) -> str:
-    """Gets the browser version from the Windows registry with improved error handling and architecture support."""
-    try:
-        # First try the direct registry key
-        command = f'reg query "{registry_key}" /v version'
-        logging.debug(f"Running registry command: {command}")
-        result = run_command(command)
-        
-        if "ERROR" in result or "The system was unable to find" in result:
-            # If direct key fails, try WOW6432Node path if not already trying it
-            if "WOW6432Node" not in registry_key:
-                wow64_key = registry_key.replace("Software\\", "Software\\WOW6432Node\\")
-                command = f'reg query "{wow64_key}" /v version'
-                logging.debug(f"Trying WOW6432Node registry command: {command}")
-                result = run_command(command)
-
-        logging.debug(f"Registry query result: {result}")
-        
-        # Process the result
-        if "ERROR" not in result and "The system was unable to find" not in result:
-            for line in result.split("\n"):
-                if "version" in line.lower():
-                    version = line.split()[-1]
-                    # Validate version format (should be like xx.x.xxx.xx)
-                    if re.match(r'^\d+\.\d+\.\d+\.\d+$', version):
-                        logging.debug(f"Extracted valid browser version: {version}")
-                        return version
-                    else:
-                        logging.warning(f"Invalid version format found: {version}")
-                        return f"Error: Invalid version format: {version}"
-            
-            logging.warning("Version not found in registry output")
-            return "Error: Version not found in registry output"
-        else:
-            logging.warning(f"Registry key not found: {registry_key}")
-            return f"Error: Registry key not found: {registry_key}"
-            
-    except Exception as e:
-        error_message = f"Error getting browser version: {str(e)}"
-        logging.error(error_message)
-        return error_message
+def get_browser_version(query: str) -> str:
+    """Gets a browser version (a registry key on Windows; a binary, .desktop id or registry key on Linux)."""
+    return get_platform_backend().get_browser_version(query)
 
 def get_wsl_instances():
     """Gets a list of installed WSL instances."""
     try:
+        # Read from the registry when possible instead of spawning wsl.exe
+        instances = get_platform_backend().get_wsl_distros()
+        if instances is not None:
+            logging.debug(f"WSL instances: {instances}")
+            return instances
         result = run_command("wsl --list --quiet")
-        instances = result.split("\n")
-        # Remove empty strings and strip whitespace
+        # wsl.exe writes UTF-16: drop the null bytes before stripping, or each
+        # line break leaves a "\x00" entry that survives strip()
+        instances = result.replace("\x00", "").split("\n")
         instances = [instance.strip() for instance in instances if instance.strip()]
-        # Remove null characters and decode properly
-        instances = [
-            instance.replace("\x00", "").encode("utf-16-le").decode("utf-16-le")
-            for instance in instances
-        ]
         logging.debug(f"WSL instances: {instances}")
         return instances
     except Exception as e:
@@ -403,40 +426,64 @@ def create_wsl_instance():
     """Creates a new WSL instance (handled by the extension)."""
     return "WSL instance creation is handled by the extension. Please check the PowerShell window for details."
 
+# Timeout for a single WSL job step; installs can take several minutes
+WSL_JOB_STEP_TIMEOUT = 30 * 60
+
+job_manager = None
+
+def get_job_manager() -> JobManager:
+    """Returns the process-wide job manager, loading the journal on first use."""
+    global job_manager
+    if job_manager is None:
+        job_manager = JobManager(JOB_JOURNAL_FILENAME)
+    return job_manager
+
+def run_job_command(job, command: str, timeout: int = WSL_JOB_STEP_TIMEOUT) -> str:
+    """Runs a command as a job step, raising JobStepError if it fails."""
+    job.check_cancelled()
+    result = run_command(command, timeout=timeout)
+    if result.startswith(("Error", "Command failed")):
+        raise JobStepError(result)
+    return result
+
 def delete_wsl_instance(instance):
-    """Deletes a specified WSL instance."""
-    try:
-        result = run_command(f"wsl --unregister {instance}")
-        logging.info(f"Deleted WSL instance: {instance}")
-        return f"Deleted WSL instance: {instance}"
-    except Exception as e:
-        logging.error(f"Error deleting WSL instance: {e}")
-        return f"Error deleting WSL instance: {e}"
+    """Starts a background job that unregisters a WSL instance and returns its job ID."""
+    steps = [
+        ("unregister", lambda job: run_job_command(job, f"wsl --unregister {instance}")),
+    ]
+    job_id = get_job_manager().submit(
+        "deleteWSLInstance", steps, {"instance": instance},
+        runner=lambda body: run_wsl_job(instance, body))
+    logging.info(f"Started job {job_id} to delete WSL instance: {instance}")
+    return job_id
 
 def reinstate_wsl_instance(instance):
-    """Reinstates a WSL instance by unregistering, reinstalling, and setting up browsers."""
-    try:
-        run_command(f"wsl --unregister {instance}")
-        run_command(f"wsl --install -d {instance}")
-        run_command(f'wsl -d {instance} bash -c "./wslscripts/wsl-install-browsers.sh"')
-        logging.info(f"Reinstated WSL instance: {instance}")
-        return f"Reinstated WSL instance: {instance}"
-    except Exception as e:
-        logging.error(f"Error reinstating WSL instance: {e}")
-        return f"Error reinstating WSL instance: {e}"
+    """Starts a background job that unregisters, reinstalls and sets up browsers for a WSL instance."""
+    steps = [
+        ("unregister", lambda job: run_job_command(job, f"wsl --unregister {instance}")),
+        ("install", lambda job: run_job_command(job, f"wsl --install -d {instance}")),
+        ("installBrowsers", lambda job: run_job_command(
+            job, f'wsl -d {instance} bash -c "./wslscripts/wsl-install-browsers.sh"')),
+    ]
+    job_id = get_job_manager().submit(
+        "reinstateWSLInstance", steps, {"instance": instance},
+        runner=lambda body: run_wsl_job(instance, body))
+    logging.info(f"Started job {job_id} to reinstate WSL instance: {instance}")
+    return job_id
 
 def check_wsl_instance_folder(instance):
     """Checks if a folder for a WSL instance exists."""
     try:
         wsl_dir = f"c:\\WSL\\{instance}"
-        result = run_command(
-            f'if exist "{wsl_dir}" (echo exists) else (echo available)'
-        )
-        return result.strip()
+        return "exists" if os.path.exists(wsl_dir) else "available"
     except Exception as e:
         logging.error(f"Error checking WSL instance folder: {e}")
         return f"Error checking WSL instance folder: {e}"
 
+def check_wsl_instance_folders(instances: List[str]) -> Dict[str, str]:
+    """Checks the folders of many WSL instances at once."""
+    return {instance: check_wsl_instance_folder(instance) for instance in dict.fromkeys(instances)}
+
 def validate_input(message: Dict[str, Any]) -> bool:
     """Validates the input message to ensure it contains the required fields."""
     # Log the received message for debugging
@@ -456,10 +503,15 @@ def validate_input(message: Dict[str, Any]) -> bool:
         if not isinstance(action, str):
             logging.error("'action' is not a string")
             return False
+        for field in ("deadline", "timeoutMs"):
+            if field in message and (isinstance(message[field], bool) or
+                                     not isinstance(message[field], (int, float))):
+                logging.error(f"Invalid '{field}' for '{action}' action")
+                return False
         if action == "getBrowserVersion":
-            if "registryKey" not in message or not isinstance(
-                message["registryKey"], str
-            ):
+            # Linux hosts also take a browser binary or .desktop id as 'browser'
+            query = message.get("registryKey", message.get("browser"))
+            if not isinstance(query, str):
                 logging.error(
                     "Missing or invalid 'registryKey' for 'getBrowserVersion' action"
                 )
@@ -472,6 +524,72 @@ def validate_input(message: Dict[str, Any]) -> bool:
             if "url" not in message or not isinstance(message["url"], str):
                 logging.error("Missing or invalid 'url' for 'openInSandbox' action")
                 return False
+        elif action == "openUrls":
+            if "command" not in message or not isinstance(message["command"], str):
+                logging.error("Missing or invalid 'command' for 'openUrls' action")
+                return False
+            urls = message.get("urls")
+            if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+                logging.error("Missing or invalid 'urls' for 'openUrls' action")
+                return False
+        elif action == "probeConnectivity":
+            if "distro" in message and not isinstance(message["distro"], str):
+                logging.error("Invalid 'distro' for 'probeConnectivity' action")
+                return False
+            if "timeout" in message and not isinstance(message["timeout"], (int, float)):
+                logging.error("Invalid 'timeout' for 'probeConnectivity' action")
+                return False
+        elif action == "openWithProfile":
+            if "profile" not in message or not isinstance(message["profile"], str):
+                logging.error("Missing or invalid 'profile' for 'openWithProfile' action")
+                return False
+            urls = message.get("urls", [])
+            if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+                logging.error("Invalid 'urls' for 'openWithProfile' action")
+                return False
+            if "url" in message and not isinstance(message["url"], str):
+                logging.error("Invalid 'url' for 'openWithProfile' action")
+                return False
+        elif action == "getMemoryProfile":
+            if "top" in message and (not isinstance(message["top"], int) or message["top"] < 1):
+                logging.error("Invalid 'top' for 'getMemoryProfile' action")
+                return False
+        elif action == "validateLicense":
+            if "licenseKey" not in message or not isinstance(message["licenseKey"], str):
+                logging.error("Missing or invalid 'licenseKey' for 'validateLicense' action")
+                return False
+            if "refreshFingerprint" in message and not isinstance(message["refreshFingerprint"], bool):
+                logging.error("Invalid 'refreshFingerprint' for 'validateLicense' action")
+                return False
+        elif action == "sweepWSLHealth":
+            if "workers" in message and (not isinstance(message["workers"], int) or message["workers"] < 1):
+                logging.error("Invalid 'workers' for 'sweepWSLHealth' action")
+                return False
+        elif action == "updateWSLBrowsers":
+            distros = message.get("distros")
+            if distros is not None and (not isinstance(distros, list) or
+                                        not all(isinstance(name, str) and name for name in distros)):
+                logging.error("Invalid 'distros' for 'updateWSLBrowsers' action")
+                return False
+            if "workers" in message and (not isinstance(message["workers"], int) or message["workers"] < 1):
+                logging.error("Invalid 'workers' for 'updateWSLBrowsers' action")
+                return False
+            if "force" in message and not isinstance(message["force"], bool):
+                logging.error("Invalid 'force' for 'updateWSLBrowsers' action")
+                return False
+        elif action == "checkWSLInstanceFolders":
+            instances = message.get("instances")
+            if not isinstance(instances, list) or not all(isinstance(name, str) for name in instances):
+                logging.error("Missing or invalid 'instances' for 'checkWSLInstanceFolders' action")
+                return False
+        elif action == "cancel":
+            if not isinstance(message.get("targetRequestId"), (str, int)):
+                logging.error("Missing or invalid 'targetRequestId' for 'cancel' action")
+                return False
+        elif action in ["getSpawnStats", "getLaunchLatency"]:
+            if "reset" in message and not isinstance(message["reset"], bool):
+                logging.error(f"Invalid 'reset' for '{action}' action")
+                return False
         elif action == "executePowerShellScript":
             if "scriptPath" not in message or not isinstance(message["scriptPath"], str):
                 logging.error("Missing or invalid 'scriptPath' for 'executePowerShellScript' action")
@@ -481,7 +599,11 @@ def validate_input(message: Dict[str, Any]) -> bool:
             "createWSLInstance",
             "checkWSLInstanceFolder",
             "getHardwareInfo",  
-            "ping"              
+            "ping",
+            "getSchedulerStats",
+            "getWSLWarmupStatus",
+            "getWSLHealth",
+            "getLaunchProfiles"
         ]:
             if action == "checkWSLInstanceFolder":
                 if "instance" not in message or not isinstance(
@@ -498,6 +620,14 @@ def validate_input(message: Dict[str, Any]) -> bool:
                     f"Missing or invalid 'instance' for '{action}' action"
                 )
                 return False
+        elif action == "listJobs":
+            if "status" in message and not isinstance(message["status"], str):
+                logging.error("Invalid 'status' for 'listJobs' action")
+                return False
+        elif action in ["getJobStatus", "cancelJob"]:
+            if "jobId" not in message or not isinstance(message["jobId"], str):
+                logging.error(f"Missing or invalid 'jobId' for '{action}' action")
+                return False
         else:
             logging.error(f"Unknown action: {action}")
             return False
@@ -523,81 +653,191 @@ def load_config(config_file: str = "config.ini") -> configparser.ConfigParser:
     config.read(config_file)
     return config
 
-def run_command_with_url(command: str, url: Optional[str], timeout: int = 30) -> str:
-    """Runs a shell command with a URL and handles 'runas' for privilege elevation."""
-    try:
-        # Check if the command requires `runas.exe`
-        if command.startswith("runas"):
-            full_command = command  # runas command should be passed as-is
-        else:
-            if command.startswith("cmd /c start powershell.exe"):
-                full_command = command  # Don't add URL for PowerShell
-            elif "wsl" in command.lower():
-                # Special handling for browsers in WSL
-                if "firefox" in command.lower():
-                    # Firefox needs special handling with DISPLAY environment variable
-                    # Use -new-tab to ensure the URL opens in a new tab if Firefox is already running
-                    full_command = f'{command} -new-tab "{url}"' if url else command
-                elif "chrome" in command.lower() or "edge" in command.lower():
-                    # Add --no-sandbox for Chrome and Edge in WSL
-                    full_command = f'{command} --no-sandbox "{url}"' if url else f'{command} --no-sandbox'
-                else:
-                    full_command = f'{command} "{url}"' if url else command
-            elif command.strip().lower() == "windowssandbox":
-                # Always use the open_in_sandbox function which now handles already running instances
-                if url:
-                    return open_in_sandbox(url)
-                else:
-                    # Just launch Sandbox without a URL if none provided
-                    sandbox_path = os.path.expandvars(r"%windir%\system32\WindowsSandbox.exe")
-                    full_command = f'"{sandbox_path}"'
-            else:
-                # For Windows local browsers, ensure proper quoting
-                if command.endswith('.exe') or command.endswith('.EXE'):
-                    full_command = f'"{command}" "{url}"' if url else f'"{command}"'
-                else:
-                    full_command = f'{command} "{url}"' if url else command
+def build_launch_command(command: str, urls: List[str]):
+    """Builds the shell command (Windows) or argv (Linux) that opens the given URLs with a browser command."""
+    return get_platform_backend().build_launch_command(command, urls)
 
-        logging.debug(f"Running command: {full_command}")
-        
-        # Use subprocess.Popen with shell=True for Windows
-        if os.name == 'nt':
-            process = subprocess.Popen(
-                full_command, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE, 
-                shell=True,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
-        else:
-            # For non-Windows systems
-            process = subprocess.Popen(
-                full_command, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE, 
-                shell=True
-            )
-            
-        try:
-            stdout, stderr = process.communicate(timeout=timeout)
-        except subprocess.TimeoutExpired:
-            process.kill()
-            stdout, stderr = process.communicate()
-            return f"Command timed out after {timeout} seconds"
-
-        if process.returncode != 0 and stderr:
-            error_text = stderr.decode("utf-8", errors="replace").strip()
-            logging.error(f"Command failed with exit code {process.returncode}: {error_text}")
-            return f"Error: Command failed with exit code {process.returncode}: {error_text}"
-            
-        result = stdout.decode("utf-8", errors="replace").strip()
-        logging.debug(f"Command result: {result}")
-        return result
+def run_command_with_urls(command: str, urls: List[str], timeout: int = 30) -> str:
+    """Runs a browser command that opens several URLs in a single launch."""
+    try:
+        return get_platform_backend().launch(command, urls, timeout)
     except Exception as e:
         error_message = f"Error running command: {str(e)}"
         logging.error(error_message, exc_info=True)
         return error_message
 
+def run_command_with_url(command: str, url: Optional[str], timeout: int = 30) -> str:
+    """Runs a shell command with a URL and handles 'runas' for privilege elevation."""
+    # Always use the open_in_sandbox function which now handles already running instances
+    if command.strip().lower() == "windowssandbox" and url:
+        return open_in_sandbox(url)
+    return run_command_with_urls(command, [url] if url else [], timeout)
+
+# Command line limits: cmd.exe accepts 8191 characters; on POSIX the whole
+# command is a single `sh -c` argument, limited to MAX_ARG_STRLEN (128 KiB).
+WINDOWS_COMMAND_LINE_LIMIT = 8191
+POSIX_COMMAND_LINE_LIMIT = 131072
+COMMAND_LINE_MARGIN = 256
+OPEN_URLS_MAX_PARALLEL = 4
+
+def get_command_line_limit() -> int:
+    """Returns the usable command line length for launch commands on this platform."""
+    limit = WINDOWS_COMMAND_LINE_LIMIT if os.name == 'nt' else POSIX_COMMAND_LINE_LIMIT
+    return limit - COMMAND_LINE_MARGIN
+
+def chunk_urls_for_command(command: str, urls: List[str], limit: Optional[int] = None):
+    """
+    Packs URLs into as few launch commands as fit under the command line limit.
+
+    Returns:
+        A tuple (chunks, too_long) where chunks is a list of URL lists and
+        too_long lists URLs that do not fit in a command on their own.
+    """
+    limit = limit or get_command_line_limit()
+    base_length = command_length(build_launch_command(command, []))
+    chunks, too_long = [], []
+    current, current_length = [], base_length
+    for url in urls:
+        url_length = command_length(build_launch_command(command, [url])) - base_length
+        if base_length + url_length > limit:
+            too_long.append(url)
+            continue
+        if current and current_length + url_length > limit:
+            chunks.append(current)
+            current, current_length = [], base_length
+        current.append(url)
+        current_length += url_length
+    if current:
+        chunks.append(current)
+    return chunks, too_long
+
+def is_command_error(result: str) -> bool:
+    """Returns True if a run_command_with_url style result describes a failure."""
+    # A timeout is not a failure: a first browser launch keeps the child running
+    return "Error" in result or result.startswith("Command failed")
+
+def launch_url_chunk(command: str, chunk: List[str]) -> str:
+    """
+    Launches one chunk of open_urls.
+
+    A single URL is retried like runCommand; a failed launch of several URLs
+    is reported as is, since it may already have opened some of the tabs and
+    a retry would open them twice.
+    """
+    if len(chunk) == 1:
+        return run_command_with_retry(command, None, urls=chunk)
+    current_token.get().check()
+    return run_command_with_urls(command, chunk)
+
+def open_urls(command: str, urls: List[str]) -> Dict[str, Any]:
+    """
+    Opens many URLs with one browser command using as few launches as possible.
+
+    URLs are de-duplicated (keeping the first occurrence), packed into
+    command-line-length-aware chunks and the chunks are launched in parallel;
+    only single-URL chunks are retried (see launch_url_chunk).
+
+    Returns:
+        {"results": [{"url", "status", "result"}...], "launches": n}, with
+        one entry per requested URL in request order.
+    """
+    unique_urls = list(dict.fromkeys(url for url in urls if url))
+    outcomes = {}
+
+    if command.startswith("runas") or command.startswith("cmd /c start powershell.exe"):
+        return {"error": "Command does not accept URLs"}
+
+    watch = watch_launch(command) if unique_urls else None
+    if command.strip().lower() == "windowssandbox":
+        # The sandbox takes one URL per launcher file
+        for url in unique_urls:
+            outcomes[url] = open_in_sandbox(url)
+        launches = len(unique_urls)
+    elif send_to_wsl_agent(command, unique_urls):
+        for url in unique_urls:
+            outcomes[url] = "Opened through the WSL launcher agent"
+        launches = 0
+    else:
+        chunks, too_long = chunk_urls_for_command(command, unique_urls)
+        for url in too_long:
+            outcomes[url] = "Error: URL exceeds the command line length limit"
+        logging.info(f"Opening {len(unique_urls)} URLs in {len(chunks)} launches")
+
+        with ThreadPoolExecutor(max_workers=OPEN_URLS_MAX_PARALLEL) as executor:
+            # Each launch runs in a copy of this context so its spawns count against the action
+            futures = {
+                executor.submit(contextvars.copy_context().run, launch_url_chunk, command, chunk): chunk
+                for chunk in chunks
+            }
+            for future, chunk in futures.items():
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = f"Error running command: {str(e)}"
+                for url in chunk:
+                    outcomes[url] = result
+        launches = len(chunks)
+
+    results = []
+    for url in urls:
+        result = outcomes.get(url, "Error: Empty URL")
+        results.append({
+            "url": url,
+            "status": "error" if is_command_error(result) else "ok",
+            "result": result,
+        })
+    response = {"results": results, "launches": launches}
+    if watch:
+        response["launchLatency"] = watch.finish(all(result["status"] == "error" for result in results),
+                                                 LAUNCH_REPLY_WAIT)
+    return response
+
+# Pooled PowerShell workers (overridden from the [PowerShell] section of config.ini)
+POWERSHELL_POOLED = True
+POWERSHELL_EXECUTABLE = "powershell.exe" if os.name == "nt" else "pwsh"
+POWERSHELL_WORKERS = 1
+POWERSHELL_MAX_SCRIPTS = 100
+POWERSHELL_SCRIPT_TIMEOUT = 60
+
+powershell_pool = None
+powershell_pool_lock = threading.Lock()
+
+def get_powershell_pool() -> PowerShellPool:
+    """Returns the PowerShell worker pool, creating it (without starting a worker) on first use."""
+    global powershell_pool
+    with powershell_pool_lock:
+        if powershell_pool is None:
+            powershell_pool = PowerShellPool(powershell_argv(POWERSHELL_EXECUTABLE), size=POWERSHELL_WORKERS,
+                                             max_scripts=POWERSHELL_MAX_SCRIPTS)
+        return powershell_pool
+
+def run_pooled_powershell_script(full_script_path: str) -> Optional[str]:
+    """Runs a script on a pooled PowerShell worker; returns None if no worker could be started."""
+    global POWERSHELL_POOLED
+    try:
+        result = get_powershell_pool().run(full_script_path, POWERSHELL_SCRIPT_TIMEOUT)
+    except PowerShellStartError as e:
+        # Don't pay for a failed start on every call; scripts run directly from now on
+        browser_path_logger.warning(f"PowerShell worker unavailable, running scripts directly: {e}")
+        POWERSHELL_POOLED = False
+        return None
+    except PowerShellTimeout:
+        error_msg = f"Script execution timed out after {POWERSHELL_SCRIPT_TIMEOUT} seconds"
+        browser_path_logger.error(error_msg)
+        return error_msg
+    except PowerShellWorkerError as e:
+        # Not retried directly: the script may have done part of its work
+        error_msg = f"Script execution failed: {e}"
+        browser_path_logger.error(error_msg)
+        return error_msg
+    if result.exit_code != 0:
+        error_msg = f"Script execution failed with exit code {result.exit_code}: {result.error}"
+        browser_path_logger.error(error_msg)
+        return error_msg
+    browser_path_logger.info("Script execution completed successfully")
+    browser_path_logger.debug(f"Script output: {result.output[:200]}...")  # Log first 200 chars
+    return result.output
+
 def execute_powershell_script(script_path: str) -> str:
     """Execute a PowerShell script and return its output."""
     browser_path_logger.info(f"Executing PowerShell script: {script_path}")
@@ -624,6 +864,11 @@ def execute_powershell_script(script_path: str) -> str:
         browser_path_logger.error(error_msg)
         return error_msg
     
+    if POWERSHELL_POOLED:
+        result = run_pooled_powershell_script(full_script_path)
+        if result is not None:
+            return result
+
     try:
         browser_path_logger.info("Starting script execution")
         # Use a more robust approach to execute PowerShell
@@ -631,12 +876,12 @@ def execute_powershell_script(script_path: str) -> str:
         browser_path_logger.info(f"Executing command: {' '.join(cmd)}")
         
         # Run with a timeout to prevent hanging
-        result = subprocess.run(
+        result = run_accounted(
             cmd,
             capture_output=True,
             text=True,
             check=True,
-            timeout=60  # 60 second timeout
+            timeout=POWERSHELL_SCRIPT_TIMEOUT
         )
         
         browser_path_logger.info("Script execution completed successfully")
@@ -647,7 +892,7 @@ def execute_powershell_script(script_path: str) -> str:
         browser_path_logger.error(error_msg)
         return error_msg
     except subprocess.TimeoutExpired:
-        error_msg = "Script execution timed out after 60 seconds"
+        error_msg = f"Script execution timed out after {POWERSHELL_SCRIPT_TIMEOUT} seconds"
         browser_path_logger.error(error_msg)
         return error_msg
     except Exception as e:
@@ -657,310 +902,852 @@ def execute_powershell_script(script_path: str) -> str:
 
 # Add a function to get hardware information for licensing
 def get_hardware_info():
+    """Collects the hardware fingerprint for license validation (see platform_backend.py)."""
+    return get_platform_backend().get_hardware_info()
+
+# Collecting the hardware fingerprint runs several fsutil/wmic processes, so its
+# digest is memoized for the life of the process and cached on disk between runs.
+HARDWARE_ID_CACHE_FILENAME = "HardwareId.json"
+HARDWARE_ID_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+
+hardware_id = None
+hardware_id_lock = threading.Lock()
+
+def get_hardware_id_anchor() -> Dict[str, str]:
+    """Cheap identifiers (no processes spawned) that tie the on-disk cache to this machine."""
+    return {"node": platform.node(), "machineId": str(uuid.getnode())}
+
+def get_hardware_id(refresh: bool = False) -> str:
     """
-    Collect hardware-specific information for license validation
-    Returns a hardware fingerprint that can be used for license key validation
+    Returns this device's hardware ID, the digest background.js derives from getHardwareInfo.
+
+    Args:
+        refresh: Recollect the fingerprint instead of using the memoized digest
     """
-    hardware_info = {}
-    
+    global hardware_id
+    with hardware_id_lock:
+        if hardware_id and not refresh:
+            return hardware_id
+        anchor = get_hardware_id_anchor()
+        if not refresh:
+            try:
+                with open(HARDWARE_ID_CACHE_FILENAME, "r", encoding="utf-8") as f:
+                    cached = json.load(f)
+                if cached.get("anchor") == anchor and \
+                        time.time() - cached.get("timestamp", 0) < HARDWARE_ID_CACHE_MAX_AGE:
+                    hardware_id = cached["hardwareId"]
+                    return hardware_id
+            except (OSError, ValueError, KeyError, AttributeError):
+                pass
+
+        hardware_info = get_hardware_info()
+        hardware_id = hardware_id_from_info(hardware_info)
+        if "error" not in hardware_info:
+            # A fallback fingerprint is not cached so the next run tries again
+            try:
+                temp_path = f"{HARDWARE_ID_CACHE_FILENAME}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump({"hardwareId": hardware_id, "anchor": anchor, "timestamp": time.time()}, f)
+                os.replace(temp_path, HARDWARE_ID_CACHE_FILENAME)
+            except OSError as e:
+                logging.warning(f"Could not cache hardware ID: {e}")
+        return hardware_id
+
+# Launch profiles from the [LaunchProfile:<name>] sections of config.ini,
+# compiled once at startup (see launch_profiles.py)
+LAUNCH_PROFILES = {}
+
+def open_with_profile(name: str, urls: List[str]) -> Dict[str, Any]:
+    """Opens URLs with a precompiled launch profile."""
+    profile = LAUNCH_PROFILES.get(name)
+    if profile is None:
+        return {"success": False, "error": f"Unknown launch profile: {name}"}
+    distro = get_wsl_distro(profile.command) if wsl_warmup else None
+    wsl_state = wsl_warmup.state_of(distro) if distro else None
+    watch = watch_launch(profile.command)
     try:
-        # Get system information
-        hardware_info['platform'] = str(platform.system())
-        hardware_info['processor'] = str(platform.processor())
-        hardware_info['machine'] = str(platform.machine())
-        hardware_info['node'] = str(platform.node())
-        
-        logging.info("Collecting hardware information for license validation")
-        
-        # Get MAC address (more unique than other identifiers)
-        mac = get_mac_address()
-        if mac:
-            hardware_info['mac'] = str(mac)
-            logging.info("MAC address collected successfully")
-        else:
-            logging.warning("Failed to collect MAC address")
-            
-        # Get volume serial number
-        volume_serial = get_volume_serial()
-        if volume_serial:
-            hardware_info['volume_serial'] = str(volume_serial)
-            logging.info("Volume serial collected successfully")
-        else:
-            logging.warning("Failed to collect volume serial number")
-            
-        # Get BIOS serial
-        bios_serial = get_bios_serial()
-        if bios_serial:
-            hardware_info['bios_serial'] = str(bios_serial)
-            logging.info("BIOS serial collected successfully")
-        else:
-            logging.warning("Failed to collect BIOS serial")
-            
-        # Get CPU ID
-        cpu_id = get_cpu_id()
-        if cpu_id:
-            hardware_info['cpu_id'] = str(cpu_id)
-            logging.info("CPU ID collected successfully")
-        else:
-            logging.warning("Failed to collect CPU ID")
-            
-        # Fallback to more generic methods if needed
-        if len(hardware_info) < 3:
-            logging.warning("Less than 3 hardware identifiers collected, falling back to generic methods")
-            # Add hostname
-            hardware_info['hostname'] = str(socket.gethostname())
-            
-            # Add Python-based UUID
-            hardware_info['machine_id'] = str(uuid.getnode())
-            
-        logging.info(f"Hardware info collection complete. Collected {len(hardware_info)} data points")
-        
-        # Ensure all values are strings to prevent JSON serialization issues
-        for key in hardware_info:
-            if not isinstance(hardware_info[key], str):
-                hardware_info[key] = str(hardware_info[key])
-                
-        # Debug the hardware info object
-        logging.info(f"Final hardware_info content: {str(hardware_info)[:200]}...")
-        
-    except Exception as e:
-        logging.error(f"Error getting hardware info: {str(e)}", exc_info=True)
-        # Return minimal system info if we fail to get more specific hardware data
-        fallback_info = {
-            'platform': str(platform.system()),
-            'hostname': str(socket.gethostname()),
-            'machine_id': str(uuid.getnode()),
-            'error': str(e)
-        }
-        logging.info(f"Returning fallback hardware info: {fallback_info}")
-        return fallback_info
-        
-    return hardware_info
+        result = run_launch_command(profile.build_argv(urls), profile.timeout)
+    except OSError as e:
+        result = f"Error running command: {e}"
+        logging.error(f"Launch profile {name} failed: {e}")
+    response = {"result": result, "profile": name}
+    add_launch_latency(response, watch, result)
+    if wsl_state:
+        response["wslState"] = wsl_state
+        if not is_command_error(result):
+            wsl_warmup.touch(distro)
+    return response
+
+# Memory profiling (overridden from the [MemoryProfile] section of config.ini)
+MEMORY_TRACE_ENABLED = False
+MEMORY_TRACE_FRAMES = 1
+MEMORY_SAMPLE_INTERVAL = 30
+MEMORY_CEILING_MB = 0
+# Restarts so far in this host session, carried across exec
+HOST_RESTART_ENV = "BROWSER_LAUNCHER_RESTARTS"
+
+memory_monitor = None
+memory_monitor_lock = threading.Lock()
+
+def get_memory_monitor() -> MemoryMonitor:
+    """Returns the memory monitor, creating it (without tracing) on first use if profiling is off."""
+    global memory_monitor
+    with memory_monitor_lock:
+        if memory_monitor is None:
+            memory_monitor = MemoryMonitor(
+                trace=MEMORY_TRACE_ENABLED,
+                trace_frames=MEMORY_TRACE_FRAMES,
+                sample_interval=MEMORY_SAMPLE_INTERVAL,
+                ceiling_bytes=MEMORY_CEILING_MB * 1024 * 1024
+            )
+        return memory_monitor
+
+def host_restart_due() -> bool:
+    """
+    Returns True if the memory monitor asked for a restart and it can happen now.
+
+    The restart waits for the next message after maintenance work (jobs such
+    as a WSL reinstall or a browser update) has finished, so draining the
+    pool before it only waits for interactive requests.
+    """
+    if not (memory_monitor and memory_monitor.restart_requested):
+        return False
+    return scheduler is None or not scheduler.active(PRIORITY_MAINTENANCE)
+
+def restart_host() -> None:
+    """
+    Replaces the host process with a fresh copy that keeps the extension's pipes.
+
+    Called from the main loop between messages, so no input is lost; queued
+    requests are finished and answered first. POSIX only: on Windows
+    os.execv starts a new process and ends this one, and the browser closes
+    the port when the process it started exits, so the host exits instead.
+    """
+    restarts = int(os.environ.get(HOST_RESTART_ENV, "0")) + 1
+    logging.warning(f"Restarting native messaging host (restart {restarts}) to release memory")
+    get_scheduler().shutdown(wait=True)
+    if powershell_pool is not None:
+        powershell_pool.close()
+    sys.stdout.flush()
+    logging.shutdown()
+    os.environ[HOST_RESTART_ENV] = str(restarts)
+    if getattr(sys, "frozen", False):
+        os.execv(sys.executable, sys.argv)
+    else:
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+# Actions that run on the maintenance worker class so they never delay launches.
+# WSL delete/reinstate only submit a job here; the job itself runs as maintenance.
+MAINTENANCE_ACTIONS = {"executePowerShellScript"}
+
+# Actions answered on the reader thread; they must never wait behind queued work
+INLINE_ACTIONS = {"cancel"}
+
+# Worker limits per priority class (overridden from config.ini)
+SCHEDULER_INTERACTIVE_WORKERS = 4
+SCHEDULER_MAINTENANCE_WORKERS = 2
+
+scheduler = None
+
+def get_scheduler() -> WorkerPool:
+    """Returns the process-wide worker pool, creating it on first use."""
+    global scheduler
+    if scheduler is None:
+        scheduler = WorkerPool({
+            PRIORITY_INTERACTIVE: SCHEDULER_INTERACTIVE_WORKERS,
+            PRIORITY_MAINTENANCE: SCHEDULER_MAINTENANCE_WORKERS,
+        })
+    return scheduler
+
+def wsl_resource_key(instance: str) -> str:
+    """Returns the worker pool lock key for a WSL distro."""
+    return f"wsl:{instance.strip().lower()}"
+
+WSL_DISTRO_PATTERN = re.compile(r'\bwsl(?:\.exe)?\s+(?:-d|--distribution)\s+("[^"]+"|\S+)', re.IGNORECASE)
+
+def get_wsl_distro(command: str) -> Optional[str]:
+    """Returns the distro named by a `wsl -d <distro> ...` command, if any."""
+    match = WSL_DISTRO_PATTERN.search(command)
+    return match.group(1).strip('"') if match else None
 
-def get_mac_address():
-    """Get the MAC address of the system"""
+def get_launch_resource_keys(command: str) -> List[str]:
+    """Returns the distro and browser lock keys touched by a launch command."""
+    keys = []
+    match = WSL_DISTRO_PATTERN.search(command)
+    if match:
+        instance = match.group(1).strip('"')
+        keys.append(wsl_resource_key(instance))
+        browser = wsl_program_args(command[match.end():])
+        if browser:
+            keys.append(f"browser:{instance.lower()}/{os.path.basename(browser[0]).lower()}")
+    elif command.strip().lower() == "windowssandbox":
+        keys.append("browser:windowssandbox")
+    else:
+        target = command.strip().strip('"')
+        if target.lower().endswith(".exe"):
+            keys.append(f"browser:{os.path.basename(target).lower()}")
+    return keys
+
+# Idempotent read actions: an identical request that arrives while one is in
+# flight shares its result instead of doing the work again
+COALESCED_ACTIONS = {
+    "getWSLInstances", "getBrowserVersion", "getHardwareInfo", "checkWSLInstanceFolder",
+    "checkWSLInstanceFolders", "getWSLHealth", "probeConnectivity", "validateLicense",
+}
+# Parameters compared case-insensitively (registry keys and distro names are)
+COALESCE_CASE_INSENSITIVE = ("registryKey", "instance", "distro")
+# Fields that identify or bound a request rather than describe the work
+COALESCE_IGNORED_FIELDS = ("requestId", "deadline", "timeoutMs")
+
+single_flight = SingleFlight()
+
+def answer_stopped_request(token: CancelToken) -> None:
+    """Answers a request as soon as it is cancelled or its deadline passes."""
+    if token.claim_reply():
+        logging.info(f"Request {token.request_id} stopped: {token.reason}")
+        request = {"requestId": token.request_id} if token.request_id is not None else {}
+        send_reply(request, RequestCancelled(token.reason).to_response())
+
+# Queued and running requests, for the cancel action and deadlines
+request_registry = RequestRegistry(on_stopped=answer_stopped_request)
+
+def reply_when_done(request: Dict[str, Any], token: CancelToken, future) -> None:
+    """Sends a request's reply once the (possibly shared) handle_message future completes."""
+    def send(done):
+        request_registry.unregister(token)
+        try:
+            response = done.result()
+        except RequestCancelled as e:
+            response = e.to_response()
+        except Exception as e:
+            logging.error(f"Error processing message: {e}", exc_info=True)
+            response = {"error": str(e)}
+        # A request cancelled while it waited was already answered by the cancel
+        if token.claim_reply():
+            send_reply(request, response)
+    future.add_done_callback(send)
+
+def submit_detached(fn, **kwargs):
+    """Submits work that outlives the request that started it (jobs), free of its deadline and cancellation."""
+    context_token = current_token.set(NO_REQUEST)
     try:
-        mac = ':'.join(['{:02x}'.format((uuid.getnode() >> elements) & 0xff) 
-                       for elements in range(0, 8*6, 8)][::-1])
-        return mac
-    except Exception as e:
-        logging.error(f"Error getting MAC address: {str(e)}", exc_info=True)
+        return get_scheduler().submit(fn, **kwargs)
+    finally:
+        current_token.reset(context_token)
+
+def get_message_resource_keys(message: Dict[str, Any]) -> List[str]:
+    """Returns the worker pool lock keys (distros, browsers) a validated message touches."""
+    action = message.get("action")
+    if action == "openInSandbox":
+        return ["browser:windowssandbox"]
+    if action == "probeConnectivity" and message.get("distro"):
+        return [wsl_resource_key(message["distro"])]
+    if "command" in message and action in (None, "runCommand", "openUrls"):
+        return get_launch_resource_keys(message["command"])
+    if action == "openWithProfile" and message["profile"] in LAUNCH_PROFILES:
+        return get_launch_resource_keys(LAUNCH_PROFILES[message["profile"]].command)
+    return []
+
+# Admission control (overridden from the [Admission] section of config.ini)
+admission = AdmissionController()
+# Actions whose targets (browsers, distros) are throttled as well as the action itself
+LAUNCH_ACTIONS = {None, "runCommand", "openUrls", "openWithProfile", "openInSandbox"}
+# Diagnostics stay available while the host is rejecting a flood
+ADMISSION_EXEMPT_ACTIONS = {"ping", "getSchedulerStats", "getSpawnStats", "getMemoryProfile", "getLaunchLatency"}
+
+def admit_message(message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Returns None if a validated message may be queued, else the throttling error to reply with."""
+    action = message.get("action")
+    if action in ADMISSION_EXEMPT_ACTIONS:
         return None
+    targets = get_message_resource_keys(message) if action in LAUNCH_ACTIONS else []
+    return admission.admit(action or LEGACY_ACTION, targets, get_scheduler().queued())
+
+def schedule_message(message: Dict[str, Any], received_at: Optional[float] = None):
+    """Queues a validated message on the worker pool according to its priority and resources."""
+    action = message.get("action")
+    priority = PRIORITY_MAINTENANCE if action in MAINTENANCE_ACTIONS else PRIORITY_INTERACTIVE
+    shared_keys = get_message_resource_keys(message)
+
+    token = CancelToken(message.get("requestId"), deadline_from_message(message))
+    request_registry.register(token)
+    if action in COALESCED_ACTIONS:
+        def start():
+            # The shared computation stops only when every request attached to it has gone
+            group = TokenGroup()
+            group.attach(token)
+            context_token = current_token.set(group)
+            try:
+                future = get_scheduler().submit(handle_message, message, priority=priority, shared_keys=shared_keys)
+            finally:
+                current_token.reset(context_token)
+            future.token_group = group
+            return future
+
+        future, coalesced = single_flight.submit(
+            request_key(message, COALESCE_IGNORED_FIELDS, COALESCE_CASE_INSENSITIVE), start, label=action)
+        if coalesced:
+            logging.debug(f"Coalesced {action} with an identical request in flight")
+            future.token_group.attach(token)
+        reply_when_done(message, token, future)
+        return future
 
-def get_volume_serial():
-    """Get the system drive's volume serial number"""
+    context_token = current_token.set(token)
+    # Launch latency counts from here, not from when a worker picks the message up
+    received_token = message_received_at.set(received_at)
     try:
-        if platform.system() == 'Windows':
-            # Method 1: Use fsutil (recommended)
-            result = subprocess.run(['fsutil', 'fsinfo', 'volumeinfo', 'C:'], 
-                                  capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                match = re.search(r'Volume Serial Number\s*:\s*([A-Z0-9\-]+)', result.stdout)
-                if match:
-                    return match.group(1)
-                
-            # Method 2: Try wmic as a backup method  
-            result = subprocess.run(['wmic', 'volume', 'where', 'DriveLetter="C:"', 'get', 'SerialNumber'], 
-                                  capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                lines = result.stdout.strip().split('\n')
-                if len(lines) >= 2:
-                    return lines[1].strip()
-            
-            # Method 3: Try vol as a fallback method (less reliable)
-            result = subprocess.run(['cmd', '/c', 'vol', 'C:'], 
-                                  capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                match = re.search(r'Volume Serial Number is ([A-Z0-9\-]+)', result.stdout)
-                if match:
-                    return match.group(1)
-                    
-            logging.warning("All volume serial number collection methods failed")
-        return None
+        future = get_scheduler().submit(process_message, message, priority=priority, shared_keys=shared_keys)
+    finally:
+        message_received_at.reset(received_token)
+        current_token.reset(context_token)
+    return future
+
+def run_wsl_job(instance: str, body) -> None:
+    """Job runner that holds the distro exclusively on the maintenance workers."""
+    submit_detached(body, priority=PRIORITY_MAINTENANCE, keys=[wsl_resource_key(instance)])
+
+# WSL pre-warm settings (opt-in, overridden from the [WSLWarmup] section of config.ini)
+WSL_WARMUP_ENABLED = False
+WSL_WARMUP_DISTROS: List[str] = []  # empty means every installed distro
+WSL_WARMUP_EXECUTABLE = "wsl"
+WSL_KEEPALIVE_INTERVAL = 30
+WSL_IDLE_TIMEOUT = 15 * 60
+
+wsl_warmup = None
+
+def start_wsl_warmup() -> Optional[WSLWarmupManager]:
+    """Starts pre-warming the configured WSL distros if enabled in config.ini."""
+    global wsl_warmup
+    if not WSL_WARMUP_ENABLED or wsl_warmup is not None:
+        return wsl_warmup
+    distros = WSL_WARMUP_DISTROS or get_wsl_instances()
+    wsl_warmup = WSLWarmupManager(
+        distros,
+        wsl_executable=WSL_WARMUP_EXECUTABLE,
+        keepalive_interval=WSL_KEEPALIVE_INTERVAL,
+        idle_timeout=WSL_IDLE_TIMEOUT,
+        # Never boot a distro that is being unregistered or reinstalled
+        hold=lambda distro: get_scheduler().locks.hold_if_free(shared_keys=[wsl_resource_key(distro)]),
+    )
+    wsl_warmup.start()
+    logging.info(f"WSL pre-warm started for: {', '.join(distros)}")
+    return wsl_warmup
+
+# In-distro launcher agent settings (overridden from the [WSLAgent] section of config.ini)
+WSL_AGENT_ENABLED = False
+WSL_AGENT_BASE_PORT = 47600
+# Empty: use the token generated for this install (see get_wsl_agent_token)
+WSL_AGENT_TOKEN = ""
+WSL_AGENT_TOKEN_FILENAME = "WSLAgentToken.txt"
+WSL_AGENT_AUTOSTART = True
+WSL_AGENT_CONNECT_TIMEOUT = 0.5
+WSL_AGENT_SCRIPT = os.path.join("wslscripts", "wsl-launcher-agent.py")
+
+# Distros for which an agent start has already been attempted by this host
+wsl_agent_started = set()
+
+wsl_agent_token = None
+wsl_agent_token_lock = threading.Lock()
+
+def get_wsl_agent_token() -> str:
+    """
+    Returns the token the launcher agents require: the configured one, or
+    one generated for this install and kept in WSL_AGENT_TOKEN_FILENAME.
+
+    The agent port is reachable from every process on the machine (WSL2
+    forwards localhost), so the agent never runs without a token.
+    """
+    global wsl_agent_token
+    if WSL_AGENT_TOKEN:
+        return WSL_AGENT_TOKEN
+    with wsl_agent_token_lock:
+        if wsl_agent_token is None:
+            try:
+                with open(WSL_AGENT_TOKEN_FILENAME, "r", encoding="utf-8") as f:
+                    wsl_agent_token = f.read().strip() or None
+            except OSError:
+                pass
+        if wsl_agent_token is None:
+            wsl_agent_token = secrets.token_urlsafe(32)
+            try:
+                fd = os.open(WSL_AGENT_TOKEN_FILENAME, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(wsl_agent_token)
+            except OSError as e:
+                # Agents started by this process still get the token; later hosts make a new one
+                logging.error(f"Error saving WSL launcher agent token: {e}")
+        return wsl_agent_token
+
+def get_wsl_agent_port(distro: str) -> int:
+    """Returns the agent port for a distro. Keep in sync with wsl-launcher-agent.py."""
+    return WSL_AGENT_BASE_PORT + zlib.crc32(distro.lower().encode("utf-8")) % 1000
+
+def windows_to_wsl_path(path: str) -> str:
+    """Converts C:\\dir\\file to /mnt/c/dir/file."""
+    path = os.path.abspath(path)
+    drive, rest = os.path.splitdrive(path)
+    rest = rest.replace("\\", "/")
+    if not drive:
+        return rest
+    return f"/mnt/{drive[0].lower()}{rest}"
+
+def start_wsl_agent(distro: str) -> None:
+    """Starts the launcher agent inside a distro in the background (once per host process)."""
+    if distro.lower() in wsl_agent_started:
+        return
+    wsl_agent_started.add(distro.lower())
+    agent_path = windows_to_wsl_path(WSL_AGENT_SCRIPT)
+    # The port follows [WSLAgent] base_port; the agent's own default does not
+    command = ["wsl", "-d", distro, "--", "python3", agent_path, "--port", str(get_wsl_agent_port(distro))]
+    # Passed in the environment (WSLENV carries it into the distro), not on
+    # the command line where any process in the distro could read it
+    wslenv = os.environ.get("WSLENV")
+    env = dict(os.environ, BROWSER_LAUNCHER_AGENT_TOKEN=get_wsl_agent_token(),
+               WSLENV=":".join(filter(None, [wslenv, "BROWSER_LAUNCHER_AGENT_TOKEN/u"])))
+    try:
+        with account_spawn(command):
+            subprocess.Popen(
+                command,
+                env=env,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+            )
+        logging.info(f"Started WSL launcher agent in {distro}")
     except Exception as e:
-        logging.error(f"Error getting volume serial: {str(e)}", exc_info=True)
-        return None
+        logging.error(f"Error starting WSL launcher agent in {distro}: {e}")
 
-def get_bios_serial():
-    """Get the BIOS serial number"""
+def send_to_wsl_agent(command: str, urls: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Hands URLs for a `wsl -d <distro> <browser>` command to the distro's launcher agent.
+
+    Returns the agent's reply, or None if the agent is not enabled, not
+    reachable or refused the request (the caller then falls back to wsl.exe).
+    """
+    if not WSL_AGENT_ENABLED or not urls:
+        return None
+    match = WSL_DISTRO_PATTERN.search(command)
+    if not match:
+        return None
+    distro = match.group(1).strip('"')
+    browser_args = wsl_program_args(command[match.end():])
+    if not browser_args:
+        return None
+    request = {
+        "action": "open",
+        "distro": distro,
+        "browser": browser_args[0],
+        "urls": urls,
+        "token": get_wsl_agent_token(),
+    }
     try:
-        if platform.system() == 'Windows':
-            result = subprocess.run(['wmic', 'bios', 'get', 'serialnumber'], 
-                                  capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                lines = result.stdout.strip().split('\n')
-                if len(lines) >= 2:
-                    return lines[1].strip()
-            else:
-                logging.error(f"BIOS serial command failed with return code: {result.returncode}")
-                logging.error(f"Error output: {result.stderr}")
+        port = get_wsl_agent_port(distro)
+        with socket.create_connection(("127.0.0.1", port), timeout=WSL_AGENT_CONNECT_TIMEOUT) as sock:
+            sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            reply = json.loads(sock.makefile("rb").readline().decode("utf-8"))
+    except (OSError, ValueError) as e:
+        logging.debug(f"WSL launcher agent for {distro} not available: {e}")
+        if WSL_AGENT_AUTOSTART:
+            start_wsl_agent(distro)
         return None
-    except Exception as e:
-        logging.error(f"Error getting BIOS serial: {str(e)}", exc_info=True)
+    if not reply.get("ok"):
+        logging.warning(f"WSL launcher agent for {distro} refused request: {reply.get('error')}")
         return None
+    logging.debug(f"Opened {len(urls)} URL(s) through the WSL launcher agent for {distro}")
+    return reply
 
-def get_cpu_id():
-    """Get the CPU ID"""
-    try:
-        if platform.system() == 'Windows':
-            result = subprocess.run(['wmic', 'cpu', 'get', 'processorid'], 
-                                  capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                lines = result.stdout.strip().split('\n')
-                if len(lines) >= 2:
-                    return lines[1].strip()
-            else:
-                logging.error(f"CPU ID command failed with return code: {result.returncode}")
-                logging.error(f"Error output: {result.stderr}")
+# End-to-end launch latency (overridden from the [LaunchLatency] section of config.ini)
+LAUNCH_LATENCY_ENABLED = True
+LAUNCH_REPLY_WAIT = REPLY_WAIT
+
+def watch_launch(command: str) -> Optional[LaunchWatch]:
+    """Starts timing a launch, from its message's receipt until its browser process appears."""
+    if not LAUNCH_LATENCY_ENABLED:
         return None
-    except Exception as e:
-        logging.error(f"Error getting CPU ID: {str(e)}", exc_info=True)
+    match = WSL_DISTRO_PATTERN.search(command)
+    if match:
+        target = classify_launch(command, match.group(1).strip('"'), command[match.end():])
+    else:
+        target = classify_launch(command)
+    if target is None:
+        return None
+    if target.kind == KIND_SANDBOX and is_sandbox_running():
+        # A running sandbox only gets a launcher file: no process will appear
         return None
+    # A Windows host cannot see into the distro; a host running inside it can
+    watcher = make_wsl_watcher(WSL_WARMUP_EXECUTABLE) if target.kind == KIND_WSL and os.name == 'nt' else watch_local
+    return launch_latency.watch(target, message_received_at.get(), watcher)
+
+def add_launch_latency(response: Dict[str, Any], watch: Optional[LaunchWatch], result: str) -> Dict[str, Any]:
+    """Adds the launch's latency and its target's histogram to a launch reply."""
+    if watch:
+        response["launchLatency"] = watch.finish(is_command_error(result), LAUNCH_REPLY_WAIT)
+    return response
+
+def run_browser_command(command: str, url: Optional[str]) -> Dict[str, Any]:
+    """Runs a browser launch command, reporting whether a WSL target was warm or cold."""
+    distro = get_wsl_distro(command) if wsl_warmup else None
+    wsl_state = wsl_warmup.state_of(distro) if distro else None
+    watch = watch_launch(command)
+    if url and send_to_wsl_agent(command, [url]):
+        result = f"Opened {url} through the WSL launcher agent"
+        return add_launch_latency({"result": result, "agent": True}, watch, result)
+    result = run_command_with_retry(command, url)
+    response = {"result": result}
+    add_launch_latency(response, watch, result)
+    if wsl_state:
+        response["wslState"] = wsl_state
+        if not is_command_error(result):
+            wsl_warmup.touch(distro)
+    return response
+
+def start_wsl_health_sweep(workers: int = wsl_health.DEFAULT_SWEEP_WORKERS) -> str:
+    """Starts a background job that checks every WSL2 distro and refreshes the health cache."""
+    def sweep_step(job):
+        # Shared: probes may overlap with launches, never with a delete or reinstall
+        report = wsl_health.sweep(
+            workers=workers, hold=lambda distro: get_scheduler().locks.hold(shared_keys=[wsl_resource_key(distro)]),
+            run=run_accounted)
+        wsl_health.write_cache(report, wsl_health.WSL_HEALTH_CACHE_FILENAME)
+        broken = wsl_health.broken_distros(report)
+        return f"Checked {len(report['distros'])} distros, {len(broken)} without connectivity"
+
+    return get_job_manager().submit(
+        "sweepWSLHealth", [("sweep", sweep_step)], {"workers": workers},
+        runner=lambda body: submit_detached(body, priority=PRIORITY_MAINTENANCE))
+
+# WSL browser updates (overridden from the [WSLUpdates] section of config.ini)
+WSL_UPDATE_WORKERS = DEFAULT_UPDATE_WORKERS
+WSL_UPDATE_TIMEOUT = DEFAULT_DISTRO_TIMEOUT
+WSL_UPDATE_INVENTORY_MAX_AGE = DEFAULT_INVENTORY_MAX_AGE
+WSL_UPDATE_SCRIPT = os.path.join("wslscripts", "update-wsl-browsers.sh")
+
+wsl_browser_inventory = None
+
+def get_wsl_browser_inventory() -> VersionInventory:
+    """Returns the browser version inventory, loading it on first use."""
+    global wsl_browser_inventory
+    if wsl_browser_inventory is None:
+        wsl_browser_inventory = VersionInventory(VERSION_INVENTORY_FILENAME)
+    return wsl_browser_inventory
 
-def handle_message(message):
-    """Handle incoming messages from the browser extension"""
+def start_wsl_browser_update(distros: Optional[List[str]] = None, workers: int = 0, force: bool = False) -> str:
+    """Starts a background job that updates browsers in the given (or all) distros, several at a time."""
+    workers = workers or WSL_UPDATE_WORKERS
+    script_path = windows_to_wsl_path(WSL_UPDATE_SCRIPT)
+
+    def update_step(job):
+        targets = distros or [name for name in get_wsl_instances() if not name.lower().startswith("docker-desktop")]
+        updater = WSLBrowserUpdater(
+            # As root: without a terminal the script's sudo cannot ask for a password
+            targets, lambda distro: ["wsl", "-d", distro, "-u", "root", "--", "bash", script_path],
+            workers=workers, distro_timeout=WSL_UPDATE_TIMEOUT, inventory=get_wsl_browser_inventory(),
+            max_age=WSL_UPDATE_INVENTORY_MAX_AGE, force=force, cancel_event=job.cancel_event,
+            on_progress=lambda progress: get_job_manager().set_progress(job, progress),
+            # Launches into the distro may go on; a reinstall waits for the update
+            hold=lambda distro: get_scheduler().locks.hold(shared_keys=[wsl_resource_key(distro)]))
+        summary = updater.run()
+        get_job_manager().set_progress(job, summary)
+        job.check_cancelled()
+        counts = ", ".join(f"{count} {status}" for status, count in sorted(summary["counts"].items()))
+        text = f"Browser update in {len(targets)} distros: {counts or 'nothing to do'} in {summary['elapsed']:.0f}s"
+        if summary["failures"]:
+            raise JobStepError(f"{text}; failed: {', '.join(f['name'] for f in summary['failures'])}")
+        return text
+
+    return get_job_manager().submit(
+        "updateWSLBrowsers", [("update", update_step)], {"distros": distros or "all", "workers": workers, "force": force},
+        runner=lambda body: submit_detached(body, priority=PRIORITY_MAINTENANCE))
+
+def handle_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Handle incoming messages from the browser extension and return the response"""
+    # Processes spawned while handling the message are counted against its action
+    spawn_token = current_action.set(message.get("action") or "command")
     try:
         # Extract action from message
         action = message.get("action")
-        
+
+        if action is None:
+            command = message["command"]
+            url = message.get("url", "")
+            return run_browser_command(command, url)
+
+        logging.info(f"Received action: {action}")
+
         # Handle hardware info request for license validation
         if action == 'getHardwareInfo':
             logging.info("Received getHardwareInfo request in handle_message function")
             try:
                 hardware_info = get_hardware_info()
                 logging.info(f"Hardware info collected in handle_message: {len(hardware_info)} data points")
+
+                # Ensure the response is JSON serializable
+                json_response = json.dumps(hardware_info)
+                logging.info(f"JSON serialized response length: {len(json_response)}")
+
                 # Return hardware info directly, without wrapping it in another object
+                # This fixes the client-side issue where it expects the hardware info directly
                 return hardware_info
             except Exception as e:
                 logging.error(f"Error collecting hardware info in handle_message: {str(e)}", exc_info=True)
                 return {"error": f"Failed to collect hardware info: {str(e)}"}
+        elif action == 'validateLicense':
+            device_id = get_hardware_id(bool(message.get("refreshFingerprint")))
+            verdict = check_license(message["licenseKey"], device_id)
+            verdict["hardwareId"] = device_id
+            return verdict
         elif action == 'ping':
-            system_info = {
-                "platform": platform.system(),
-                "version": platform.version(),
-                "processor": platform.processor(),
-                "timestamp": time.time()
-            }
-            return {'pong': True, 'system_info': system_info}
-            
+            return build_ping_response()
+        # Get browser version from registry
+        elif action == "getBrowserVersion":
+            query = message.get("registryKey") or message.get("browser")
+            if query:
+                return {"version": get_browser_version(query)}
+            return {"error": "No registry key provided"}
+        elif action == "openInSandbox":
+            url = message.get("url", "")
+            watch = watch_launch("windowssandbox")
+            result = open_in_sandbox(url)
+            return add_launch_latency({"result": result}, watch, result)
+        elif action == "runCommand":
+            command = message["command"]
+            url = message.get("url", "")
+            return run_browser_command(command, url)
+        elif action == "openUrls":
+            return open_urls(message["command"], message["urls"])
+        elif action == "openWithProfile":
+            urls = list(message.get("urls", []))
+            if message.get("url"):
+                urls.insert(0, message["url"])
+            return open_with_profile(message["profile"], urls)
+        elif action == "getMemoryProfile":
+            profile = get_memory_monitor().profile(message.get("top", 10))
+            profile["restarts"] = int(os.environ.get(HOST_RESTART_ENV, "0"))
+            return profile
+        elif action == "getLaunchProfiles":
+            return {"profiles": {name: {"command": profile.command, "timeout": profile.timeout}
+                                 for name, profile in LAUNCH_PROFILES.items()}}
+        elif action == "executePowerShellScript":
+            script_path = message["scriptPath"]
+            browser_path_logger.info(f"Received request to execute PowerShell script: {script_path}")
+            result = execute_powershell_script(script_path)
+            browser_path_logger.info(f"PowerShell script execution completed with result: {result[:100]}...")
+            return {"result": result}
+        elif action == "getWSLInstances":
+            return {"instances": get_wsl_instances()}
+        elif action == "createWSLInstance":
+            return {"result": create_wsl_instance()}
+        elif action == "deleteWSLInstance":
+            instance = message["instance"]
+            job_id = delete_wsl_instance(instance)
+            return {"result": f"Deleting WSL instance: {instance}", "jobId": job_id}
+        elif action == "reinstateWSLInstance":
+            instance = message["instance"]
+            job_id = reinstate_wsl_instance(instance)
+            return {"result": f"Reinstating WSL instance: {instance}", "jobId": job_id}
+        elif action == "checkWSLInstanceFolder":
+            instance = message["instance"]
+            return {"result": check_wsl_instance_folder(instance)}
+        elif action == "checkWSLInstanceFolders":
+            return {"results": check_wsl_instance_folders(message["instances"])}
+        elif action == "getSpawnStats":
+            stats = spawn_stats.snapshot()
+            trees = tree_stats.snapshot()
+            if message.get("reset"):
+                spawn_stats.reset()
+                tree_stats.reset()
+            response = {"spawns": stats, "processTrees": trees}
+            if powershell_pool is not None:
+                response["powershell"] = powershell_pool.stats()
+            return response
+        elif action == "getLaunchLatency":
+            stats = launch_latency.snapshot()
+            if message.get("reset"):
+                launch_latency.reset()
+            return {"launchLatency": stats}
+        elif action == "listJobs":
+            return {"jobs": get_job_manager().list(message.get("status"))}
+        elif action == "getJobStatus":
+            job = get_job_manager().get(message["jobId"])
+            if job:
+                return {"job": job}
+            return {"error": f"Unknown job: {message['jobId']}"}
+        elif action == "cancelJob":
+            return {"cancelled": get_job_manager().cancel(message["jobId"])}
+        elif action == "getSchedulerStats":
+            return {"scheduler": get_scheduler().stats(), "coalescing": single_flight.stats(),
+                    "requests": request_registry.stats(), "admission": admission.stats()}
+        elif action == "cancel":
+            return {"cancelled": cancel_request(message["targetRequestId"])}
+        elif action == "probeConnectivity":
+            timeout = float(message.get("timeout", 3))
+            distro = message.get("distro")
+            if distro:
+                report = probe_in_wsl(distro, timeout=timeout, run=run_accounted)
+                if report is None:
+                    return {"error": f"Connectivity probe could not run in {distro} (is python3 installed?)"}
+            else:
+                report = run_probes(timeout=timeout)
+            return {"probe": report}
+        elif action == "getWSLHealth":
+            # Served from the cache written by the last sweep; runs nothing
+            return {"health": wsl_health.read_cache(wsl_health.WSL_HEALTH_CACHE_FILENAME)}
+        elif action == "sweepWSLHealth":
+            workers = int(message.get("workers", wsl_health.DEFAULT_SWEEP_WORKERS))
+            return {"result": "WSL health sweep started", "jobId": start_wsl_health_sweep(workers)}
+        elif action == "updateWSLBrowsers":
+            job_id = start_wsl_browser_update(message.get("distros"), int(message.get("workers", 0)),
+                                              bool(message.get("force")))
+            return {"result": "WSL browser update started", "jobId": job_id}
+        elif action == "getWSLWarmupStatus":
+            if wsl_warmup is None:
+                return {"enabled": False, "distros": {}}
+            return {"enabled": True, "distros": wsl_warmup.status()}
+
         # Handle other actions
+        logging.error("Invalid message received: unknown action")
         return {'success': False, 'error': 'Unknown action'}
-        
+
     except Exception as e:
-        logging.error(f"Error handling message: {str(e)}")
+        logging.error(f"Error handling message: {str(e)}", exc_info=True)
         return {'error': str(e)}
+    finally:
+        current_action.reset(spawn_token)
+
+@functools.lru_cache(maxsize=None)
+def get_static_system_info() -> Dict[str, str]:
+    """System info for ping, collected once: platform.version()/processor() may spawn processes."""
+    return {
+        "platform": platform.system(),
+        "backend": get_platform_backend().name,
+        "version": platform.version(),
+        "processor": platform.processor(),
+    }
+
+@functools.lru_cache(maxsize=None)
+def get_process_started_at() -> float:
+    """Epoch time the host process started (kept across a memory restart, which reuses the process)."""
+    return psutil.Process().create_time()
+
+def epoch_ms(timestamp: Optional[float] = None) -> float:
+    """Epoch milliseconds, comparable with Date.now() in the extension."""
+    return round((time.time() if timestamp is None else timestamp) * 1000, 3)
+
+def build_ping_response(received_at: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Builds a pong without doing any work. `timing` splits the heartbeat's
+    round trip: host-side time is sentAt - receivedAt, the rest is transport
+    (and, for a freshly started host, startup: see uptimeMs).
+    """
+    now = time.time()
+    system_info = dict(get_static_system_info(), timestamp=now)
+    started_at = get_process_started_at()
+    timing = {
+        "receivedAt": epoch_ms(received_at if received_at is not None else now),
+        "dispatchedAt": epoch_ms(now),
+        "startedAt": epoch_ms(started_at),
+        "uptimeMs": round((now - started_at) * 1000, 3),
+    }
+    return {"pong": True, "system_info": system_info, "timing": timing}
+
+def send_ping_reply(request: Dict[str, Any], received_at: float) -> None:
+    """Answers a ping on the reader thread, stamping the send time last."""
+    response = build_ping_response(received_at)
+    timing = response["timing"]
+    timing["sentAt"] = epoch_ms()
+    timing["hostMs"] = round(timing["sentAt"] - timing["receivedAt"], 3)
+    send_reply(request, response)
+
+def send_reply(request: Dict[str, Any], response: Dict[str, Any]) -> None:
+    """Sends a response, echoing the request's 'requestId' so replies can arrive out of order."""
+    if isinstance(request, dict) and "requestId" in request:
+        response = dict(response)
+        response["requestId"] = request["requestId"]
+    send_message(response)
+
+def process_message(message: Dict[str, Any]) -> None:
+    """Worker entry point: handles a message and sends its response."""
+    token = current_token.get()
+    try:
+        # Cancelled or expired while it was queued
+        token.check()
+        response = handle_message(message)
+    except RequestCancelled as e:
+        logging.info(f"Request {token.request_id} stopped: {e.reason}")
+        response = e.to_response()
+    except Exception as e:
+        logging.error(f"Error processing message: {e}", exc_info=True)
+        browser_path_logger.error(f"Error processing message: {e}")
+        response = {"error": str(e)}
+    finally:
+        request_registry.unregister(token)
+    if token.claim_reply():
+        send_reply(message, response)
+
+def cancel_request(request_id: Any) -> bool:
+    """Cancels a queued or running request (which is answered right away)."""
+    return request_registry.cancel(request_id) is not None
 
 def main() -> None:
-    """Main function to read messages and run commands."""
+    """Main function to read messages and dispatch them to the worker pool."""
     logging.info("Native messaging host started")
     browser_path_logger.info("Native messaging host started - Browser path detection ready")
-    while True:
-        try:
-            received_message = get_message()
-            if received_message is None:
-                logging.info("Received None message, exiting main loop")
-                browser_path_logger.info("Received None message, exiting main loop")
-                break
-
-            if not validate_input(received_message):
-                send_message({"error": "Invalid input"})
-                continue
-
-            if "action" in received_message:
-                action = received_message["action"]
-                logging.info(f"Received action: {action}")
-                
-                # Handle hardware info request for license validation
-                if action == "getHardwareInfo":
-                    try:
-                        logging.info("Processing getHardwareInfo request in main function")
-                        hardware_info = get_hardware_info()
-                        
-                        # Debug what get_hardware_info returns
-                        logging.info(f"Hardware info collected: {str(hardware_info)[:100]}...")
-                        
-                        # DO NOT wrap the hardware info in a response object - just return it directly
-                        # This fixes the client-side issue where it expects the hardware info directly
-                        logging.info("Sending hardware info response directly without wrapping")
-                        
-                        # Ensure the response is JSON serializable
-                        json_response = json.dumps(hardware_info)
-                        logging.info(f"JSON serialized response length: {len(json_response)}")
-                        
-                        send_message(hardware_info)
-                        logging.info("Hardware info response sent successfully")
-                    except Exception as e:
-                        error_msg = f"Error processing hardware info request: {str(e)}"
-                        logging.error(error_msg, exc_info=True)
-                        send_message({"error": error_msg})
+    if WSL_WARMUP_ENABLED:
+        # Boot distros off the request path so the first message is not delayed
+        get_scheduler().submit(start_wsl_warmup, priority=PRIORITY_MAINTENANCE)
+    if MEMORY_TRACE_ENABLED or MEMORY_CEILING_MB:
+        get_memory_monitor().start()
+    # Count spawns made outside the accounted helpers too
+    install_audit_hook()
+    # Collect ping's system info while the first message is still on its way
+    threading.Thread(target=get_static_system_info, name="system-info", daemon=True).start()
+    try:
+        while True:
+            try:
+                if host_restart_due():
+                    if os.name == 'nt':
+                        # See restart_host; the extension's next message starts a fresh host
+                        logging.warning("Exiting native messaging host to release memory")
+                        break
+                    restart_host()
+                received_message = get_message()
+                received_at = time.time()
+                if received_message is None:
+                    logging.info("Received None message, exiting main loop")
+                    browser_path_logger.info("Received None message, exiting main loop")
+                    break
+
+                if not validate_input(received_message):
+                    send_reply(received_message, {"error": "Invalid input"})
                     continue
-                # Handle ping request
-                elif action == "ping":
-                    system_info = {
-                        "platform": platform.system(),
-                        "version": platform.version(),
-                        "processor": platform.processor(),
-                        "timestamp": time.time()
-                    }
-                    send_message({"pong": True, "system_info": system_info})
+
+                if received_message.get("action") == "ping":
+                    # Heartbeat fast path: no scheduling, no admission, no work
+                    send_ping_reply(received_message, received_at)
                     continue
-                # Get browser version from registry
-                elif action == "getBrowserVersion":
-                    registry_key = received_message.get("registryKey")
-                    if registry_key:
-                        version = get_browser_version(registry_key)
-                        send_message({"version": version})
-                    else:
-                        send_message({"error": "No registry key provided"})
+                if received_message.get("action") in INLINE_ACTIONS:
+                    send_reply(received_message, handle_message(received_message))
                     continue
-                elif action == "openInSandbox":
-                    url = received_message.get("url", "")
-                    result = open_in_sandbox(url)
-                    send_message({"result": result})
-                elif action == "runCommand":
-                    command = received_message["command"]
-                    url = received_message.get("url", "")
-                    result = run_command_with_retry(command, url)
-                    send_message({"result": result})
-                elif action == "executePowerShellScript":
-                    script_path = received_message["scriptPath"]
-                    browser_path_logger.info(f"Received request to execute PowerShell script: {script_path}")
-                    result = execute_powershell_script(script_path)
-                    browser_path_logger.info(f"PowerShell script execution completed with result: {result[:100]}...")
-                    send_message({"result": result})
-                elif action == "getWSLInstances":
-                    instances = get_wsl_instances()
-                    send_message({"instances": instances})
-                elif action == "createWSLInstance":
-                    result = "WSL instance creation is handled by the extension. Please check the PowerShell window for details."
-                    send_message({"result": result})
-                elif action == "deleteWSLInstance":
-                    instance = received_message["instance"]
-                    result = delete_wsl_instance(instance)
-                    send_message({"result": result})
-                elif action == "reinstateWSLInstance":
-                    instance = received_message["instance"]
-                    result = reinstate_wsl_instance(instance)
-                    send_message({"result": result})
-                elif action == "checkWSLInstanceFolder":
-                    instance = received_message["instance"]
-                    result = check_wsl_instance_folder(instance)
-                    send_message({"result": result})
-                else:
-                    logging.error("Invalid message received: unknown action")
-                    send_message({"error": "Unknown action"})
-            elif "command" in received_message:
-                command = received_message["command"]
-                url = received_message.get("url", "")
-                result = run_command_with_retry(command, url)
-                send_message({"result": result})
-            else:
-                logging.error("Invalid message received: missing action or command")
-                send_message({"error": "Missing action or command"})
-        except Exception as e:
-            logging.error(f"Error in main loop: {e}")
-            browser_path_logger.error(f"Error in main loop: {e}")
-            send_message({"error": str(e)})
+
+                rejection = admit_message(received_message)
+                if rejection:
+                    send_reply(received_message, rejection)
+                    continue
+
+                future = schedule_message(received_message, received_at)
+                if received_message.get("action") not in ADMISSION_EXEMPT_ACTIONS:
+                    # No longer counts towards the backlog other hosts see
+                    future.add_done_callback(lambda _: admission.release())
+            except Exception as e:
+                logging.error(f"Error in main loop: {e}")
+                browser_path_logger.error(f"Error in main loop: {e}")
+                send_message({"error": str(e)})
+    finally:
+        # Let queued requests finish and reply before the host exits
+        get_scheduler().shutdown(wait=True)
+        if powershell_pool is not None:
+            powershell_pool.close()
 
 if __name__ == "__main__":
     # Load configuration
@@ -968,6 +1755,36 @@ if __name__ == "__main__":
     LOG_FILENAME = config.get("Logging", "filename", fallback="BrowserLauncher.log")
     LOG_MAX_SIZE = config.getint("Logging", "max_size", fallback=10 * 1024 * 1024)
     LOG_BACKUP_COUNT = config.getint("Logging", "backup_count", fallback=1)
+    SCHEDULER_INTERACTIVE_WORKERS = config.getint("Scheduler", "interactive_workers", fallback=4)
+    SCHEDULER_MAINTENANCE_WORKERS = config.getint("Scheduler", "maintenance_workers", fallback=2)
+    WSL_WARMUP_ENABLED = config.getboolean("WSLWarmup", "enabled", fallback=False)
+    WSL_WARMUP_DISTROS = [name.strip() for name in config.get("WSLWarmup", "distros", fallback="").split(",") if name.strip()]
+    WSL_WARMUP_EXECUTABLE = config.get("WSLWarmup", "wsl_executable", fallback="wsl")
+    WSL_KEEPALIVE_INTERVAL = config.getint("WSLWarmup", "keepalive_interval", fallback=30)
+    WSL_IDLE_TIMEOUT = config.getint("WSLWarmup", "idle_timeout", fallback=15 * 60)
+    WSL_AGENT_ENABLED = config.getboolean("WSLAgent", "enabled", fallback=False)
+    WSL_AGENT_BASE_PORT = config.getint("WSLAgent", "base_port", fallback=47600)
+    WSL_AGENT_TOKEN = config.get("WSLAgent", "token", fallback="")
+    WSL_AGENT_AUTOSTART = config.getboolean("WSLAgent", "autostart", fallback=True)
+    LAUNCH_PROFILES = compile_launch_profiles(config)
+    MEMORY_TRACE_ENABLED = config.getboolean("MemoryProfile", "enabled", fallback=False)
+    MEMORY_TRACE_FRAMES = config.getint("MemoryProfile", "frames", fallback=1)
+    MEMORY_SAMPLE_INTERVAL = config.getint("MemoryProfile", "sample_interval", fallback=30)
+    MEMORY_CEILING_MB = config.getint("MemoryProfile", "ceiling_mb", fallback=0)
+    admission = admission_from_config(config)
+    POWERSHELL_POOLED = config.getboolean("PowerShell", "pooled", fallback=True)
+    POWERSHELL_EXECUTABLE = config.get("PowerShell", "executable", fallback=POWERSHELL_EXECUTABLE)
+    POWERSHELL_WORKERS = config.getint("PowerShell", "workers", fallback=1)
+    POWERSHELL_MAX_SCRIPTS = config.getint("PowerShell", "max_scripts", fallback=100)
+    POWERSHELL_SCRIPT_TIMEOUT = config.getint("PowerShell", "script_timeout", fallback=60)
+    WSL_UPDATE_WORKERS = config.getint("WSLUpdates", "workers", fallback=DEFAULT_UPDATE_WORKERS)
+    WSL_UPDATE_TIMEOUT = config.getint("WSLUpdates", "distro_timeout", fallback=DEFAULT_DISTRO_TIMEOUT)
+    WSL_UPDATE_INVENTORY_MAX_AGE = config.getint("WSLUpdates", "inventory_max_age", fallback=DEFAULT_INVENTORY_MAX_AGE)
+    LAUNCH_LATENCY_ENABLED = config.getboolean("LaunchLatency", "enabled", fallback=True)
+    LAUNCH_REPLY_WAIT = config.getfloat("LaunchLatency", "reply_wait", fallback=REPLY_WAIT)
+    for kind in launch_latency.windows:
+        launch_latency.windows[kind] = config.getfloat("LaunchLatency", f"{kind}_window",
+                                                       fallback=launch_latency.windows[kind])
 
     # Set up logging
     setup_logger()
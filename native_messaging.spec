@@ -3,7 +3,7 @@
 
 a = Analysis(
     ['native_messaging.py'],
-    pathex=[],
+    pathex=['wslscripts'],
     binaries=[],
     datas=[],
     hiddenimports=[],
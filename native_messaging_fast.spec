@@ -0,0 +1,73 @@
+# -*- mode: python ; coding: utf-8 -*-
+#
+# Fast-start variant of native_messaging.spec.
+#
+# The browser spawns the host for every sendNativeMessage. The one-file build
+# unpacks and UPX-decompresses the whole bundle into a temp directory on each
+# spawn; this variant is an unpacked onedir layout (dist/native_messaging_fast/)
+# without UPX and without stdlib packages the host never imports, so a spawn
+# only maps the files it actually uses.
+#
+# Bytecode is compiled at build time at the optimization level given by
+# BROWSER_LAUNCHER_OPTIMIZE (0-2, default 1). BROWSER_LAUNCHER_NOARCHIVE=1
+# keeps the .pyc files as plain files instead of the PYZ archive.
+#
+#   pyinstaller native_messaging_fast.spec
+#   python benchmark_startup.py   (compares spawn-to-first-reply with the one-file build)
+
+import os
+
+optimize_level = int(os.environ.get('BROWSER_LAUNCHER_OPTIMIZE', '1'))
+no_archive = os.environ.get('BROWSER_LAUNCHER_NOARCHIVE', '0') == '1'
+
+# Standard library packages the host does not use
+unused_modules = [
+    'tkinter', '_tkinter', 'turtle', 'turtledemo', 'idlelib',
+    'unittest', 'doctest', 'pydoc', 'pydoc_data', 'pdb', 'test',
+    'lib2to3', 'distutils', 'setuptools', 'pip', 'ensurepip', 'venv',
+    'sqlite3', 'curses', 'xmlrpc', 'ftplib', 'smtplib', 'imaplib', 'poplib',
+    'nntplib', 'telnetlib', 'mailbox', 'audioop', 'wave', 'sunau', 'aifc', 'chunk',
+]
+
+a = Analysis(
+    ['native_messaging.py'],
+    pathex=['wslscripts'],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=unused_modules,
+    noarchive=no_archive,
+    optimize=optimize_level,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='native_messaging_fast',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='native_messaging_fast',
+)
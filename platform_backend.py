@@ -0,0 +1,636 @@
+#!/usr/bin/env python3
+"""
+Platform backends for the Browser Launcher Pro native host.
+
+Everything the host does that depends on the operating system goes through a
+backend: launching browsers, looking up browser versions, probing hardware
+identifiers for licensing and detecting running processes.
+
+  WindowsBackend  cmd.exe launches, in-process registry reads for versions
+                  and WSL distros, fsutil/wmic probes
+  LinuxBackend    direct argv launches, versions from the browser binary or
+                  its .desktop entry, /etc/machine-id and DMI sysfs probes
+
+Linux desktops, and WSL users running the host inside the distro next to the
+browser, therefore no longer go through cmd.exe and wsl.exe for every click.
+"""
+
+import configparser
+import logging
+import os
+import platform
+import re
+import shlex
+import shutil
+import socket
+import subprocess
+import threading
+import uuid
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import psutil
+
+from process_tree import ConfinedPopen
+from request_control import communicate, current_token
+from spawn_stats import account_spawn, run as run_accounted
+
+try:
+    import winreg
+except ImportError:
+    winreg = None
+
+PROBE_TIMEOUT = 5
+VERSION_TIMEOUT = 10
+# A launcher that is still running (or exited cleanly) this long after the
+# spawn is considered started; a first browser launch never exits
+LAUNCH_CHECK_DELAY = 0.5
+
+logger = logging.getLogger('BrowserLauncher')
+
+
+def run_launch_command(full_command, timeout: float = 30) -> str:
+    """
+    Runs a fully built launch command and returns its output or an error string.
+
+    full_command is a shell command string, or an argv list (launch profiles),
+    which is run directly without a shell.
+    """
+    logger.debug(f"Running command: {full_command}")
+    use_shell = isinstance(full_command, str)
+
+    with account_spawn(full_command):
+        # Use a confined Popen (own process group and job object) with shell=True for Windows
+        if os.name == 'nt':
+            process = ConfinedPopen(
+                full_command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                shell=use_shell,
+                creationflags=subprocess.CREATE_NO_WINDOW
+            )
+        else:
+            # For non-Windows systems
+            process = ConfinedPopen(
+                full_command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                shell=use_shell
+            )
+
+        try:
+            stdout, stderr = communicate(process, timeout)
+        except subprocess.TimeoutExpired:
+            # A first browser launch keeps the pipes open for the browser's
+            # whole life: the browser is up, so leave the tree alone (only an
+            # explicit cancel reaps it) and drain the pipes in the background
+            threading.Thread(target=process.communicate, name="launch-drain", daemon=True).start()
+            return f"Command still running after {timeout} seconds"
+
+    if process.returncode != 0 and stderr:
+        error_text = stderr.decode("utf-8", errors="replace").strip()
+        logger.error(f"Command failed with exit code {process.returncode}: {error_text}")
+        return f"Error: Command failed with exit code {process.returncode}: {error_text}"
+
+    result = stdout.decode("utf-8", errors="replace").strip()
+    logger.debug(f"Command result: {result}")
+    return result
+
+
+def command_length(full_command) -> int:
+    """Returns the command line length of a shell command string or argv list."""
+    if isinstance(full_command, str):
+        return len(full_command)
+    return len(subprocess.list2cmdline(full_command))
+
+
+def read_text_file(path: str) -> Optional[str]:
+    """Returns the stripped contents of a small file, or None if it is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    return value or None
+
+
+class PlatformBackend:
+    """Interface for the operating-system specific parts of the host."""
+
+    name = "generic"
+
+    def build_launch_command(self, command: str, urls: List[str]):
+        """Returns the shell command string or argv that opens the URLs with a browser command."""
+        raise NotImplementedError
+
+    def launch(self, command: str, urls: List[str], timeout: float = 30) -> str:
+        """Opens the URLs with a browser command and returns a result or error string."""
+        raise NotImplementedError
+
+    def get_browser_version(self, query: str) -> str:
+        """Returns a browser's version, or an "Error: ..." string."""
+        raise NotImplementedError
+
+    def get_wsl_distros(self) -> Optional[List[str]]:
+        """Returns the registered WSL distros without spawning wsl.exe, or None if unknown."""
+        return None
+
+    def hardware_probes(self) -> List[Tuple[str, str, Callable[[], Optional[str]]]]:
+        """Returns (key, description, probe) for the platform-specific hardware identifiers."""
+        return []
+
+    def get_hardware_info(self) -> Dict[str, str]:
+        """
+        Collect hardware-specific information for license validation
+        Returns a hardware fingerprint that can be used for license key validation
+        """
+        hardware_info = {}
+
+        try:
+            # Get system information
+            hardware_info['platform'] = str(platform.system())
+            hardware_info['processor'] = str(platform.processor())
+            hardware_info['machine'] = str(platform.machine())
+            hardware_info['node'] = str(platform.node())
+
+            logger.info("Collecting hardware information for license validation")
+
+            # Get MAC address (more unique than other identifiers)
+            mac = get_mac_address()
+            if mac:
+                hardware_info['mac'] = str(mac)
+                logger.info("MAC address collected successfully")
+            else:
+                logger.warning("Failed to collect MAC address")
+
+            # The order of the probes is part of the fingerprint; don't reorder them
+            for key, description, probe in self.hardware_probes():
+                value = probe()
+                if value:
+                    hardware_info[key] = str(value)
+                    logger.info(f"Collected {description}")
+                else:
+                    logger.warning(f"Failed to collect {description}")
+
+            # Fallback to more generic methods if needed
+            if len(hardware_info) < 3:
+                logger.warning("Less than 3 hardware identifiers collected, falling back to generic methods")
+                # Add hostname
+                hardware_info['hostname'] = str(socket.gethostname())
+
+                # Add Python-based UUID
+                hardware_info['machine_id'] = str(uuid.getnode())
+
+            logger.info(f"Hardware info collection complete. Collected {len(hardware_info)} data points")
+
+            # Debug the hardware info object
+            logger.info(f"Final hardware_info content: {str(hardware_info)[:200]}...")
+
+        except Exception as e:
+            logger.error(f"Error getting hardware info: {str(e)}", exc_info=True)
+            # Return minimal system info if we fail to get more specific hardware data
+            fallback_info = {
+                'platform': str(platform.system()),
+                'hostname': str(socket.gethostname()),
+                'machine_id': str(uuid.getnode()),
+                'error': str(e)
+            }
+            logger.info(f"Returning fallback hardware info: {fallback_info}")
+            return fallback_info
+
+        return hardware_info
+
+    def find_processes(self, name: str) -> List[int]:
+        """Returns the PIDs of running processes whose name or executable is `name`."""
+        name = name.lower()
+        pids = []
+        for proc in psutil.process_iter(['name', 'exe']):
+            proc_name = (proc.info['name'] or "").lower()
+            exe_name = os.path.basename(proc.info['exe'] or "").lower()
+            if name in (proc_name, exe_name):
+                pids.append(proc.pid)
+        return pids
+
+    def is_process_running(self, name: str) -> bool:
+        return bool(self.find_processes(name))
+
+
+def get_mac_address():
+    """Get the MAC address of the system"""
+    try:
+        mac = ':'.join(['{:02x}'.format((uuid.getnode() >> elements) & 0xff)
+                       for elements in range(0, 8*6, 8)][::-1])
+        return mac
+    except Exception as e:
+        logger.error(f"Error getting MAC address: {str(e)}", exc_info=True)
+        return None
+
+
+def run_probe(argv: Sequence[str], timeout: float = PROBE_TIMEOUT) -> subprocess.CompletedProcess:
+    """Runs a short-lived probe command without a console window."""
+    return run_accounted(
+        list(argv), capture_output=True, text=True, timeout=timeout,
+        creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+    )
+
+
+class WindowsBackend(PlatformBackend):
+    """Windows: launches through cmd.exe and probes through reg, fsutil and wmic."""
+
+    name = "windows"
+
+    def build_launch_command(self, command: str, urls: List[str]) -> str:
+        """Builds the full shell command that opens the given URLs with a browser command."""
+        # Check if the command requires `runas.exe`
+        if command.startswith("runas"):
+            return command  # runas command should be passed as-is
+        if command.startswith("cmd /c start powershell.exe"):
+            return command  # Don't add URL for PowerShell
+
+        quoted_urls = " ".join(f'"{url}"' for url in urls)
+        if "wsl" in command.lower():
+            # Special handling for browsers in WSL
+            if "firefox" in command.lower():
+                # Firefox needs special handling with DISPLAY environment variable
+                # Use -new-tab to ensure the URL opens in a new tab if Firefox is already running
+                new_tabs = " ".join(f'-new-tab "{url}"' for url in urls)
+                return f'{command} {new_tabs}' if urls else command
+            elif "chrome" in command.lower() or "edge" in command.lower():
+                # Add --no-sandbox for Chrome and Edge in WSL
+                return f'{command} --no-sandbox {quoted_urls}' if urls else f'{command} --no-sandbox'
+            return f'{command} {quoted_urls}' if urls else command
+        if command.strip().lower() == "windowssandbox":
+            # Just launch Sandbox without a URL; URLs go through open_in_sandbox
+            sandbox_path = os.path.expandvars(r"%windir%\system32\WindowsSandbox.exe")
+            return f'"{sandbox_path}"'
+        # For Windows local browsers, ensure proper quoting
+        if command.endswith('.exe') or command.endswith('.EXE'):
+            return f'"{command}" {quoted_urls}' if urls else f'"{command}"'
+        return f'{command} {quoted_urls}' if urls else command
+
+    def launch(self, command: str, urls: List[str], timeout: float = 30) -> str:
+        return run_launch_command(self.build_launch_command(command, urls), timeout)
+
+    def _read_registry_value(self, registry_key: str, value_name: str):
+        """Reads a registry value in-process; raises FileNotFoundError if the key or value is missing."""
+        root_name, _, subkey = registry_key.partition("\\")
+        root = getattr(winreg, REGISTRY_ROOTS.get(root_name.upper(), ""), None)
+        if root is None:
+            raise FileNotFoundError(f"Unknown registry root: {root_name}")
+        with winreg.OpenKey(root, subkey) as key:
+            value, _ = winreg.QueryValueEx(key, value_name)
+        return value
+
+    def get_browser_version(self, registry_key: str) -> str:
+        """Gets the browser version from the Windows registry with improved error handling and architecture support."""
+        try:
+            # First try the direct registry key
+            logger.debug(f"Reading registry key: {registry_key}")
+            try:
+                version = self._read_registry_value(registry_key, "version")
+            except FileNotFoundError:
+                # If direct key fails, try WOW6432Node path if not already trying it
+                if "WOW6432Node" in registry_key:
+                    raise
+                wow64_key = registry_key.replace("Software\\", "Software\\WOW6432Node\\")
+                logger.debug(f"Trying WOW6432Node registry key: {wow64_key}")
+                version = self._read_registry_value(wow64_key, "version")
+        except FileNotFoundError:
+            logger.warning(f"Registry key not found: {registry_key}")
+            return f"Error: Registry key not found: {registry_key}"
+        except Exception as e:
+            error_message = f"Error getting browser version: {str(e)}"
+            logger.error(error_message)
+            return error_message
+
+        version = str(version).strip()
+        # Validate version format (should be like xx.x.xxx.xx)
+        if re.match(r'^\d+\.\d+\.\d+\.\d+$', version):
+            logger.debug(f"Extracted valid browser version: {version}")
+            return version
+        logger.warning(f"Invalid version format found: {version}")
+        return f"Error: Invalid version format: {version}"
+
+    def get_wsl_distros(self) -> Optional[List[str]]:
+        """Lists the distros registered under the Lxss key, as `wsl --list --quiet` does."""
+        if winreg is None:
+            return None
+        distros = []
+        try:
+            with winreg.OpenKey(winreg.HKEY_CURRENT_USER, LXSS_KEY) as lxss:
+                index = 0
+                while True:
+                    try:
+                        guid = winreg.EnumKey(lxss, index)
+                    except OSError:
+                        break
+                    index += 1
+                    with winreg.OpenKey(lxss, guid) as distro:
+                        try:
+                            distros.append(str(winreg.QueryValueEx(distro, "DistributionName")[0]))
+                        except FileNotFoundError:
+                            continue
+        except FileNotFoundError:
+            # WSL installed but no distro registered yet
+            return []
+        except OSError as e:
+            logger.warning(f"Could not read WSL distros from the registry: {e}")
+            return None
+        return distros
+
+    def hardware_probes(self):
+        return [
+            ('volume_serial', "volume serial number", self.get_volume_serial),
+            ('bios_serial', "BIOS serial", self.get_bios_serial),
+            ('cpu_id', "CPU ID", self.get_cpu_id),
+        ]
+
+    def get_volume_serial(self):
+        """Get the system drive's volume serial number"""
+        try:
+            # Method 1: Use fsutil (recommended)
+            result = run_probe(['fsutil', 'fsinfo', 'volumeinfo', 'C:'])
+            if result.returncode == 0:
+                match = re.search(r'Volume Serial Number\s*:\s*([A-Z0-9\-]+)', result.stdout)
+                if match:
+                    return match.group(1)
+
+            # Method 2: Try wmic as a backup method
+            result = run_probe(['wmic', 'volume', 'where', 'DriveLetter="C:"', 'get', 'SerialNumber'])
+            if result.returncode == 0:
+                lines = result.stdout.strip().split('\n')
+                if len(lines) >= 2:
+                    return lines[1].strip()
+
+            # Method 3: Try vol as a fallback method (less reliable)
+            result = run_probe(['cmd', '/c', 'vol', 'C:'])
+            if result.returncode == 0:
+                match = re.search(r'Volume Serial Number is ([A-Z0-9\-]+)', result.stdout)
+                if match:
+                    return match.group(1)
+
+            logger.warning("All volume serial number collection methods failed")
+            return None
+        except Exception as e:
+            logger.error(f"Error getting volume serial: {str(e)}", exc_info=True)
+            return None
+
+    def _wmic_value(self, argv: Sequence[str], description: str):
+        try:
+            result = run_probe(argv)
+            if result.returncode == 0:
+                lines = result.stdout.strip().split('\n')
+                if len(lines) >= 2:
+                    return lines[1].strip()
+            else:
+                logger.error(f"{description} command failed with return code: {result.returncode}")
+                logger.error(f"Error output: {result.stderr}")
+            return None
+        except Exception as e:
+            logger.error(f"Error getting {description}: {str(e)}", exc_info=True)
+            return None
+
+    def get_bios_serial(self):
+        """Get the BIOS serial number"""
+        return self._wmic_value(['wmic', 'bios', 'get', 'serialnumber'], "BIOS serial")
+
+    def get_cpu_id(self):
+        """Get the CPU ID"""
+        return self._wmic_value(['wmic', 'cpu', 'get', 'processorid'], "CPU ID")
+
+
+# Registry roots accepted in the registry keys background.js sends
+REGISTRY_ROOTS = {
+    "HKEY_CURRENT_USER": "HKEY_CURRENT_USER", "HKCU": "HKEY_CURRENT_USER",
+    "HKEY_LOCAL_MACHINE": "HKEY_LOCAL_MACHINE", "HKLM": "HKEY_LOCAL_MACHINE",
+    "HKEY_CLASSES_ROOT": "HKEY_CLASSES_ROOT", "HKCR": "HKEY_CLASSES_ROOT",
+    "HKEY_USERS": "HKEY_USERS", "HKU": "HKEY_USERS",
+}
+LXSS_KEY = r"Software\Microsoft\Windows\CurrentVersion\Lxss"
+
+# Browser binaries for the registry keys background.js asks about, so the
+# extension's version check works unchanged against a Linux host
+REGISTRY_BROWSER_BINARIES = (
+    ("Edge Beta", ("microsoft-edge-beta",)),
+    ("Edge Dev", ("microsoft-edge-dev",)),
+    ("Edge", ("microsoft-edge-stable", "microsoft-edge")),
+    ("Chrome Beta", ("google-chrome-beta",)),
+    ("Chrome Dev", ("google-chrome-unstable",)),
+    ("Chrome", ("google-chrome-stable", "google-chrome")),
+)
+FIREFOX_BROWSERS = {"firefox", "firefox-esr"}
+MACHINE_ID_PATHS = ("/etc/machine-id", "/var/lib/dbus/machine-id")
+DMI_DIR = "/sys/class/dmi/id"
+# Only readable by root on most distributions; skipped (consistently) otherwise
+DMI_IDENTIFIERS = ("product_uuid", "board_serial", "product_serial")
+VERSION_PATTERN = re.compile(r'\d+(?:\.\d+)+')
+WSL_DISTRO_OPTIONS = {"-d", "--distribution", "-u", "--user"}
+WSL_EXEC_OPTIONS = {"-e", "--exec", "--"}
+DESKTOP_FIELD_CODE = re.compile(r'^%[a-zA-Z]$')
+DESKTOP_VERSION_KEYS = ("X-AppImage-Version", "X-Version")
+
+
+def default_desktop_dirs() -> List[str]:
+    """Returns the XDG application directories, most specific first."""
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    data_dirs = os.environ.get("XDG_DATA_DIRS") or "/usr/local/share:/usr/share"
+    dirs = [data_home] + data_dirs.split(":") + [
+        "/var/lib/flatpak/exports/share", "/var/lib/snapd/desktop"]
+    return [os.path.join(d, "applications") for d in dict.fromkeys(dirs) if d]
+
+
+def strip_wsl_prefix(argv: List[str]) -> List[str]:
+    """Removes a leading `wsl [-d distro] [--]` so a command configured for Windows runs directly."""
+    if not argv or os.path.basename(argv[0]).lower() not in ("wsl", "wsl.exe"):
+        return argv
+    index = 1
+    while index < len(argv):
+        if argv[index] in WSL_DISTRO_OPTIONS:
+            index += 2
+        elif argv[index] in WSL_EXEC_OPTIONS:
+            index += 1
+            break
+        else:
+            break
+    return argv[index:]
+
+
+class LinuxBackend(PlatformBackend):
+    """Linux (including a host running inside WSL): direct argv launches and sysfs probes."""
+
+    name = "linux"
+
+    def __init__(self, machine_id_paths: Sequence[str] = MACHINE_ID_PATHS, dmi_dir: str = DMI_DIR,
+                 desktop_dirs: Optional[Sequence[str]] = None):
+        self.machine_id_paths = tuple(machine_id_paths)
+        self.dmi_dir = dmi_dir
+        self.desktop_dirs = tuple(desktop_dirs) if desktop_dirs is not None else tuple(default_desktop_dirs())
+        # (argv, executable mtime) -> version, so `--version` runs once per install
+        self._version_cache: Dict[Tuple[Tuple[str, ...], float], str] = {}
+        self._version_lock = threading.Lock()
+
+    def build_launch_command(self, command: str, urls: List[str]) -> List[str]:
+        """Builds the argv that hands the URLs to (a possibly running) browser."""
+        argv = strip_wsl_prefix(shlex.split(command))
+        if not argv:
+            raise ValueError("Empty browser command")
+        name = os.path.basename(argv[0])
+        if name in FIREFOX_BROWSERS:
+            # -new-tab opens the URL in a new tab if Firefox is already running
+            for url in urls:
+                argv += ["-new-tab", url]
+            return argv
+        return argv + list(urls)
+
+    def launch(self, command: str, urls: List[str], timeout: float = 30) -> str:
+        """Starts the browser directly without waiting for it to exit."""
+        argv = self.build_launch_command(command, urls)
+        executable = shutil.which(argv[0])
+        if executable is None:
+            return f"Error: Browser not found: {argv[0]}"
+        logger.debug(f"Launching: {argv}")
+        current_token.get().check()
+        with account_spawn(argv):
+            process = subprocess.Popen(
+                [executable] + argv[1:],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                start_new_session=True,
+            )
+            try:
+                process.wait(timeout=min(LAUNCH_CHECK_DELAY, timeout))
+            except subprocess.TimeoutExpired:
+                # Still running: this was the first instance; reap it when it exits
+                process.stderr.close()
+                threading.Thread(target=process.wait, name="browser-reaper", daemon=True).start()
+                return f"Launched {argv[0]} (pid {process.pid})"
+        error_text = process.stderr.read().decode("utf-8", errors="replace").strip()
+        process.stderr.close()
+        if process.returncode != 0:
+            logger.error(f"Command failed with exit code {process.returncode}: {error_text}")
+            return f"Error: Command failed with exit code {process.returncode}: {error_text}"
+        # Exit code 0 right away: the URLs were handed to a running instance
+        return f"Opened with {argv[0]}"
+
+    def resolve_browser(self, query: str) -> Tuple[Optional[List[str]], Optional[str]]:
+        """
+        Resolves a version query to (argv, version from metadata).
+
+        The query is a binary name or path, a .desktop file id, or one of the
+        Windows registry keys background.js sends.
+        """
+        if query.endswith(".desktop"):
+            return self._resolve_desktop_entry(query)
+        if "\\" in query:
+            for marker, binaries in REGISTRY_BROWSER_BINARIES:
+                if f"\\{marker}\\" in query:
+                    for binary in binaries:
+                        path = shutil.which(binary)
+                        if path:
+                            return [path], None
+                    return None, None
+            return None, None
+        path = shutil.which(query)
+        return ([path], None) if path else (None, None)
+
+    def _resolve_desktop_entry(self, desktop_id: str) -> Tuple[Optional[List[str]], Optional[str]]:
+        for directory in self.desktop_dirs:
+            path = os.path.join(directory, desktop_id) if not os.path.isabs(desktop_id) else desktop_id
+            if not os.path.isfile(path):
+                continue
+            parser = configparser.ConfigParser(interpolation=None, strict=False)
+            try:
+                parser.read(path, encoding="utf-8")
+                entry = parser["Desktop Entry"]
+            except (configparser.Error, KeyError, UnicodeDecodeError):
+                return None, None
+            for key in DESKTOP_VERSION_KEYS:
+                if entry.get(key):
+                    return None, entry[key].strip()
+            try:
+                argv = [arg for arg in shlex.split(entry.get("Exec", ""))
+                        if not DESKTOP_FIELD_CODE.match(arg) and arg not in ("@@", "@@u")]
+            except ValueError:
+                return None, None
+            if argv and shutil.which(argv[0]):
+                argv[0] = shutil.which(argv[0])
+                return argv, None
+            return None, None
+        return None, None
+
+    def _installed_version(self, executable: str) -> Optional[str]:
+        """Reads the version from files next to the real binary (Firefox's application.ini)."""
+        real_dir = os.path.dirname(os.path.realpath(executable))
+        ini = os.path.join(real_dir, "application.ini")
+        if not os.path.isfile(ini):
+            return None
+        parser = configparser.ConfigParser(interpolation=None, strict=False)
+        try:
+            parser.read(ini, encoding="utf-8")
+            return parser.get("App", "Version", fallback=None)
+        except configparser.Error:
+            return None
+
+    def get_browser_version(self, query: str) -> str:
+        """Gets a browser version from its install metadata, falling back to `<binary> --version`."""
+        try:
+            argv, version = self.resolve_browser(query)
+            if version:
+                return version
+            if not argv:
+                logger.warning(f"Browser not found: {query}")
+                return f"Error: Browser not found: {query}"
+            version = self._installed_version(argv[0])
+            if version:
+                return version
+
+            try:
+                mtime = os.stat(argv[0]).st_mtime
+            except OSError:
+                mtime = 0.0
+            cache_key = (tuple(argv), mtime)
+            with self._version_lock:
+                if cache_key in self._version_cache:
+                    return self._version_cache[cache_key]
+            result = run_accounted(argv + ["--version"], capture_output=True, text=True,
+                                    timeout=VERSION_TIMEOUT, stdin=subprocess.DEVNULL)
+            match = VERSION_PATTERN.search(result.stdout)
+            if result.returncode != 0 or not match:
+                logger.warning(f"No version in output of {argv[0]} --version: {result.stdout.strip()}")
+                return f"Error: Version not found in {argv[0]} --version output"
+            with self._version_lock:
+                self._version_cache[cache_key] = match.group(0)
+            return match.group(0)
+        except Exception as e:
+            error_message = f"Error getting browser version: {str(e)}"
+            logger.error(error_message)
+            return error_message
+
+    def hardware_probes(self):
+        probes = [('os_machine_id', "machine ID", self.get_machine_id)]
+        for name in DMI_IDENTIFIERS:
+            probes.append((f'dmi_{name}', f"DMI {name}",
+                           lambda path=os.path.join(self.dmi_dir, name): read_text_file(path)))
+        return probes
+
+    def get_machine_id(self) -> Optional[str]:
+        """Returns the systemd/D-Bus machine ID."""
+        for path in self.machine_id_paths:
+            value = read_text_file(path)
+            if value:
+                return value
+        return None
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_platform_backend() -> PlatformBackend:
+    """Returns the backend for the running operating system."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = WindowsBackend() if os.name == 'nt' else LinuxBackend()
+            logger.info(f"Using the {_backend.name} platform backend")
+        return _backend
@@ -169,9 +169,14 @@ document.addEventListener('DOMContentLoaded', function () {
 
         const ok = !!(result.response && (result.response.pong === true));
         if (ok) {
+          // Split the round trip: time spent in the host vs. transport and host startup
+          const timing = result.response.timing || null;
+          const hostMs = timing && typeof timing.hostMs === 'number' ? timing.hostMs : null;
           setStatus('online', 'Active', latency);
-          statusEl.title = 'Native messaging host responded successfully';
-          chrome.storage.local.set({ nativeMessagingLastStatus: 'online', nativeMessagingLastLatency: latency, nativeMessagingLastChecked: Date.now(), nativeMessagingSystemInfo: result.response.system_info || null });
+          statusEl.title = hostMs === null
+            ? 'Native messaging host responded successfully'
+            : `Native messaging host responded successfully (host ${hostMs.toFixed(1)} ms, host uptime ${Math.round(timing.uptimeMs)} ms)`;
+          chrome.storage.local.set({ nativeMessagingLastStatus: 'online', nativeMessagingLastLatency: latency, nativeMessagingLastChecked: Date.now(), nativeMessagingSystemInfo: result.response.system_info || null, nativeMessagingLastTiming: timing ? { ...timing, rttMs: latency, transportMs: hostMs === null ? null : Math.max(0, latency - hostMs) } : null });
         } else {
           setStatus('error', 'Unavailable');
           statusEl.title = 'Unexpected response from native messaging host';
@@ -184,8 +189,74 @@ document.addEventListener('DOMContentLoaded', function () {
       }
     }
 
+    function percentile(sorted, p) {
+      if (!sorted.length) return null;
+      const index = Math.min(sorted.length - 1, Math.ceil((p / 100) * sorted.length) - 1);
+      return Math.round(sorted[Math.max(0, index)] * 100) / 100;
+    }
+
+    function summarize(samples) {
+      const sorted = samples.slice().sort((a, b) => a - b);
+      return {
+        min: percentile(sorted, 0),
+        p50: percentile(sorted, 50),
+        p95: percentile(sorted, 95),
+        p99: percentile(sorted, 99),
+        max: sorted.length ? Math.round(sorted[sorted.length - 1] * 100) / 100 : null,
+      };
+    }
+
+    // pingBurst: sustained round-trip percentiles over one connected (warm) host,
+    // unlike the heartbeat above, which starts a fresh host for every ping
+    async function pingBurst(count = 50, timeoutMs = 2000) {
+      const port = chrome.runtime.connectNative('com.example.browserlauncher');
+      const pending = new Map();
+      let disconnectError = null;
+      port.onMessage.addListener((response) => {
+        const entry = pending.get(response && response.requestId);
+        if (entry) { pending.delete(response.requestId); entry.resolve(response); }
+      });
+      port.onDisconnect.addListener(() => {
+        disconnectError = chrome.runtime.lastError?.message || 'Native host disconnected';
+        pending.forEach((entry) => entry.resolve(null));
+        pending.clear();
+      });
+
+      const rtt = [];
+      const host = [];
+      let failures = 0;
+      let startupMs = null;
+      try {
+        for (let i = 0; i < count && !disconnectError; i++) {
+          const requestId = `pingBurst-${Date.now()}-${i}`;
+          const start = performance.now();
+          const response = await new Promise((resolve) => {
+            const timeoutId = setTimeout(() => { pending.delete(requestId); resolve(null); }, timeoutMs);
+            pending.set(requestId, { resolve: (value) => { clearTimeout(timeoutId); resolve(value); } });
+            port.postMessage({ action: 'ping', requestId });
+          });
+          const elapsed = performance.now() - start;
+          if (!response || response.pong !== true) { failures++; continue; }
+          // The first ping also pays for starting the host
+          if (i === 0) { startupMs = Math.round(elapsed); continue; }
+          rtt.push(elapsed);
+          if (response.timing && typeof response.timing.hostMs === 'number') host.push(response.timing.hostMs);
+        }
+      } finally {
+        try { port.disconnect(); } catch { /* already gone */ }
+      }
+
+      const result = {
+        count, samples: rtt.length, failures, startupMs, error: disconnectError,
+        rttMs: summarize(rtt), hostMs: summarize(host), measuredAt: Date.now(),
+      };
+      chrome.storage.local.set({ nativeMessagingPingBurst: result });
+      return result;
+    }
+
     // Expose for other parts if needed
     window.checkNativeMessagingHealth = checkHealth;
+    window.runNativePingBurst = pingBurst;
 
     // Restore last known state quickly
     try {
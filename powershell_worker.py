@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Persistent PowerShell workers for the Browser Launcher Pro native host.
+
+Starting powershell.exe and loading its modules often took longer than the
+script it ran (executePowerShellScript used to spawn one per call). The host
+now keeps a small pool of long-lived interpreters running a driver loop and
+hands them scripts by path over a framed stdin/stdout protocol:
+
+- Requests are single JSON lines on stdin: {"id": 1, "script": "C:\\...\\X.ps1"}
+- Replies are single lines on stdout: FRAME_MARKER followed by JSON, e.g.
+  {"id": 1, "exitCode": 0, "output": "...", "error": ""}. A worker announces
+  itself with {"ready": true} first. Lines without the marker (anything a
+  script writes straight to the console) are logged and skipped.
+
+A call that runs past its timeout, or a worker that dies, gets the worker
+killed and replaced in the background, so the next call finds a fresh one.
+Workers are also recycled after max_scripts calls, as scripts share a
+process (global variables and loaded modules persist between them).
+
+Anything that speaks the protocol can stand in for PowerShell, e.g. a Python
+fake in the tests, or pwsh on Linux.
+"""
+
+import base64
+import itertools
+import json
+import logging
+import os
+import queue
+import subprocess
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from process_tree import ConfinedPopen, kill_tree, kill_tree_in_background
+from request_control import current_token
+from spawn_stats import account_spawn
+
+FRAME_MARKER = "@@BLP-FRAME@@"
+STARTUP_TIMEOUT = 20
+DEFAULT_SCRIPT_TIMEOUT = 60
+DEFAULT_MAX_SCRIPTS = 100
+# Seconds a worker gets to exit after its stdin is closed
+STOP_TIMEOUT = 2
+
+logger = logging.getLogger('BrowserLauncher')
+
+# Runs in the worker: reads one request per line, runs the script in its own
+# scope and replies with one frame. Error records are reported separately,
+# like stderr of `powershell -File`; a terminating error gives exit code 1.
+DRIVER_SCRIPT = r"""
+$ProgressPreference = 'SilentlyContinue'
+$utf8 = New-Object System.Text.UTF8Encoding $false
+[Console]::InputEncoding = $utf8
+[Console]::OutputEncoding = $utf8
+function Send-Frame($frame) {
+    [Console]::Out.WriteLine('@@BLP-FRAME@@' + (ConvertTo-Json -InputObject $frame -Compress -Depth 3))
+    [Console]::Out.Flush()
+}
+Send-Frame @{ ready = $true; pid = $PID }
+while ($null -ne ($line = [Console]::In.ReadLine())) {
+    if (-not $line.Trim()) { continue }
+    $request = ConvertFrom-Json -InputObject $line
+    $global:LASTEXITCODE = 0
+    $records = @()
+    $failures = @()
+    $exitCode = 0
+    try {
+        $records = @(& $request.script *>&1)
+        $exitCode = [int]$global:LASTEXITCODE
+    } catch {
+        $failures += $_
+        $exitCode = 1
+    }
+    $output = $records | Where-Object { $_ -isnot [System.Management.Automation.ErrorRecord] } | Out-String
+    $failures = @($records | Where-Object { $_ -is [System.Management.Automation.ErrorRecord] }) + $failures
+    Send-Frame @{ id = $request.id; exitCode = $exitCode; output = $output; error = ($failures | Out-String).Trim() }
+}
+"""
+
+
+class PowerShellWorkerError(Exception):
+    """A worker could not run a script: it failed to start, died, or broke the protocol."""
+
+
+class PowerShellStartError(PowerShellWorkerError):
+    """The interpreter could not be started, or never announced itself."""
+
+
+class PowerShellTimeout(PowerShellWorkerError):
+    """A script ran past its timeout (the worker was killed)."""
+
+
+class ScriptResult(NamedTuple):
+    exit_code: int
+    output: str
+    error: str
+
+
+def powershell_argv(executable: str = "powershell.exe") -> List[str]:
+    """Returns the command line that starts a PowerShell worker running the driver loop."""
+    encoded = base64.b64encode(DRIVER_SCRIPT.encode("utf-16-le")).decode("ascii")
+    return [executable, "-NoLogo", "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass",
+            "-EncodedCommand", encoded]
+
+
+class PowerShellWorker:
+    """One long-lived interpreter; runs one script at a time."""
+
+    def __init__(self, argv: Sequence[str], startup_timeout: float = STARTUP_TIMEOUT):
+        self.argv = list(argv)
+        self.startup_timeout = startup_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.scripts_run = 0
+        self._frames: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._ids = itertools.count(1)
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self) -> None:
+        """Starts the interpreter and waits until it is ready for scripts."""
+        kwargs = {"creationflags": subprocess.CREATE_NO_WINDOW} if os.name == "nt" else {}
+        # Accounted up to the ready frame, so the stats show what startup costs
+        with account_spawn(self.argv):
+            try:
+                self.process = ConfinedPopen(
+                    self.argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                    text=True, encoding="utf-8", errors="replace", bufsize=1, **kwargs)
+            except OSError as e:
+                raise PowerShellStartError(f"Could not start {self.argv[0]}: {e}")
+            threading.Thread(target=self._read_frames, name="powershell-reader", daemon=True).start()
+            try:
+                frame = self._next_frame(self.startup_timeout)
+            except PowerShellWorkerError as e:
+                self.stop(kill=True)
+                raise PowerShellStartError(f"{self.argv[0]} did not start: {e}")
+        if not frame.get("ready"):
+            self.stop()
+            raise PowerShellStartError(f"Unexpected first frame from {self.argv[0]}: {frame}")
+        logger.info(f"PowerShell worker started (pid {self.process.pid})")
+
+    def run(self, script_path: str, timeout: float = DEFAULT_SCRIPT_TIMEOUT) -> ScriptResult:
+        """
+        Runs a script and returns its result.
+
+        Raises PowerShellTimeout after killing the worker if the script runs
+        past the timeout, PowerShellWorkerError if the worker dies, and
+        RequestCancelled if the request ends first.
+        """
+        token = current_token.get()
+        wait = token.timeout(timeout)
+        request_id = next(self._ids)
+        self.scripts_run += 1
+        try:
+            self.process.stdin.write(json.dumps({"id": request_id, "script": script_path}) + "\n")
+            self.process.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise PowerShellWorkerError(f"PowerShell worker is gone: {e}")
+        try:
+            # Killing the worker ends the frame wait right away
+            with token.on_cancel(lambda: kill_tree_in_background(self.process)):
+                frame = self._next_frame(wait, request_id)
+        except PowerShellTimeout:
+            self.stop(kill=True)
+            token.check()
+            raise PowerShellTimeout(f"Script execution timed out after {timeout} seconds")
+        except PowerShellWorkerError:
+            token.check()
+            raise
+        return ScriptResult(int(frame.get("exitCode") or 0), frame.get("output") or "", frame.get("error") or "")
+
+    def stop(self, kill: bool = False) -> None:
+        """
+        Ends the interpreter: closing stdin ends the driver loop, and the
+        process tree is killed if it does not exit (or right away with kill).
+        """
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except (OSError, ValueError):
+            pass
+        try:
+            self.process.wait(timeout=0 if kill else STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            kill_tree(self.process)
+            self.process.wait()
+
+    def _next_frame(self, timeout: Optional[float], request_id: Optional[int] = None) -> Dict[str, Any]:
+        while True:
+            try:
+                frame = self._frames.get(timeout=timeout)
+            except queue.Empty:
+                raise PowerShellTimeout(f"No reply within {timeout} seconds")
+            if frame is None:
+                self._frames.put(None)
+                raise PowerShellWorkerError(f"PowerShell worker exited with code {self.process.wait()}")
+            if request_id is None or frame.get("id") == request_id:
+                return frame
+
+    def _read_frames(self) -> None:
+        for line in self.process.stdout:
+            line = line.rstrip("\r\n")
+            if not line.startswith(FRAME_MARKER):
+                if line:
+                    logger.debug(f"PowerShell worker {self.process.pid}: {line}")
+                continue
+            try:
+                self._frames.put(json.loads(line[len(FRAME_MARKER):]))
+            except ValueError:
+                logger.error(f"Malformed frame from PowerShell worker {self.process.pid}: {line[:200]}")
+        self._frames.put(None)
+
+
+class PowerShellPool:
+    """Up to `size` workers, started on demand and replaced when they fail."""
+
+    def __init__(self, argv: Sequence[str], size: int = 1, max_scripts: int = DEFAULT_MAX_SCRIPTS,
+                 startup_timeout: float = STARTUP_TIMEOUT):
+        self.argv = list(argv)
+        self.size = max(1, size)
+        self.max_scripts = max_scripts
+        self.startup_timeout = startup_timeout
+        self._lock = threading.Condition()
+        self._idle: List[PowerShellWorker] = []
+        self._workers = 0
+        self._closed = False
+        self._stats = {"started": 0, "scripts": 0, "timeouts": 0, "crashes": 0, "recycled": 0, "startFailures": 0}
+
+    def run(self, script_path: str, timeout: float = DEFAULT_SCRIPT_TIMEOUT) -> ScriptResult:
+        """Runs a script on an idle worker, starting one if the pool has room."""
+        worker = self._checkout()
+        healthy = False
+        try:
+            result = worker.run(script_path, timeout)
+            healthy = True
+            return result
+        except PowerShellTimeout:
+            self._count("timeouts")
+            raise
+        except PowerShellWorkerError:
+            self._count("crashes")
+            raise
+        finally:
+            self._checkin(worker, healthy)
+
+    def warm(self) -> None:
+        """Starts a worker in the background so the first script does not wait for PowerShell."""
+        with self._lock:
+            if self._idle or self._workers >= self.size or self._closed:
+                return
+            self._workers += 1
+        threading.Thread(target=self._start_spare, name="powershell-warm", daemon=True).start()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._workers -= len(idle)
+            self._lock.notify_all()
+        for worker in idle:
+            worker.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, size=self.size, workers=self._workers, idle=len(self._idle))
+
+    def _checkout(self) -> PowerShellWorker:
+        token = current_token.get()
+        with self._lock:
+            while not self._idle and self._workers >= self.size and not self._closed:
+                self._lock.wait(token.timeout(None))
+                token.check()
+            if self._closed:
+                raise PowerShellWorkerError("PowerShell pool is closed")
+            if self._idle:
+                return self._idle.pop()
+            self._workers += 1
+        try:
+            return self._start_worker()
+        except BaseException:
+            with self._lock:
+                self._workers -= 1
+                self._lock.notify()
+            raise
+
+    def _checkin(self, worker: PowerShellWorker, healthy: bool) -> None:
+        with self._lock:
+            self._stats["scripts"] += 1
+            if healthy and worker.alive and worker.scripts_run < self.max_scripts and not self._closed:
+                self._idle.append(worker)
+                self._lock.notify()
+                return
+            if healthy:
+                self._stats["recycled"] += 1
+        # A crashed, hung or worn-out worker is replaced before the next call needs it
+        worker.stop(kill=not healthy)
+        with self._lock:
+            self._workers -= 1
+            self._lock.notify()
+        self.warm()
+
+    def _start_worker(self) -> PowerShellWorker:
+        worker = PowerShellWorker(self.argv, self.startup_timeout)
+        try:
+            worker.start()
+        except PowerShellStartError:
+            self._count("startFailures")
+            raise
+        self._count("started")
+        return worker
+
+    def _start_spare(self) -> None:
+        try:
+            worker = self._start_worker()
+        except PowerShellWorkerError as e:
+            logger.warning(f"Could not start a spare PowerShell worker: {e}")
+            with self._lock:
+                self._workers -= 1
+                self._lock.notify()
+            return
+        with self._lock:
+            if not self._closed:
+                self._idle.append(worker)
+                self._lock.notify()
+                return
+            self._workers -= 1
+        worker.stop()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
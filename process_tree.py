@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Process-tree confinement for the commands the Browser Launcher Pro host runs.
+
+Most commands go through a shell (`shell=True`), and a timeout used to kill
+only that shell: the real child (reg, wsl, powershell, a browser launcher)
+kept running, and repeated timeouts piled up orphans. Commands are now
+started with `ConfinedPopen`, which puts each one in a process group of its
+own (a new session on POSIX) and, on Windows, a job object, so the whole
+tree can be found again even after the shell has exited.
+
+`kill_tree()` ends a tree on timeout or cancellation: terminate, then kill
+whatever is still running after a grace period. The descendants reaped and
+the ones that survived (leaked) are counted in `tree_stats`.
+"""
+
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List
+
+import psutil
+
+# Seconds a tree gets to exit after terminate, and after kill
+TERMINATE_GRACE = 2.0
+KILL_GRACE = 2.0
+EXIT_POLL_INTERVAL = 0.05
+
+logger = logging.getLogger('BrowserLauncher')
+
+
+class TreeStats:
+    """Thread-safe counters of the process trees ended by kill_tree()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {"trees": 0, "escalated": 0, "reaped": 0, "leaked": 0}
+        self._started = time.time()
+
+    def record(self, reaped: int, leaked: int, escalated: bool) -> None:
+        with self._lock:
+            self._counts["trees"] += 1
+            self._counts["escalated"] += int(escalated)
+            self._counts["reaped"] += reaped
+            self._counts["leaked"] += leaked
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counts, since=round(self._started, 3))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = dict.fromkeys(self._counts, 0)
+            self._started = time.time()
+
+
+tree_stats = TreeStats()
+
+
+class _JobObject:
+    """A Windows job object (through ctypes, so pywin32 is not needed)."""
+
+    PROCESS_SET_QUOTA = 0x0100
+    PROCESS_TERMINATE = 0x0001
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.CreateJobObjectW.restype = wintypes.HANDLE
+        kernel32.CreateJobObjectW.argtypes = (wintypes.LPVOID, wintypes.LPCWSTR)
+        kernel32.OpenProcess.restype = wintypes.HANDLE
+        kernel32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+        kernel32.AssignProcessToJobObject.argtypes = (wintypes.HANDLE, wintypes.HANDLE)
+        kernel32.TerminateJobObject.argtypes = (wintypes.HANDLE, wintypes.UINT)
+        kernel32.CloseHandle.argtypes = (wintypes.HANDLE,)
+        self._kernel32 = kernel32
+        self.handle = kernel32.CreateJobObjectW(None, None)
+        if not self.handle:
+            raise ctypes.WinError(ctypes.get_last_error())
+
+    def assign(self, pid: int) -> None:
+        process_handle = self._kernel32.OpenProcess(self.PROCESS_SET_QUOTA | self.PROCESS_TERMINATE, False, pid)
+        if not process_handle:
+            raise self._ctypes.WinError(self._ctypes.get_last_error())
+        try:
+            if not self._kernel32.AssignProcessToJobObject(self.handle, process_handle):
+                raise self._ctypes.WinError(self._ctypes.get_last_error())
+        finally:
+            self._kernel32.CloseHandle(process_handle)
+
+    def terminate(self, exit_code: int = 1) -> None:
+        self._kernel32.TerminateJobObject(self.handle, exit_code)
+
+    def close(self) -> None:
+        if self.handle:
+            self._kernel32.CloseHandle(self.handle)
+            self.handle = None
+
+
+class ConfinedPopen(subprocess.Popen):
+    """
+    subprocess.Popen in a process group of its own and, on Windows, a job
+    object. The job has no kill-on-close limit: a browser started through
+    `start` outlives the command unless the tree is killed.
+
+    The job is assigned right after the spawn, so a grandchild started in
+    that instant is only found through the process tree.
+    """
+
+    def __init__(self, args, **kwargs):
+        if os.name == "nt":
+            kwargs["creationflags"] = kwargs.get("creationflags", 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs.setdefault("start_new_session", True)
+        self._own_group = os.name != "nt" and bool(kwargs.get("start_new_session"))
+        self._tree_lock = threading.Lock()
+        self._tree_killed = False
+        self._job = None
+        super().__init__(args, **kwargs)
+        if os.name == "nt":
+            try:
+                self._job = _JobObject()
+                self._job.assign(self.pid)
+            except OSError as e:
+                # e.g. the host itself runs in a job that does not allow nesting
+                logger.debug(f"Could not confine pid {self.pid} to a job object: {e}")
+                self._release_job()
+
+    def descendants(self) -> List[psutil.Process]:
+        """Returns the processes the command started, including ones re-parented after their parent exited."""
+        found = {}
+        try:
+            for child in psutil.Process(self.pid).children(recursive=True):
+                found[child.pid] = child
+        except psutil.Error:
+            pass
+        if self._own_group:
+            for proc in psutil.process_iter():
+                if proc.pid == self.pid or proc.pid in found:
+                    continue
+                try:
+                    if os.getpgid(proc.pid) == self.pid:
+                        found[proc.pid] = proc
+                except OSError:
+                    pass
+        return list(found.values())
+
+    def kill_tree(self, grace: float = TERMINATE_GRACE) -> None:
+        """
+        Ends the command and all its descendants: terminate, then kill what
+        is still running after grace seconds. Later calls wait for the first.
+        """
+        with self._tree_lock:
+            if self._tree_killed:
+                return
+            self._tree_killed = True
+            descendants = self.descendants()
+            self._signal_tree(descendants, signal.SIGTERM if os.name != "nt" else None)
+            deadline = time.monotonic() + grace
+            root_alive = not _wait_root(self, grace)
+            alive = _wait_exited(descendants, deadline - time.monotonic())
+            escalated = root_alive or bool(alive)
+            if escalated:
+                logger.warning(f"Process tree of pid {self.pid} ignored terminate; killing it")
+                self._signal_tree(alive, signal.SIGKILL if os.name != "nt" else None, kill=True)
+                root_alive = not _wait_root(self, KILL_GRACE)
+                alive = _wait_exited(alive, KILL_GRACE)
+            leaked = len(alive) + int(root_alive)
+            if leaked:
+                logger.error(f"{leaked} process(es) of the tree of pid {self.pid} survived kill")
+            tree_stats.record(reaped=len(descendants) - len(alive), leaked=leaked, escalated=escalated)
+
+    def _signal_tree(self, processes: List[psutil.Process], group_signal, kill: bool = False) -> None:
+        if self._own_group and group_signal is not None:
+            try:
+                os.killpg(self.pid, group_signal)
+            except OSError:
+                pass
+        if kill and self._job is not None:
+            self._job.terminate()
+        for proc in processes:
+            try:
+                if kill:
+                    proc.kill()
+                else:
+                    proc.terminate()
+            except psutil.Error:
+                pass
+        try:
+            if kill:
+                self.kill()
+            else:
+                self.terminate()
+        except OSError:
+            pass
+
+    def _release_job(self) -> None:
+        if self._job is not None:
+            self._job.close()
+            self._job = None
+
+    def __exit__(self, exc_type, value, traceback):
+        try:
+            return super().__exit__(exc_type, value, traceback)
+        finally:
+            self._release_job()
+
+    def __del__(self, *args, **kwargs):
+        self._release_job()
+        super().__del__(*args, **kwargs)
+
+
+def _wait_root(process: subprocess.Popen, timeout: float) -> bool:
+    try:
+        process.wait(timeout=timeout)
+        return True
+    except subprocess.TimeoutExpired:
+        return False
+
+
+def _running(processes: List[psutil.Process]) -> List[psutil.Process]:
+    """Drops processes that have exited, including zombies nobody has reaped yet."""
+    running = []
+    for proc in processes:
+        try:
+            if proc.status() != psutil.STATUS_ZOMBIE:
+                running.append(proc)
+        except psutil.Error:
+            pass
+    return running
+
+
+def _wait_exited(processes: List[psutil.Process], timeout: float) -> List[psutil.Process]:
+    """Waits up to timeout seconds for the processes to exit; returns the ones still running."""
+    # Not psutil.wait_procs: a re-parented zombie counts as running there until init reaps it
+    deadline = time.monotonic() + timeout
+    running = _running(processes)
+    while running and time.monotonic() < deadline:
+        time.sleep(EXIT_POLL_INTERVAL)
+        running = _running(running)
+    return running
+
+
+def kill_tree(process: subprocess.Popen, grace: float = TERMINATE_GRACE) -> None:
+    """Ends a process and, for a ConfinedPopen, its whole tree."""
+    if isinstance(process, ConfinedPopen):
+        process.kill_tree(grace)
+    else:
+        process.kill()
+
+
+def kill_tree_in_background(process: subprocess.Popen, grace: float = TERMINATE_GRACE) -> None:
+    """kill_tree() without blocking the caller, e.g. the thread that cancels a request."""
+    threading.Thread(target=kill_tree, args=(process, grace), name="tree-killer", daemon=True).start()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Request deadlines and cancellation for the Browser Launcher Pro native host.
+
+The popup gives up on a request after a few seconds, but without this the
+host kept running commands (10-60 s timeouts) and retry loops for nobody.
+Each scheduled message now runs under a CancelToken:
+
+- A message may carry `deadline` (epoch milliseconds, as Date.now() gives)
+  or `timeoutMs` (relative). Blocking stages cap their waits at the time
+  left, and a watcher thread cancels the request when it passes.
+- `{"action": "cancel", "targetRequestId": ...}` cancels a queued or
+  running request.
+
+Cancelling runs the token's callbacks (e.g. killing the process tree being
+waited for) immediately, so resources are freed right away, and the request
+is answered at once rather than when its worker notices.
+
+RequestCancelled derives from BaseException, like asyncio.CancelledError, so
+the host's many `except Exception` error handlers don't swallow it.
+"""
+
+import heapq
+import itertools
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+from process_tree import kill_tree, kill_tree_in_background
+
+CANCELLED_REASON = "Request cancelled"
+DEADLINE_REASON = "Deadline exceeded"
+
+
+class RequestCancelled(BaseException):
+    """Raised in a request's worker when it was cancelled or ran past its deadline."""
+
+    def __init__(self, reason: str = CANCELLED_REASON):
+        super().__init__(reason)
+        self.reason = reason
+
+    @property
+    def deadline_exceeded(self) -> bool:
+        return self.reason == DEADLINE_REASON
+
+    def to_response(self) -> Dict[str, Any]:
+        return {"error": self.reason, "cancelled": True, "deadlineExceeded": self.deadline_exceeded}
+
+
+class CancelToken:
+    """Cancellation state and deadline (time.monotonic() based) of one request."""
+
+    def __init__(self, request_id: Any = None, deadline: Optional[float] = None):
+        self.request_id = request_id
+        self.deadline = deadline
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: Dict[int, Callable[[], Any]] = {}
+        self._next_callback = 0
+        self._replied = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or self.expired
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until the deadline, or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def cancel(self, reason: str = CANCELLED_REASON) -> bool:
+        """Cancels the request and runs the registered callbacks. Returns False if already cancelled."""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+        return True
+
+    def check(self) -> None:
+        """Raises RequestCancelled if the request was cancelled or its deadline passed."""
+        if self._event.is_set():
+            raise RequestCancelled(self.reason or CANCELLED_REASON)
+        if self.expired:
+            raise RequestCancelled(DEADLINE_REASON)
+
+    def timeout(self, timeout: Optional[float]) -> Optional[float]:
+        """Caps a timeout at the time left; raises RequestCancelled if none is left."""
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def sleep(self, seconds: float) -> None:
+        """Sleeps, waking up early (and raising) on cancellation or the deadline."""
+        self._event.wait(self.timeout(seconds))
+        self.check()
+
+    def add_callback(self, callback: Callable[[], Any]) -> int:
+        """Registers a cancellation callback (run now if already cancelled); returns its handle."""
+        with self._lock:
+            key = self._next_callback
+            self._next_callback += 1
+            self._callbacks[key] = callback
+            already_cancelled = self._event.is_set()
+        if already_cancelled:
+            callback()
+        return key
+
+    def remove_callback(self, key: int) -> None:
+        with self._lock:
+            self._callbacks.pop(key, None)
+
+    @contextmanager
+    def on_cancel(self, callback: Callable[[], Any]):
+        """Runs callback if the request is cancelled while the block runs."""
+        key = self.add_callback(callback)
+        try:
+            yield
+        finally:
+            self.remove_callback(key)
+
+    def claim_reply(self) -> bool:
+        """Returns True exactly once, so a request is answered by its result or its cancellation."""
+        with self._lock:
+            if self._replied:
+                return False
+            self._replied = True
+            return True
+
+
+class TokenGroup(CancelToken):
+    """
+    Token for work shared by several requests (coalesced reads): it is
+    cancelled once every member has been cancelled or has expired.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._members = []
+
+    def attach(self, token: CancelToken) -> None:
+        with self._lock:
+            self._members.append(token)
+        token.add_callback(lambda: self._member_cancelled(token))
+
+    def _member_cancelled(self, token: CancelToken) -> None:
+        with self._lock:
+            members = list(self._members)
+        if all(member._event.is_set() for member in members):
+            self.cancel(token.reason or CANCELLED_REASON)
+
+
+# Work outside a request (warm-up, startup) runs under a token that never cancels
+NO_REQUEST = CancelToken()
+current_token: ContextVar[CancelToken] = ContextVar("request_token", default=NO_REQUEST)
+
+
+def deadline_from_message(message: Dict[str, Any]) -> Optional[float]:
+    """Converts a message's `deadline` (epoch ms) or `timeoutMs` to a time.monotonic() deadline."""
+    deadlines = []
+    if isinstance(message.get("deadline"), (int, float)):
+        deadlines.append(time.monotonic() + message["deadline"] / 1000 - time.time())
+    if isinstance(message.get("timeoutMs"), (int, float)):
+        deadlines.append(time.monotonic() + message["timeoutMs"] / 1000)
+    return min(deadlines) if deadlines else None
+
+
+def communicate(process: subprocess.Popen, timeout: Optional[float] = None, input=None):
+    """
+    Popen.communicate() bounded by the current request: the wait is capped at
+    the deadline and the process tree is killed as soon as the request is
+    cancelled.
+
+    Raises subprocess.TimeoutExpired for the caller's own timeout (the process
+    is left to the caller, as with communicate) and RequestCancelled after
+    killing the process tree if the request ended first.
+    """
+    token = current_token.get()
+    try:
+        capped = token.timeout(timeout)
+    except RequestCancelled:
+        kill_tree(process)
+        process.communicate()
+        raise
+    try:
+        # The canceller (the main loop, the deadline watcher) must not wait for the tree to exit
+        with token.on_cancel(lambda: kill_tree_in_background(process)):
+            result = process.communicate(input=input, timeout=capped)
+    except subprocess.TimeoutExpired:
+        if token.cancelled:
+            kill_tree(process)
+            process.communicate()
+            token.check()
+        raise
+    if token.cancelled:
+        # Wait for a background kill to finish before reporting the cancellation
+        kill_tree(process)
+    token.check()
+    return result
+
+
+class RequestRegistry:
+    """
+    Queued and running requests: by request ID for cancel, and by deadline
+    for a watcher thread that cancels them when it passes.
+    """
+
+    def __init__(self, on_stopped: Optional[Callable[[CancelToken], Any]] = None):
+        """
+        Args:
+            on_stopped: Called with a token after it was cancelled or expired,
+                e.g. to answer the request right away
+        """
+        self._on_stopped = on_stopped
+        self._lock = threading.Condition()
+        self._tokens: Dict[Any, CancelToken] = {}
+        self._active = set()
+        self._deadlines = []
+        self._sequence = itertools.count()
+        self._watcher = None
+        self._stats = {"cancelled": 0, "cancelMisses": 0, "expired": 0}
+
+    def register(self, token: CancelToken) -> None:
+        with self._lock:
+            self._active.add(id(token))
+            if token.request_id is not None:
+                self._tokens[token.request_id] = token
+            if token.deadline is not None:
+                heapq.heappush(self._deadlines, (token.deadline, next(self._sequence), token))
+                if self._watcher is None:
+                    self._watcher = threading.Thread(target=self._watch, name="request-deadlines", daemon=True)
+                    self._watcher.start()
+                self._lock.notify()
+
+    def unregister(self, token: CancelToken) -> None:
+        with self._lock:
+            self._active.discard(id(token))
+            if self._tokens.get(token.request_id) is token:
+                del self._tokens[token.request_id]
+
+    def get(self, request_id: Any) -> Optional[CancelToken]:
+        with self._lock:
+            return self._tokens.get(request_id)
+
+    def cancel(self, request_id: Any) -> Optional[CancelToken]:
+        """Cancels a queued or running request; returns its token, or None if it is unknown or done."""
+        token = self.get(request_id)
+        if token is None or not token.cancel():
+            with self._lock:
+                self._stats["cancelMisses"] += 1
+            return None
+        with self._lock:
+            self._stats["cancelled"] += 1
+        if self._on_stopped:
+            self._on_stopped(token)
+        return token
+
+    def _watch(self) -> None:
+        while True:
+            with self._lock:
+                while not self._deadlines:
+                    self._lock.wait()
+                deadline, _, token = self._deadlines[0]
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._lock.wait(delay)
+                    continue
+                heapq.heappop(self._deadlines)
+                if id(token) not in self._active:
+                    continue
+            if token.cancel(DEADLINE_REASON):
+                with self._lock:
+                    self._stats["expired"] += 1
+                if self._on_stopped:
+                    self._on_stopped(token)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, active=len(self._active))
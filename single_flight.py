@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Single-flight coalescing for the Browser Launcher Pro native host.
+
+The popup and background.js often ask for the same thing at nearly the same
+time (getWSLInstances, getBrowserVersion for one key, getHardwareInfo). For
+idempotent read actions the host keys each request on its action and
+normalized parameters; a request that arrives while an identical one is in
+flight attaches to that computation instead of starting another, and every
+caller receives the same result.
+"""
+
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Iterable, Tuple
+
+# Message fields that identify a request rather than describe the work
+DEFAULT_IGNORED_FIELDS = ("requestId",)
+
+
+def request_key(message: Dict[str, Any], ignored: Iterable[str] = DEFAULT_IGNORED_FIELDS,
+                case_insensitive: Iterable[str] = ()) -> str:
+    """
+    Returns a canonical key for a message: its fields sorted, identifying
+    fields dropped and case-insensitive string fields lower-cased.
+    """
+    ignored = set(ignored)
+    case_insensitive = set(case_insensitive)
+    params = {}
+    for name, value in message.items():
+        if name in ignored:
+            continue
+        if name in case_insensitive and isinstance(value, str):
+            value = value.strip().lower()
+        params[name] = value
+    return json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class SingleFlight:
+    """Shares one in-flight Future between concurrent callers with the same key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def submit(self, key: Hashable, start: Callable[[], Future], label: str = "") -> Tuple[Future, bool]:
+        """
+        Returns (future, coalesced). If a call with the same key is in flight
+        its future is returned; otherwise start() is called to begin the work
+        and its future is shared until it completes.
+        """
+        with self._lock:
+            stats = self._stats.setdefault(label, {"executed": 0, "coalesced": 0})
+            future = self._in_flight.get(key)
+            if future is not None:
+                stats["coalesced"] += 1
+                return future, True
+            future = start()
+            self._in_flight[key] = future
+            stats["executed"] += 1
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future, False
+
+    def _forget(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_label = {label: dict(counts) for label, counts in self._stats.items()}
+            in_flight = len(self._in_flight)
+        executed = sum(counts["executed"] for counts in by_label.values())
+        coalesced = sum(counts["coalesced"] for counts in by_label.values())
+        return {
+            "executed": executed,
+            "coalesced": coalesced,
+            "inFlight": in_flight,
+            "byAction": by_label,
+        }
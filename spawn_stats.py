@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Subprocess spawn accounting for the Browser Launcher Pro native host.
+
+Every process the host starts costs far more than the Python work around it
+(cmd.exe and wsl.exe especially), so spawns are counted per calling action:
+
+- `account_spawn()` wraps a spawn made by the host's own helpers
+  (run_command, run_launch_command, probes) and records its duration.
+- `run()` is a drop-in for subprocess.run that does the same (and, like
+  every host wait, honors the current request's deadline and cancellation).
+- An audit hook (`install_audit_hook()`) counts every other subprocess.Popen,
+  e.g. from the helpers shared with wslscripts, so no spawn goes unseen;
+  those are recorded without a duration.
+
+The calling action is a context variable set by handle_message, and the
+worker pool carries it over to the threads that run the work.
+"""
+
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from process_tree import ConfinedPopen, kill_tree
+from request_control import communicate
+
+# Action for spawns outside a message (warm-up pings, startup)
+BACKGROUND_ACTION = "background"
+RECENT_SPAWNS = 50
+
+current_action: ContextVar[str] = ContextVar("spawn_action", default=BACKGROUND_ACTION)
+
+_SHELL_PROGRAM = re.compile(r'^\s*(?:"([^"]+)"|(\S+))')
+# Set while a wrapped spawn runs so the audit hook does not count it twice
+_accounting = threading.local()
+
+
+def program_name(args) -> str:
+    """Returns the lower-cased program name of a shell command string or argv."""
+    if isinstance(args, (bytes, str)):
+        if isinstance(args, bytes):
+            args = args.decode("utf-8", errors="replace")
+        match = _SHELL_PROGRAM.match(args)
+        program = (match.group(1) or match.group(2)) if match else ""
+    else:
+        args = list(args) if args is not None else []
+        program = str(args[0]) if args else ""
+    return re.split(r"[\\/]", program)[-1].lower()
+
+
+class SpawnStats:
+    """Thread-safe spawn counters per action and program."""
+
+    def __init__(self, recent: int = RECENT_SPAWNS):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=recent)
+        self._actions: Dict[str, Dict[str, Any]] = {}
+        self._started = time.time()
+
+    def record(self, program: str, duration: Optional[float] = None, action: Optional[str] = None) -> None:
+        """Records one spawn; duration is None when only the spawn itself was seen."""
+        action = action or current_action.get()
+        with self._lock:
+            entry = self._actions.setdefault(action, {
+                "count": 0, "timed": 0, "totalMs": 0.0, "maxMs": 0.0, "programs": {}})
+            entry["count"] += 1
+            entry["programs"][program] = entry["programs"].get(program, 0) + 1
+            if duration is not None:
+                ms = duration * 1000
+                entry["timed"] += 1
+                entry["totalMs"] += ms
+                entry["maxMs"] = max(entry["maxMs"], ms)
+            self._recent.append({
+                "action": action,
+                "program": program,
+                "durationMs": round(duration * 1000, 1) if duration is not None else None,
+                "timestamp": round(time.time(), 3),
+            })
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            by_action = {}
+            for action, entry in self._actions.items():
+                by_action[action] = {
+                    "count": entry["count"],
+                    "timed": entry["timed"],
+                    "totalMs": round(entry["totalMs"], 1),
+                    "avgMs": round(entry["totalMs"] / entry["timed"], 1) if entry["timed"] else None,
+                    "maxMs": round(entry["maxMs"], 1),
+                    "programs": dict(entry["programs"]),
+                }
+            return {
+                "total": sum(entry["count"] for entry in self._actions.values()),
+                "since": round(self._started, 3),
+                "byAction": by_action,
+                "recent": list(self._recent),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._actions.clear()
+            self._recent.clear()
+            self._started = time.time()
+
+
+spawn_stats = SpawnStats()
+
+
+@contextmanager
+def action_context(action: str):
+    """Attributes spawns made inside the block (and work it submits) to an action."""
+    token = current_action.set(action)
+    try:
+        yield
+    finally:
+        current_action.reset(token)
+
+
+@contextmanager
+def account_spawn(args):
+    """Times one spawn, from start until the block (normally the wait) ends."""
+    depth = getattr(_accounting, "depth", 0)
+    _accounting.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _accounting.depth = depth
+        if depth == 0:
+            spawn_stats.record(program_name(args), time.perf_counter() - start)
+
+
+def run(args, input=None, capture_output: bool = False, timeout: Optional[float] = None,
+        check: bool = False, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run with spawn accounting, bounded by the current request; a timeout kills the whole tree."""
+    if capture_output:
+        kwargs["stdout"] = subprocess.PIPE
+        kwargs["stderr"] = subprocess.PIPE
+    if input is not None:
+        kwargs["stdin"] = subprocess.PIPE
+    with account_spawn(args):
+        with ConfinedPopen(args, **kwargs) as process:
+            try:
+                stdout, stderr = communicate(process, timeout, input)
+            except subprocess.TimeoutExpired:
+                kill_tree(process)
+                process.communicate()
+                raise
+            returncode = process.poll()
+    if check and returncode:
+        raise subprocess.CalledProcessError(returncode, process.args, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(process.args, returncode, stdout, stderr)
+
+
+def _audit(event: str, args) -> None:
+    if event == "subprocess.Popen" and not getattr(_accounting, "depth", 0):
+        try:
+            spawn_stats.record(program_name(args[1] if args[1] is not None else args[0]))
+        except Exception:
+            # An audit hook must never break the spawn it observes
+            pass
+
+
+_audit_hook_installed = False
+
+
+def install_audit_hook() -> None:
+    """Counts spawns not made through the wrappers above. Audit hooks cannot be removed."""
+    global _audit_hook_installed
+    if not _audit_hook_installed:
+        sys.addaudithook(_audit)
+        _audit_hook_installed = True
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import configparser
+import json
+import os
+
+import pytest
+
+from admission import AdmissionConfigError, AdmissionController, Limit, admission_from_config, parse_limit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_action_bucket_allows_a_burst_then_asks_to_retry_after_refill():
+    clock = FakeClock()
+    controller = AdmissionController({"runCommand": Limit(2.0, 3)}, target_limit=None, clock=clock)
+
+    assert [controller.admit("runCommand") for _ in range(3)] == [None, None, None]
+    rejection = controller.admit("runCommand")
+    assert rejection["throttled"] and rejection["reason"] == "action"
+    assert rejection["retryAfterMs"] == 500
+    # Unlimited actions are never throttled
+    assert controller.admit("getWSLInstances") is None
+
+    clock.now += 0.5
+    assert controller.admit("runCommand") is None
+    assert controller.admit("runCommand") is not None
+
+
+def test_target_bucket_throttles_one_browser_without_spending_other_tokens():
+    clock = FakeClock()
+    controller = AdmissionController({"runCommand": Limit(10.0, 10)}, target_limit=Limit(1.0, 1), clock=clock)
+
+    assert controller.admit("runCommand", ["wsl:ubuntu", "browser:ubuntu/firefox"]) is None
+    rejection = controller.admit("runCommand", ["wsl:ubuntu", "browser:ubuntu/firefox"])
+    assert rejection["reason"] == "target" and rejection["retryAfterMs"] == 1000
+    assert controller.admit("runCommand", ["browser:chrome.exe"]) is None
+
+    stats = controller.stats()
+    assert stats["admitted"] == 2
+    assert stats["rejected"] == {"action": 0, "target": 1, "backlog": 0, "total": 1}
+    assert stats["rejectedByAction"] == {"runCommand": 1}
+    # The rejected request took no action token: 10 - 2 admitted are left
+    assert [controller.admit("runCommand") for _ in range(8)] == [None] * 8
+    assert controller.admit("runCommand")["reason"] == "action"
+
+
+def test_backlog_cap_rejects_any_action():
+    controller = AdmissionController({}, target_limit=None, max_backlog=4)
+
+    assert controller.admit("getHardwareInfo", backlog=3) is None
+    rejection = controller.admit("getHardwareInfo", backlog=4)
+    assert rejection["reason"] == "backlog" and rejection["retryAfterMs"] == 1000
+    assert AdmissionController({}, max_backlog=4, enabled=False).admit("runCommand", backlog=100) is None
+
+
+def test_hosts_share_buckets_and_in_flight_work(tmp_path):
+    """Each sendNativeMessage starts a new host, so a storm is only throttled through the shared state."""
+    clock = FakeClock()
+    state_path = str(tmp_path / "admission.json")
+
+    def new_host():
+        return AdmissionController({"runCommand": Limit(1.0, 2)}, target_limit=None, max_backlog=3,
+                                   clock=clock, state_path=state_path)
+
+    assert new_host().admit("runCommand") is None
+    assert new_host().admit("runCommand") is None
+    rejection = new_host().admit("runCommand")
+    assert rejection["reason"] == "action"
+    # The extension's command callbacks read `result`
+    assert rejection["result"].startswith("Error: Too many requests")
+
+    # Work in flight in another (live) host counts towards the backlog
+    with open(state_path) as f:
+        state = json.load(f)
+    assert state["inflight"] == {str(os.getpid()): 2}
+    state["inflight"] = {str(os.getppid()): 3, "999999999": 5}
+    with open(state_path, "w") as f:
+        json.dump(state, f)
+    clock.now += 10
+    assert new_host().admit("getHardwareInfo")["reason"] == "backlog"
+
+    host = new_host()
+    state["inflight"] = {str(os.getppid()): 1}
+    with open(state_path, "w") as f:
+        json.dump(state, f)
+    assert host.admit("getHardwareInfo") is None
+    host.release()
+    with open(state_path) as f:
+        assert json.load(f)["inflight"] == {str(os.getppid()): 1}
+
+
+def test_limits_from_config(tmp_path):
+    config = configparser.ConfigParser()
+    config.read_string("[Admission]\nmax_backlog = 8\ntarget = 1/2\nrunCommand = 0.5/1\n"
+                       f"getHardwareInfo = 3\nopenUrls = fast\nstate_file = {tmp_path / 'admission.json'}\n")
+    controller = admission_from_config(config)
+
+    assert controller.max_backlog == 8
+    assert controller.state_path == str(tmp_path / "admission.json")
+    assert controller.target_limit == Limit(1.0, 2)
+    assert controller.action_limits["runcommand"] == Limit(0.5, 1)
+    assert controller.action_limits["gethardwareinfo"] == Limit(3.0, 3)
+    # An invalid entry keeps the default
+    assert controller.action_limits["openurls"] == Limit(5.0, 10)
+    assert controller.admit("runCommand") is None
+    assert controller.admit("runCommand")["retryAfterMs"] == 2000
+    with pytest.raises(AdmissionConfigError):
+        parse_limit("0/5")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "wslscripts"))
+from connectivity_probe import (probe_in_wsl, run_probes, DIAGNOSIS_ONLINE, DIAGNOSIS_DNS_FAILURE,
+                                DIAGNOSIS_NO_ROUTE, DIAGNOSIS_NO_GATEWAY)
+
+def start_listener():
+    """Starts a local stand-in listener that accepts and closes connections."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(16)
+
+    def accept():
+        while True:
+            try:
+                conn, _ = server.accept()
+                conn.close()
+            except OSError:
+                return
+
+    threading.Thread(target=accept, daemon=True).start()
+    return server, server.getsockname()[1]
+
+def closed_port():
+    """Returns a local port with nothing listening on it."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+def test_online_returns_early():
+    """DNS plus one TCP success is enough; a slow probe does not delay the verdict."""
+    server, port = start_listener()
+    try:
+        # 192.0.2.1 (TEST-NET-1) is never routed, so this probe can only time out
+        report = run_probes(dns_names=["localhost"],
+                            tcp_targets=[("127.0.0.1", port), ("192.0.2.1", 443)],
+                            gateway=False, timeout=5)
+    finally:
+        server.close()
+    assert report["online"]
+    assert report["diagnosis"] == DIAGNOSIS_ONLINE
+    assert report["elapsed"] < 4
+
+def test_dns_failure_is_distinguished_from_routing():
+    server, port = start_listener()
+    try:
+        report = run_probes(dns_names=["name.invalid"], tcp_targets=[("127.0.0.1", port)],
+                            gateway=False, timeout=2)
+    finally:
+        server.close()
+    assert not report["online"]
+    assert report["diagnosis"] == DIAGNOSIS_DNS_FAILURE
+
+def test_gateway_reachable_but_no_route():
+    """A refused connection proves the gateway is up; failing internet targets mean no route."""
+    report = run_probes(dns_names=["localhost"], tcp_targets=[("127.0.0.1", closed_port())],
+                        gateway="127.0.0.1", gateway_port=closed_port(), timeout=2)
+    assert report["diagnosis"] == DIAGNOSIS_NO_ROUTE
+    gateway_probe = [p for p in report["probes"] if p["kind"] == "gateway"][0]
+    assert gateway_probe["ok"] and gateway_probe["detail"] == "refused"
+
+def test_gateway_unreachable():
+    # An unresolvable address fails like an unreachable gateway, without depending on the network
+    report = run_probes(dns_names=[], tcp_targets=[("127.0.0.1", closed_port())],
+                        gateway="gateway.invalid", timeout=0.5)
+    assert report["diagnosis"] == DIAGNOSIS_NO_GATEWAY
+
+def test_cli_does_not_wait_for_a_hung_lookup():
+    """The process exits at the probe timeout even while getaddrinfo is still blocked."""
+    script = ("import sys, time, connectivity_probe as c\n"
+              "c.probe_dns = lambda name, timeout: time.sleep(30)\n"
+              "sys.argv = ['connectivity_probe.py', '--json', '--timeout', '0.5']\n"
+              "c.main()\n")
+    wslscripts = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wslscripts")
+    result = subprocess.run([sys.executable, "-c", script], cwd=wslscripts, capture_output=True, timeout=10)
+    assert b'"diagnosis"' in result.stdout
+
+@pytest.mark.skipif(os.name == "nt", reason="fake wsl is a shell script")
+def test_probe_in_wsl_stops_with_the_request(tmp_path):
+    """With the host's runner a cancelled request ends the probe and its wsl tree."""
+    import spawn_stats
+    from request_control import CancelToken, RequestCancelled, current_token
+
+    wsl = tmp_path / "wsl"
+    wsl.write_text("#!/bin/sh\nsleep 30\n")
+    wsl.chmod(0o755)
+    token = CancelToken("probe")
+    threading.Timer(0.2, token.cancel).start()
+    context_token = current_token.set(token)
+    start = time.monotonic()
+    try:
+        with pytest.raises(RequestCancelled):
+            probe_in_wsl("Ubuntu", timeout=3, wsl_executable=str(wsl), run=spawn_stats.run)
+    finally:
+        current_token.reset(context_token)
+
+    assert time.monotonic() - start < 3
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from job_manager import (JobManager, JobStepError, JOB_SUCCEEDED, JOB_FAILED,
+                         JOB_CANCELLED, JOB_INTERRUPTED)
+
+def test_job_runs_steps_in_order(tmp_path):
+    """Steps run in order and their output is recorded."""
+    manager = JobManager(str(tmp_path / "jobs.journal"))
+    calls = []
+    steps = [
+        ("first", lambda job: calls.append("first") or "one"),
+        ("second", lambda job: calls.append("second") or "two"),
+    ]
+    job_id = manager.submit("demo", steps, {"instance": "Ubuntu"})
+    job = manager.wait(job_id, timeout=5)
+
+    assert calls == ["first", "second"]
+    assert job["status"] == JOB_SUCCEEDED
+    assert [step["output"] for step in job["steps"]] == ["one", "two"]
+
+def test_failed_step_stops_pipeline(tmp_path):
+    """A failing step marks the job failed and skips the remaining steps."""
+    manager = JobManager(str(tmp_path / "jobs.journal"))
+
+    def fail(job):
+        raise JobStepError("Command failed with return code 1")
+
+    job_id = manager.submit("demo", [("fail", fail), ("never", lambda job: "ran")])
+    job = manager.wait(job_id, timeout=5)
+
+    assert job["status"] == JOB_FAILED
+    assert "fail" in job["error"]
+    assert job["steps"][1]["status"] == "skipped"
+
+def test_cancel_skips_remaining_steps(tmp_path):
+    """Cancelling a running job stops it before the next step."""
+    manager = JobManager(str(tmp_path / "jobs.journal"))
+    started = threading.Event()
+    release = threading.Event()
+
+    def block(job):
+        started.set()
+        release.wait(5)
+
+    job_id = manager.submit("demo", [("block", block), ("never", lambda job: "ran")])
+    started.wait(5)
+    assert manager.cancel(job_id)
+    release.set()
+    job = manager.wait(job_id, timeout=5)
+
+    assert job["status"] == JOB_CANCELLED
+    assert job["steps"][1]["status"] == JOB_CANCELLED
+    assert not manager.cancel(job_id)
+
+def test_cancel_from_another_host_process(tmp_path):
+    """A cancelJob handled by a new host reaches the host running the job."""
+    journal = str(tmp_path / "jobs.journal")
+    manager = JobManager(journal)
+    started = threading.Event()
+
+    def block(job):
+        started.set()
+        job.cancel_event.wait(10)
+
+    job_id = manager.submit("demo", [("block", block), ("never", lambda job: "ran")])
+    started.wait(5)
+    other_host = subprocess.run(
+        [sys.executable, "-c", "import sys; from job_manager import JobManager; "
+         "print(JobManager(sys.argv[1]).cancel(sys.argv[2]))", journal, job_id],
+        capture_output=True, text=True, timeout=30, cwd=os.path.dirname(os.path.abspath(__file__)))
+    job = manager.wait(job_id, timeout=5)
+
+    assert other_host.stdout.strip() == "True"
+    assert job["status"] == JOB_CANCELLED
+    assert not (tmp_path / f"jobs.journal.{job_id}.cancel").exists()
+
+def test_progress_is_visible_to_another_host(tmp_path):
+    """A status query from a new host sees progress before the step finishes."""
+    journal = str(tmp_path / "jobs.journal")
+    manager = JobManager(journal)
+    reported = threading.Event()
+    release = threading.Event()
+
+    def update(job):
+        manager.set_progress(job, {"distros": [{"name": "Ubuntu", "status": "running"}]})
+        reported.set()
+        release.wait(5)
+
+    job_id = manager.submit("demo", [("update", update)])
+    reported.wait(5)
+    try:
+        job = JobManager(journal).get(job_id)
+    finally:
+        release.set()
+        manager.wait(job_id, timeout=5)
+
+    assert job["steps"][0]["status"] == "running"
+    assert job["progress"] == {"distros": [{"name": "Ubuntu", "status": "running"}]}
+
+def test_journal_survives_restart(tmp_path):
+    """A new manager sees finished jobs and marks orphaned ones as interrupted."""
+    journal = tmp_path / "jobs.journal"
+    manager = JobManager(str(journal))
+    job_id = manager.submit("demo", [("only", lambda job: "done")])
+    manager.wait(job_id, timeout=5)
+
+    orphan = {"id": "orphan", "name": "demo", "status": "running", "pid": 0,
+              "created": 0, "steps": [{"name": "only", "status": "running"}]}
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write(json.dumps(orphan) + "\n")
+
+    restarted = JobManager(str(journal))
+    assert restarted.get(job_id)["status"] == JOB_SUCCEEDED
+    assert restarted.get("orphan")["status"] == JOB_INTERRUPTED
+    assert [job["id"] for job in restarted.list(JOB_INTERRUPTED)] == ["orphan"]
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import os
+import stat
+import subprocess
+import threading
+import time
+
+import pytest
+
+import native_messaging
+from launch_latency import (KIND_LOCAL, KIND_SANDBOX, KIND_WSL, LatencyHistogram, LaunchLatencyTracker, LaunchTarget,
+                            classify_launch, wsl_watch_argv)
+
+posix_only = pytest.mark.skipif(os.name == "nt", reason="uses a /bin/sh script as the browser")
+
+
+def fake_browser(tmp_path, name="fakebrowser", lifetime=2):
+    path = tmp_path / name
+    path.write_text(f"#!/bin/sh\nsleep {lifetime}\n")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+def test_classifies_launch_commands():
+    chrome = classify_launch(r'"C:\Program Files\Google\Chrome\Application\chrome.exe"')
+    assert (chrome.kind, chrome.browser, chrome.images) == (KIND_LOCAL, "chrome.exe", ("chrome.exe", "chrome"))
+
+    wsl = classify_launch("wsl -d Ubuntu google-chrome-stable", "Ubuntu", " google-chrome-stable")
+    assert (wsl.kind, wsl.browser, wsl.distro) == (KIND_WSL, "ubuntu/google-chrome-stable", "Ubuntu")
+    assert "chrome" in wsl.images
+    assert wsl_watch_argv("wsl", wsl)[:4] == ["wsl", "-d", "Ubuntu", "--"]
+    assert wsl_watch_argv("wsl", wsl)[-2:] == ["google-chrome-s", "chrome"]
+    assert wsl_watch_argv("wsl", wsl, elapsed=1.2)[-3] == "2"
+
+    # prepareWSLCommand in background.js names the user when one is set
+    as_user = classify_launch("wsl -d Ubuntu -u dev firefox", "Ubuntu", " -u dev firefox")
+    assert (as_user.browser, as_user.images[0]) == ("ubuntu/firefox", "firefox")
+    assert classify_launch("wsl -d Ubuntu -- firefox", "Ubuntu", " -- firefox").browser == "ubuntu/firefox"
+    assert native_messaging.get_launch_resource_keys("wsl -d Ubuntu -u dev firefox") == [
+        "wsl:ubuntu", "browser:ubuntu/firefox"]
+
+    unquoted = classify_launch(r"C:\Browsers\firefox.exe --new-window")
+    assert (unquoted.kind, unquoted.browser) == (KIND_LOCAL, "firefox.exe")
+    assert classify_launch("/usr/bin/google-chrome-stable").images[:3] == (
+        "google-chrome-stable", "chrome", "chrome.exe")
+
+    assert classify_launch("WindowsSandbox").kind == KIND_SANDBOX
+    assert classify_launch("runas /user:admin cmd") is None
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = LatencyHistogram(bounds=(100, 1000))
+    for ms in (50, 80, 400, 2000):
+        histogram.add(ms)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"100": 2, "1000": 1, "+Inf": 1}
+    assert (snapshot["minMs"], snapshot["maxMs"], snapshot["avgMs"]) == (50, 2000, 632.5)
+    assert (snapshot["p50Ms"], snapshot["p95Ms"]) == (100, 2000)
+
+
+@posix_only
+def test_watch_times_the_browser_from_message_receipt(tmp_path):
+    tracker = LaunchLatencyTracker()
+    target = LaunchTarget(KIND_LOCAL, "fakebrowser", ("fakebrowser",))
+    received_at = time.time()
+    watch = tracker.watch(target, received_at)
+    threading.Timer(0.3, lambda: os.spawnv(os.P_NOWAIT, fake_browser(tmp_path), ["fakebrowser"])).start()
+
+    result = watch.finish()
+
+    assert result["outcome"] == "started"
+    assert 250 <= result["ms"] < 3000
+    assert result["histogram"]["count"] == 1
+
+    # A failed launch stops its watch at once and is counted apart
+    start = time.monotonic()
+    failed = tracker.watch(LaunchTarget(KIND_LOCAL, "fakebrowser", ("nosuchbrowser",))).finish(failed=True)
+    assert failed["outcome"] == "failed" and time.monotonic() - start < 1
+    assert tracker.snapshot()["byKind"][KIND_LOCAL]["fakebrowser"]["failed"] == 1
+
+
+@posix_only
+def test_watch_gives_up_after_its_window():
+    tracker = LaunchLatencyTracker(windows={KIND_LOCAL: 0.2})
+    watch = tracker.watch(LaunchTarget(KIND_LOCAL, "ghost", ("ghostbrowser",)))
+
+    assert watch.finish(wait=0)["outcome"] == "pending"
+    assert watch.finish()["outcome"] == "notSeen"
+    assert tracker.snapshot()["byKind"][KIND_LOCAL]["ghost"]["notSeen"] == 1
+
+
+@posix_only
+def test_wsl_probe_ignores_browsers_already_running(tmp_path):
+    """The in-distro probe waits for a new browser process, not one started before the message."""
+    running = subprocess.Popen([fake_browser(tmp_path, lifetime=10)])
+    time.sleep(2.2)
+    target = LaunchTarget(KIND_WSL, "ubuntu/fakebrowser", ("fakebrowser",), "Ubuntu")
+    probe = subprocess.Popen(wsl_watch_argv("wsl", target)[4:])
+    try:
+        with pytest.raises(subprocess.TimeoutExpired):
+            probe.wait(timeout=0.5)
+        launched = subprocess.Popen([fake_browser(tmp_path)])
+        assert probe.wait(timeout=5) == 0
+        launched.kill()
+    finally:
+        probe.kill()
+        running.kill()
+
+
+@posix_only
+def test_launch_reply_carries_latency(tmp_path):
+    browser = fake_browser(tmp_path, "latencybrowser")
+
+    response = native_messaging.run_browser_command(browser, "https://example.com")
+
+    assert "Error" not in response["result"]
+    latency = response["launchLatency"]
+    assert (latency["kind"], latency["browser"], latency["outcome"]) == (KIND_LOCAL, "latencybrowser", "started")
+    assert latency["histogram"]["count"] >= 1
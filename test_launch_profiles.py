@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import configparser
+import os
+
+import pytest
+
+from launch_profiles import LaunchProfileError, compile_launch_profile, compile_launch_profiles
+
+CONFIG = r"""
+[Logging]
+filename = BrowserLauncher.log
+
+[LaunchProfile:ubuntu-chrome]
+executable = wsl
+args = -d Ubuntu google-chrome
+flags = --no-sandbox
+timeout = 15
+
+[LaunchProfile:ubuntu-firefox]
+executable = wsl
+args = -d Ubuntu firefox
+url_flag = -new-tab
+
+[LaunchProfile:chrome-work]
+executable = %ProgramFiles%\Google\Chrome\Application\chrome.exe
+args = --profile-directory="Profile 1" {urls} --new-window
+
+[LaunchProfile:sandbox]
+executable = %windir%\system32\WindowsSandbox.exe
+url_placement = none
+
+[LaunchProfile:broken]
+args = --no-executable
+"""
+
+
+def load_profiles(monkeypatch):
+    monkeypatch.setenv("ProgramFiles", r"C:\Program Files")
+    monkeypatch.setenv("windir", r"C:\Windows")
+    config = configparser.ConfigParser()
+    config.read_string(CONFIG)
+    return compile_launch_profiles(config)
+
+
+def test_profiles_compile_to_argv_templates(monkeypatch):
+    profiles = load_profiles(monkeypatch)
+    assert sorted(profiles) == ["chrome-work", "sandbox", "ubuntu-chrome", "ubuntu-firefox"]
+    urls = ["https://a.example", "https://b.example"]
+
+    chrome = profiles["ubuntu-chrome"]
+    assert chrome.build_argv(urls) == ["wsl", "-d", "Ubuntu", "google-chrome", "--no-sandbox"] + urls
+    assert chrome.command == "wsl -d Ubuntu google-chrome --no-sandbox"
+    assert chrome.timeout == 15
+    assert profiles["ubuntu-firefox"].build_argv(urls) == \
+        ["wsl", "-d", "Ubuntu", "firefox", "-new-tab", urls[0], "-new-tab", urls[1]]
+    assert profiles["chrome-work"].build_argv(urls[:1]) == \
+        [os.path.expandvars(r"%ProgramFiles%\Google\Chrome\Application\chrome.exe"), "--profile-directory=Profile 1",
+         urls[0], "--new-window"]
+    # %VAR% is expanded on Windows only, like the rest of the host
+    assert profiles["sandbox"].build_argv(urls) == [os.path.expandvars(r"%windir%\system32\WindowsSandbox.exe")]
+
+    with pytest.raises(TypeError):
+        profiles["new"] = chrome
+    with pytest.raises(AttributeError):
+        chrome.timeout = 1
+
+
+def test_invalid_profiles_are_rejected():
+    with pytest.raises(LaunchProfileError):
+        compile_launch_profile("x", {"executable": "chrome", "args": "{urls} {urls}"})
+    with pytest.raises(LaunchProfileError):
+        compile_launch_profile("x", {"executable": "chrome", "timeout": "soon"})
+    with pytest.raises(LaunchProfileError):
+        compile_launch_profile("x", {"executable": "chrome", "url_placement": "middle"})
+    with pytest.raises(LaunchProfileError):
+        compile_launch_profile("x", {"executable": "firefox", "args": '"unterminated'})
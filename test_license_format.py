@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import base64
+import datetime
+
+import pytest
+
+from license_format import LicenseFormatError, check_license, decode_license_key, hardware_id_from_info
+from license_generator import LicenseGenerator
+from license_tool import generate_license_key as generate_tool_key
+
+
+def test_hardware_id_matches_background_js_digest():
+    # sha256 of JSON.stringify({platform: "Windows", mac: "00:11:22:33:44:55"})
+    info = {"platform": "Windows", "mac": "00:11:22:33:44:55"}
+    assert hardware_id_from_info(info) == "cdfd3c863425891aafbafda7463979c5c648f6bdbccfe9f4417c564dc8612f7f"
+    assert hardware_id_from_info(info) != hardware_id_from_info(dict(reversed(list(info.items()))))
+
+
+def test_check_license_verdicts():
+    device_id = hardware_id_from_info({"platform": "Windows", "node": "desk"})
+    other_id = hardware_id_from_info({"platform": "Windows", "node": "laptop"})
+    generator = LicenseGenerator()
+    today = datetime.date(2025, 6, 1)
+    subscription = generator.generate_license_key(device_id, "Jane", "jane@example.com", "subscription",
+                                                  "2025-01-01", "2025-07-01")
+
+    verdict = check_license(subscription, device_id, today)
+    assert verdict["valid"] and verdict["daysRemaining"] == 30 and verdict["expiryDate"] == "2025-07-01"
+    assert check_license(subscription, device_id, datetime.date(2025, 7, 1))["errorCode"] == "expired_key"
+    assert check_license(subscription, other_id, today)["errorCode"] == "hardware_mismatch"
+    assert check_license("not-a-key", device_id, today)["errorCode"] == "invalid_format"
+    assert check_license("ABCD#!!!", device_id, today)["errorCode"] == "extraction_failed"
+
+    tampered = "ZZZZZ-ZZZZ" + subscription[10:]
+    assert check_license(tampered, device_id, today)["errorCode"] == "tampered_key"
+    lifetime = generator.generate_license_key(device_id, "John", "john@example.com")
+    assert check_license(lifetime, device_id, today)["daysRemaining"] is None
+
+
+def test_decoder_accepts_all_formats():
+    device_id = hardware_id_from_info({"platform": "Windows", "node": "desk"})
+    legacy = LicenseGenerator().generate_license_key(device_id, "Jäne", "jane@example.com", "subscription",
+                                                      "2025-01-01", "2026-01-01", salt="ABCDE")
+    compact = LicenseGenerator("compact").generate_license_key(device_id, "Jäne", "jane@example.com",
+                                                               "subscription", "2025-01-01", "2026-01-01",
+                                                               salt="ABCDE")
+    assert len(compact) * 2 < len(legacy)
+
+    _, legacy_metadata = decode_license_key(legacy)
+    _, compact_metadata = decode_license_key(compact)
+    assert legacy_metadata.pop("format") == "legacy"
+    assert compact_metadata.pop("format") == "compact"
+    assert compact_metadata == legacy_metadata
+    assert check_license(compact, device_id, datetime.date(2025, 6, 1))["valid"]
+
+    tool_key = generate_tool_key(device_id)
+    key_part, tool_metadata = decode_license_key(tool_key)
+    assert key_part == tool_key and tool_metadata["hardwarePrefix"] == device_id[:8]
+    # The extension only accepts `key#metadata` keys, so the host does not either
+    assert check_license(tool_key, device_id) == {
+        "valid": False, "errorCode": "invalid_format", "message": "Invalid license key format"}
+
+
+def test_compact_keys_detect_corruption():
+    generator = LicenseGenerator("compact")
+    key = generator.generate_license_key("f86774665722036dd", "John", "john@example.com")
+    _, metadata = decode_license_key(key)
+    assert metadata["hardwareId"] == "f86774665722036dd" and metadata["licenseType"] == "lifetime"
+
+    key_part, payload = key.split("#")
+    with pytest.raises(LicenseFormatError):
+        decode_license_key(key_part.replace(key_part[0], "0" if key_part[0] != "0" else "1", 1) + "#" + payload)
+    with pytest.raises(LicenseFormatError):
+        decode_license_key(key_part + "#" + payload[:-6])
+    with pytest.raises(LicenseFormatError, match="version"):
+        decode_license_key(key_part + "#" + base64.urlsafe_b64encode(b"\x07abc").decode())
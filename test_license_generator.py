@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import multiprocessing.dummy
+
+import license_generator
+from license_generator import generate_bulk, read_bulk_records, write_bulk_results
+
+
+def test_reads_csv_and_jsonl_with_aliases():
+    csv_input = io.StringIO("hardware_id,name,email,type\nf86774665722036dd,John,j@x.com,lifetime\n")
+    jsonl_input = io.StringIO('{"hardwareId": "f86774665722036dd", "name": "Jane", '
+                              '"email": "ja@x.com", "licenseType": "subscription"}\n\n')
+    csv_record = next(read_bulk_records(csv_input, "csv"))
+    jsonl_record = next(read_bulk_records(jsonl_input, "jsonl"))
+    assert csv_record["hardware_id"] == jsonl_record["hardware_id"] == "f86774665722036dd"
+    assert jsonl_record["type"] == "subscription"
+
+
+def test_bulk_streams_keys_in_order_and_reports_errors():
+    records = [{"hardware_id": f"{i:016x}", "name": f"User {i}", "email": f"u{i}@x.com",
+                "type": "subscription", "purchase_date": "2024-02-29", "expiry": None}
+               for i in range(50)]
+    records.insert(10, {"hardware_id": "short", "name": "Bad", "email": "b@x.com"})
+    stats = {}
+    results = list(generate_bulk(iter(records), workers=2, chunksize=8, stats=stats))
+
+    assert len(results) == 51
+    assert "error" in results[10]
+    assert stats["generated"] == 50 and stats["errors"] == 1
+    assert results[0]["expiry"] == "2025-02-28"
+    assert [r["hardware_id"] for r in results] == [r["hardware_id"] for r in records]
+    key_parts = [r["license_key"].split("#")[0] for r in results if "license_key" in r]
+    assert len(set(key_parts)) == len(key_parts)
+
+    output = io.StringIO()
+    write_bulk_results(results, output, "jsonl")
+    lines = output.getvalue().splitlines()
+    assert len(lines) == 51
+    assert json.loads(lines[1])["license_key"] == results[1]["license_key"]
+
+
+def test_bulk_regenerates_colliding_keys(monkeypatch):
+    salts = iter(["AAAAA", "AAAAA", "BBBBB"])
+    monkeypatch.setattr(license_generator.LicenseGenerator, "generate_salt", lambda self, length=5: next(salts))
+    # Thread pool so the patched salt source is shared with the workers
+    monkeypatch.setattr(license_generator.multiprocessing, "Pool", multiprocessing.dummy.Pool)
+    records = [{"hardware_id": "f86774665722036dd", "name": "N", "email": "e@x.com"}] * 2
+    stats = {}
+    results = list(generate_bulk(iter(records), workers=1, stats=stats))
+
+    assert stats["collisions"] == 1
+    assert results[0]["license_key"].startswith("AAAA-A")
+    assert results[1]["license_key"].startswith("BBBB-B")
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+import json
+
+from license_generator import LicenseGenerator
+from license_registry import LicenseRegistry
+from license_tool import generate_license_key as generate_tool_key
+
+
+def test_registry_indexes_and_revokes(tmp_path):
+    generator = LicenseGenerator()
+    subscription = generator.generate_license_key("f86774665722036dd", "Jane", "Jane@Example.com",
+                                                  "subscription", "2025-01-01", "2026-01-01")
+    lifetime = generator.generate_license_key("0a1b2c3d4e5f6a7b", "John", "john@example.com")
+    tool_key = generate_tool_key("f86774665722036dd")
+
+    with LicenseRegistry(str(tmp_path / "registry.db")) as registry:
+        assert registry.add_many([subscription, lifetime]) == 2
+        assert registry.add(tool_key, source="license_tool", hardware_id="f86774665722036dd")
+        assert not registry.add(lifetime)
+
+        assert {r["license_key"] for r in registry.find(hardware_prefix="f867")} == {subscription, tool_key}
+        assert [r["license_key"] for r in registry.find(hardware_prefix="f86774665722")] == [subscription, tool_key]
+        assert [r["license_key"] for r in registry.find(email="jane@example.com")] == [subscription]
+        assert [r["license_key"] for r in registry.find(expires_before="2026-06-01")] == [subscription]
+        assert registry.get(tool_key)["hw_prefix"] == "f8677466"
+
+        assert not registry.is_revoked(subscription)
+        assert registry.revoke(subscription, "refunded")
+        assert not registry.revoke(subscription)
+        assert registry.is_revoked(subscription)
+        assert registry.get(subscription)["revoke_reason"] == "refunded"
+        assert [r["license_key"] for r in registry.find(hardware_prefix="f867", include_revoked=False)] == [tool_key]
+
+
+def test_registry_imports_key_files(tmp_path):
+    generator = LicenseGenerator()
+    keys = [generator.generate_license_key(f"{i:016x}", f"User {i}", f"u{i}@x.com") for i in range(20)]
+    (tmp_path / "keys.txt").write_text("# exported keys\n" + "\n".join(keys[:10]) + "\n\n")
+    (tmp_path / "keys.jsonl").write_text("".join(json.dumps({"license_key": k}) + "\n" for k in keys[5:]))
+
+    with LicenseRegistry(str(tmp_path / "registry.db")) as registry:
+        assert registry.import_file(str(tmp_path / "keys.txt")) == 10
+        assert registry.import_file(str(tmp_path / "keys.jsonl")) == 10
+        assert registry.count() == 20
+        assert registry.find(email="u3@x.com")[0]["source"] == "import"
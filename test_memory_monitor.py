@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+import threading
+import tracemalloc
+
+from memory_monitor import MemoryMonitor
+
+
+def test_profile_reports_top_sites_and_diff():
+    monitor = MemoryMonitor(trace=True, sample_interval=3600)
+    monitor.start()
+    try:
+        first = monitor.profile()
+        assert first["rssBytes"] > 0
+        assert first["tracemalloc"]["enabled"] and first["tracemalloc"]["diff"] is None
+
+        leak = [bytearray(1024) for _ in range(2000)]
+        second = monitor.profile(top=5)
+        assert len(second["tracemalloc"]["top"]) <= 5
+        grown = [site for site in second["tracemalloc"]["diff"] if site["sizeDiffBytes"] > 1024 * 1024]
+        assert grown and __file__ in grown[0]["site"]
+        assert len(second["rssSamples"]) >= 2
+        del leak
+    finally:
+        monitor.stop()
+    assert not tracemalloc.is_tracing()
+
+
+def test_ceiling_requests_restart_after_min_uptime():
+    monitor = MemoryMonitor(ceiling_bytes=1, min_uptime=3600)
+    monitor.sample()
+    assert not monitor.restart_requested
+    assert monitor.profile()["tracemalloc"] == {"enabled": False}
+
+    monitor = MemoryMonitor(ceiling_bytes=1, min_uptime=0)
+    monitor.sample()
+    assert monitor.restart_requested
+
+    disabled = MemoryMonitor(ceiling_bytes=0, min_uptime=0)
+    disabled.sample()
+    assert not disabled.restart_requested
+
+def test_host_restart_waits_for_maintenance_work(monkeypatch):
+    import native_messaging
+    from worker_pool import PRIORITY_MAINTENANCE, WorkerPool
+
+    monitor = MemoryMonitor(ceiling_bytes=1, min_uptime=0)
+    monitor.sample()
+    pool = WorkerPool()
+    monkeypatch.setattr(native_messaging, "memory_monitor", monitor)
+    monkeypatch.setattr(native_messaging, "scheduler", pool)
+    release = threading.Event()
+    job = pool.submit(release.wait, priority=PRIORITY_MAINTENANCE)
+    try:
+        # A long job (e.g. a WSL reinstall) postpones the restart...
+        assert not native_messaging.host_restart_due()
+    finally:
+        release.set()
+        job.result(timeout=5)
+        pool.shutdown()
+    # ...which happens between messages once it is done
+    assert native_messaging.host_restart_due()
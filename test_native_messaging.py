@@ -120,6 +120,38 @@ def test_native_messaging():
         if stderr:
             print(f"\nFinal stderr output: {stderr.decode('utf-8')}")
 
+def test_ping_fast_path_timing():
+    """Pings are answered with the host's receive/dispatch/send timestamps and uptime."""
+    process = subprocess.Popen(
+        [sys.executable, 'native_messaging.py'],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        replies = []
+        for request_id in range(3):
+            encoded_message = json.dumps({"action": "ping", "requestId": request_id}).encode('utf-8')
+            process.stdin.write(struct.pack('@I', len(encoded_message)) + encoded_message)
+            process.stdin.flush()
+            message_length = struct.unpack('@I', process.stdout.read(4))[0]
+            replies.append(json.loads(process.stdout.read(message_length).decode('utf-8')))
+    finally:
+        process.stdin.close()
+        process.wait(timeout=10)
+
+    assert [reply["requestId"] for reply in replies] == [0, 1, 2]
+    for reply in replies:
+        timing = reply["timing"]
+        assert reply["pong"] is True
+        assert timing["startedAt"] <= timing["receivedAt"] <= timing["dispatchedAt"] <= timing["sentAt"]
+        assert timing["hostMs"] == round(timing["sentAt"] - timing["receivedAt"], 3)
+        assert timing["uptimeMs"] > 0
+    # The static system info is collected once per process
+    assert len({json.dumps({k: v for k, v in reply["system_info"].items() if k != "timestamp"})
+                for reply in replies}) == 1
+    assert replies[2]["timing"]["uptimeMs"] > replies[0]["timing"]["uptimeMs"]
+
 def main():
     print("=== Native Messaging Test Suite ===")
     print("\nStep 1: Testing Registry Keys")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+
+import pytest
+
+import native_messaging
+
+BROWSER = "/usr/bin/firefox"
+
+posix_only = pytest.mark.skipif(os.name == "nt", reason="lengths are those of the Linux argv launch")
+
+
+def url(index):
+    return f"https://a.example/{index}"
+
+
+@pytest.fixture
+def launches(monkeypatch):
+    """Records each launch instead of running it; URLs containing 'fail' make their launch fail."""
+    calls = []
+    lock = threading.Lock()
+
+    def fake_run_command_with_urls(command, urls, timeout=30):
+        with lock:
+            calls.append(list(urls))
+        return "Error running command: boom" if any("fail" in u for u in urls) else "Command executed"
+
+    monkeypatch.setattr(native_messaging, "run_command_with_urls", fake_run_command_with_urls)
+    monkeypatch.setattr(native_messaging, "LAUNCH_LATENCY_ENABLED", False)
+    # Two URLs per launch: 16 characters of command plus 29 per URL
+    monkeypatch.setattr(native_messaging, "get_command_line_limit", lambda: 80)
+    return calls
+
+
+@posix_only
+def test_chunks_pack_urls_under_the_limit():
+    urls = [url(i) for i in range(5)]
+
+    chunks, too_long = native_messaging.chunk_urls_for_command(BROWSER, urls, limit=80)
+
+    assert chunks == [urls[0:2], urls[2:4], urls[4:5]]
+    assert too_long == []
+    for chunk in chunks:
+        assert native_messaging.command_length(native_messaging.build_launch_command(BROWSER, chunk)) <= 80
+
+
+@posix_only
+def test_chunks_set_aside_urls_too_long_for_any_launch():
+    long_url = "https://a.example/" + "x" * 100
+
+    chunks, too_long = native_messaging.chunk_urls_for_command(BROWSER, [url(0), long_url, url(1)], limit=80)
+
+    assert chunks == [[url(0), url(1)]]
+    assert too_long == [long_url]
+
+
+@posix_only
+def test_open_urls_dedups_and_reports_in_request_order(launches):
+    long_url = "https://a.example/" + "x" * 100
+    urls = [url(0), url(1), url(0), "", long_url, url(2)]
+
+    response = native_messaging.open_urls(BROWSER, urls)
+
+    assert response["launches"] == 2
+    assert sorted(launches) == [[url(0), url(1)], [url(2)]]
+    assert [result["url"] for result in response["results"]] == urls
+    assert [result["status"] for result in response["results"]] == ["ok", "ok", "ok", "error", "error", "ok"]
+    assert response["results"][3]["result"] == "Error: Empty URL"
+    assert "length limit" in response["results"][4]["result"]
+
+
+@posix_only
+def test_open_urls_does_not_retry_multi_url_launches(launches, monkeypatch):
+    retried = []
+    monkeypatch.setattr(native_messaging, "run_command_with_retry",
+                        lambda command, url, urls=None, **kwargs: retried.append(urls) or "Command executed")
+
+    response = native_messaging.open_urls(BROWSER, [url("fail-0"), url(1), url(2)])
+
+    # The failed pair ran once, so tabs it may have opened are not opened twice
+    assert launches == [[url("fail-0"), url(1)]]
+    assert retried == [[url(2)]]
+    assert [result["status"] for result in response["results"]] == ["error", "error", "ok"]
+    assert response["results"][0]["result"] == "Error running command: boom"
+
+
+@pytest.mark.parametrize("command", ["runas /user:Administrator firefox",
+                                     "cmd /c start powershell.exe -File scan.ps1"])
+def test_open_urls_rejects_commands_without_urls(launches, command):
+    assert native_messaging.open_urls(command, [url(0)]) == {"error": "Command does not accept URLs"}
+    assert launches == []
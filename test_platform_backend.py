@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import os
+import stat
+
+import psutil
+import pytest
+
+import platform_backend
+from platform_backend import LinuxBackend, WindowsBackend, strip_wsl_prefix
+from tool_simulator import fake_winreg
+
+posix_only = pytest.mark.skipif(os.name == "nt", reason="uses /bin/sh scripts and sysfs paths")
+
+
+def write_executable(path, body):
+    path.write_text("#!/bin/sh\n" + body + "\n")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+@posix_only
+def test_linux_hardware_info_reads_machine_id_and_readable_dmi(tmp_path):
+    (tmp_path / "machine-id").write_text("0123456789abcdef\n")
+    dmi = tmp_path / "dmi"
+    dmi.mkdir()
+    (dmi / "product_uuid").write_text("4C4C4544-0042\n")
+    backend = LinuxBackend(machine_id_paths=[str(tmp_path / "missing"), str(tmp_path / "machine-id")],
+                           dmi_dir=str(dmi), desktop_dirs=[])
+
+    info = backend.get_hardware_info()
+
+    assert info["os_machine_id"] == "0123456789abcdef"
+    assert info["dmi_product_uuid"] == "4C4C4544-0042"
+    # Root-only files that cannot be read are left out rather than recorded empty
+    assert "dmi_board_serial" not in info
+    assert list(info)[:5] == ["platform", "processor", "machine", "node", "mac"]
+
+
+@posix_only
+def test_linux_browser_version_from_binary_desktop_entry_and_registry_key(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    calls = tmp_path / "calls"
+    write_executable(bin_dir / "google-chrome", f'echo run >> "{calls}"\necho "Google Chrome 126.0.6478.126 "')
+    firefox_dir = tmp_path / "firefox"
+    firefox_dir.mkdir()
+    (firefox_dir / "application.ini").write_text("[App]\nVendor=Mozilla\nVersion=128.0.3\n")
+    os.symlink(write_executable(firefox_dir / "firefox.sh", "exit 1"), bin_dir / "firefox")
+    apps = tmp_path / "applications"
+    apps.mkdir()
+    (apps / "chrome.desktop").write_text("[Desktop Entry]\nName=Google Chrome\nExec=google-chrome %U\n")
+    (apps / "tool.desktop").write_text("[Desktop Entry]\nExec=tool %F\nX-AppImage-Version=2.1.0\n")
+    monkeypatch.setenv("PATH", str(bin_dir))
+    backend = LinuxBackend(desktop_dirs=[str(apps)])
+
+    assert backend.get_browser_version("google-chrome") == "126.0.6478.126"
+    assert backend.get_browser_version("chrome.desktop") == "126.0.6478.126"
+    assert backend.get_browser_version(r"HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon") == "126.0.6478.126"
+    # `--version` runs once per install; the rest are answered from the cache
+    assert calls.read_text().count("run") == 1
+    assert backend.get_browser_version("firefox") == "128.0.3"
+    assert backend.get_browser_version("tool.desktop") == "2.1.0"
+    assert backend.get_browser_version(r"HKEY_CURRENT_USER\Software\Microsoft\Edge Beta\BLBeacon").startswith("Error")
+
+
+@posix_only
+def test_linux_launch_builds_direct_argv_and_reports_failures(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    write_executable(bin_dir / "firefox", "exit 0")
+    write_executable(bin_dir / "broken-browser", 'echo "no display" >&2\nexit 3')
+    monkeypatch.setenv("PATH", str(bin_dir))
+    backend = LinuxBackend(desktop_dirs=[])
+
+    assert backend.build_launch_command("wsl -d Ubuntu firefox", ["https://a", "https://b"]) == \
+        ["firefox", "-new-tab", "https://a", "-new-tab", "https://b"]
+    assert backend.build_launch_command('"/opt/my browser/chrome" --incognito', ["https://a"]) == \
+        ["/opt/my browser/chrome", "--incognito", "https://a"]
+    assert strip_wsl_prefix(["wsl.exe", "--distribution", "Debian", "--", "chromium"]) == ["chromium"]
+
+    assert backend.launch("firefox", ["https://a"]) == "Opened with firefox"
+    assert backend.launch("broken-browser", []) == "Error: Command failed with exit code 3: no display"
+    assert backend.launch("missing-browser", []).startswith("Error: Browser not found")
+
+
+@posix_only
+def test_launch_left_running_at_timeout_is_not_killed(tmp_path):
+    """A first browser launch holds the pipes; at the timeout it counts as started and keeps running."""
+    pid_file = tmp_path / "browser.pid"
+
+    result = platform_backend.run_launch_command(f"sleep 30 & echo $! > {pid_file}; wait", timeout=0.5)
+
+    assert result == "Command still running after 0.5 seconds"
+    browser = psutil.Process(int(pid_file.read_text()))
+    assert browser.is_running() and browser.status() != psutil.STATUS_ZOMBIE
+    browser.kill()
+
+
+def test_windows_launch_command_is_unchanged():
+    backend = WindowsBackend()
+
+    assert backend.build_launch_command("wsl -d Ubuntu google-chrome", ["https://a"]) == \
+        'wsl -d Ubuntu google-chrome --no-sandbox "https://a"'
+    assert backend.build_launch_command(r"C:\Browsers\chrome.exe", ["https://a"]) == \
+        r'"C:\Browsers\chrome.exe" "https://a"'
+
+
+def test_windows_reads_versions_and_distros_in_process(monkeypatch):
+    monkeypatch.setattr(platform_backend, "winreg", fake_winreg({"HKEY_CURRENT_USER": {"Software": {
+        "WOW6432Node": {"Google": {"Chrome": {"BLBeacon": {"version": "126.0.6478.127"}}}},
+        "Microsoft": {
+            "Edge": {"BLBeacon": {"version": "126.0"}},
+            "Windows": {"CurrentVersion": {"Lxss": {
+                "{guid-1}": {"DistributionName": "Ubuntu"},
+                "{guid-2}": {"DistributionName": "Debian"},
+            }}},
+        },
+    }}}))
+    backend = WindowsBackend()
+
+    # Falls back to the WOW6432Node key, without spawning reg.exe
+    assert backend.get_browser_version(r"HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon") == "126.0.6478.127"
+    assert backend.get_browser_version(r"HKCU\Software\Microsoft\Edge\BLBeacon") == "Error: Invalid version format: 126.0"
+    assert backend.get_browser_version(r"HKEY_CURRENT_USER\Software\Google\Chrome Beta\BLBeacon") == \
+        r"Error: Registry key not found: HKEY_CURRENT_USER\Software\Google\Chrome Beta\BLBeacon"
+    assert backend.get_wsl_distros() == ["Ubuntu", "Debian"]
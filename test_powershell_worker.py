@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+import shutil
+import sys
+
+import pytest
+
+from powershell_worker import (FRAME_MARKER, PowerShellPool, PowerShellStartError, PowerShellTimeout,
+                               PowerShellWorkerError, powershell_argv)
+
+# Speaks the worker protocol; a "script" is one line: echo <text>, pid, exit <code>, hang or crash
+FAKE_INTERPRETER = f"""
+import json, os, sys, time
+
+def send(frame):
+    print({FRAME_MARKER!r} + json.dumps(frame), flush=True)
+
+print("fake PowerShell banner", flush=True)
+send({{"ready": True, "pid": os.getpid()}})
+for line in sys.stdin:
+    request = json.loads(line)
+    command, _, argument = open(request["script"]).read().strip().partition(" ")
+    if command == "hang":
+        time.sleep(60)
+    elif command == "crash":
+        sys.exit(3)
+    elif command == "exit":
+        send({{"id": request["id"], "exitCode": int(argument), "output": "", "error": "it failed"}})
+    else:
+        output = str(os.getpid()) if command == "pid" else argument
+        send({{"id": request["id"], "exitCode": 0, "output": output + "\\n", "error": ""}})
+"""
+
+
+@pytest.fixture
+def fake_argv(tmp_path):
+    path = tmp_path / "fake_powershell.py"
+    path.write_text(FAKE_INTERPRETER)
+    return [sys.executable, str(path)]
+
+
+@pytest.fixture
+def script(tmp_path):
+    def write(text):
+        path = tmp_path / f"script{len(list(tmp_path.iterdir()))}.ps1"
+        path.write_text(text)
+        return str(path)
+    return write
+
+
+def test_scripts_reuse_one_worker_until_it_is_recycled(fake_argv, script):
+    pool = PowerShellPool(fake_argv, max_scripts=3)
+    try:
+        first = pool.run(script("pid"))
+        assert pool.run(script("echo hello")).output == "hello\n"
+        failed = pool.run(script("exit 4"))
+        assert (failed.exit_code, failed.error) == (4, "it failed")
+        assert pool.run(script("pid")).output != first.output
+
+        stats = pool.stats()
+        assert (stats["started"], stats["scripts"], stats["recycled"]) == (2, 4, 1)
+    finally:
+        pool.close()
+
+
+def test_hung_and_crashed_workers_are_replaced(fake_argv, script):
+    pool = PowerShellPool(fake_argv)
+    try:
+        with pytest.raises(PowerShellTimeout):
+            pool.run(script("hang"), timeout=0.5)
+        assert pool.run(script("echo after hang")).output == "after hang\n"
+
+        with pytest.raises(PowerShellWorkerError, match="exited with code 3"):
+            pool.run(script("crash"))
+        assert pool.run(script("echo after crash")).output == "after crash\n"
+
+        stats = pool.stats()
+        assert (stats["timeouts"], stats["crashes"], stats["started"]) == (1, 1, 3)
+    finally:
+        pool.close()
+
+
+def test_missing_interpreter_is_a_start_error(script):
+    pool = PowerShellPool(["no-such-powershell-executable"])
+
+    with pytest.raises(PowerShellStartError):
+        pool.run(script("echo hello"))
+    assert pool.stats()["workers"] == 0
+
+
+@pytest.mark.skipif(shutil.which("pwsh") is None, reason="needs PowerShell (pwsh)")
+def test_real_powershell_driver(script):
+    pool = PowerShellPool(powershell_argv("pwsh"))
+    try:
+        result = pool.run(script("Write-Output 'hello'\nWrite-Error 'oops'\nexit 2"))
+        assert result.output.strip() == "hello"
+        assert "oops" in result.error
+        assert result.exit_code == 2
+    finally:
+        pool.close()
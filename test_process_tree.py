@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+import threading
+import time
+
+import psutil
+import pytest
+
+from process_tree import ConfinedPopen, tree_stats
+from request_control import CancelToken, RequestCancelled, communicate, current_token
+
+posix_only = pytest.mark.skipif(os.name == "nt", reason="uses /bin/sh job control")
+
+
+@pytest.fixture(autouse=True)
+def fresh_stats():
+    tree_stats.reset()
+    yield
+    tree_stats.reset()
+
+
+def wait_for_child(process):
+    for _ in range(100):
+        children = psutil.Process(process.pid).children()
+        if children:
+            return children[0]
+        time.sleep(0.05)
+    raise AssertionError("the shell started no child")
+
+
+@posix_only
+def test_timeout_kills_the_grandchild_holding_the_pipes():
+    process = ConfinedPopen("sleep 30; echo done", shell=True, stdout=subprocess.PIPE)
+    grandchild = wait_for_child(process)
+    with pytest.raises(subprocess.TimeoutExpired):
+        process.communicate(timeout=0.2)
+
+    start = time.monotonic()
+    process.kill_tree(grace=2)
+    process.communicate()
+
+    assert time.monotonic() - start < 2
+    assert not grandchild.is_running() or grandchild.status() == psutil.STATUS_ZOMBIE
+    stats = tree_stats.snapshot()
+    assert (stats["trees"], stats["reaped"], stats["leaked"], stats["escalated"]) == (1, 1, 0, 0)
+
+
+@posix_only
+def test_terminate_escalates_to_kill_for_a_tree_ignoring_it():
+    process = ConfinedPopen("trap '' TERM; sleep 30; echo done", shell=True, stdout=subprocess.PIPE)
+    wait_for_child(process)
+
+    process.kill_tree(grace=0.3)
+    process.communicate()
+
+    stats = tree_stats.snapshot()
+    assert (stats["trees"], stats["reaped"], stats["leaked"], stats["escalated"]) == (1, 1, 0, 1)
+    # A second call (e.g. cancel after a timeout) does nothing
+    process.kill_tree()
+    assert tree_stats.snapshot()["trees"] == 1
+
+
+@posix_only
+def test_cancelling_a_request_reaps_the_tree_without_waiting_for_the_timeout():
+    token = CancelToken("r1")
+    process = ConfinedPopen("sleep 30; echo done", shell=True, stdout=subprocess.PIPE)
+    threading.Timer(0.2, token.cancel).start()
+    context_token = current_token.set(token)
+    start = time.monotonic()
+    try:
+        with pytest.raises(RequestCancelled):
+            communicate(process, timeout=20)
+    finally:
+        current_token.reset(context_token)
+
+    assert time.monotonic() - start < 3
+    assert tree_stats.snapshot()["reaped"] == 1
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from request_control import (DEADLINE_REASON, CancelToken, RequestCancelled, RequestRegistry, TokenGroup,
+                             communicate, current_token)
+
+SLEEPER = [sys.executable, "-c", "import time; time.sleep(30)"]
+
+
+def run_under(token, fn):
+    context_token = current_token.set(token)
+    try:
+        return fn()
+    finally:
+        current_token.reset(context_token)
+
+
+def test_communicate_kills_the_process_when_the_request_is_cancelled():
+    token = CancelToken("r1")
+    process = subprocess.Popen(SLEEPER, stdout=subprocess.PIPE)
+    threading.Timer(0.2, token.cancel).start()
+    start = time.monotonic()
+
+    with pytest.raises(RequestCancelled) as caught:
+        run_under(token, lambda: communicate(process, timeout=20))
+
+    assert time.monotonic() - start < 5
+    assert process.poll() is not None
+    assert caught.value.to_response() == {"error": "Request cancelled", "cancelled": True, "deadlineExceeded": False}
+
+
+def test_deadline_caps_waits_and_sleeps():
+    token = CancelToken("r2", deadline=time.monotonic() + 0.2)
+    process = subprocess.Popen(SLEEPER, stdout=subprocess.PIPE)
+
+    with pytest.raises(RequestCancelled) as caught:
+        run_under(token, lambda: communicate(process, timeout=20))
+    assert caught.value.deadline_exceeded
+    assert process.poll() is not None
+
+    with pytest.raises(RequestCancelled):
+        token.sleep(10)
+
+
+def test_token_group_cancels_only_when_every_member_has():
+    first, second = CancelToken("a"), CancelToken("b")
+    group = TokenGroup()
+    group.attach(first)
+    group.attach(second)
+
+    first.cancel()
+    assert not group.cancelled
+    second.cancel(DEADLINE_REASON)
+    assert group.cancelled
+    assert group.reason == DEADLINE_REASON
+
+
+def test_registry_expires_and_cancels_requests():
+    stopped = []
+    done = threading.Event()
+    registry = RequestRegistry(on_stopped=lambda token: (stopped.append((token.request_id, token.reason)), done.set()))
+    expiring = CancelToken("slow", deadline=time.monotonic() + 0.1)
+    finished = CancelToken("fast", deadline=time.monotonic() + 0.05)
+    registry.register(expiring)
+    registry.register(finished)
+    registry.unregister(finished)
+
+    assert done.wait(5)
+    assert stopped == [("slow", DEADLINE_REASON)]
+    assert finished.reason is None
+
+    queued = CancelToken("queued")
+    registry.register(queued)
+    assert registry.cancel("queued") is queued
+    assert registry.cancel("unknown") is None
+    assert registry.stats() == {"cancelled": 1, "cancelMisses": 1, "expired": 1, "active": 2}
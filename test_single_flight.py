@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from single_flight import SingleFlight, request_key
+
+
+def test_request_key_ignores_request_id_and_case_of_named_fields():
+    first = {"action": "getBrowserVersion", "registryKey": r"HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon",
+             "requestId": 1}
+    second = {"requestId": 2, "registryKey": r"hkey_current_user\software\google\chrome\blbeacon",
+              "action": "getBrowserVersion"}
+    assert request_key(first, case_insensitive=["registryKey"]) == \
+        request_key(second, case_insensitive=["registryKey"])
+    assert request_key(first) != request_key(second)
+
+
+def test_concurrent_duplicates_share_one_computation():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return {"instances": ["Ubuntu"]}
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = [flight.submit("getWSLInstances", lambda: executor.submit(work), label="getWSLInstances")
+                   for _ in range(3)]
+        assert [coalesced for _, coalesced in results] == [False, True, True]
+        assert flight.stats()["inFlight"] == 1
+        release.set()
+        assert all(future.result(timeout=5) == {"instances": ["Ubuntu"]} for future, _ in results)
+
+        # Once the first computation finishes the next request does the work again
+        future, coalesced = flight.submit("getWSLInstances", lambda: executor.submit(work), label="getWSLInstances")
+        assert not coalesced
+        future.result(timeout=5)
+
+    assert len(calls) == 2
+    assert flight.stats() == {"executed": 2, "coalesced": 2, "inFlight": 0,
+                              "byAction": {"getWSLInstances": {"executed": 2, "coalesced": 2}}}
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("wsl.exe not found")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        leader, _ = flight.submit("key", lambda: executor.submit(fail))
+        follower, coalesced = flight.submit("key", lambda: executor.submit(fail))
+        release.set()
+        assert coalesced and follower is leader
+        with pytest.raises(RuntimeError):
+            follower.result(timeout=5)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+import subprocess
+import sys
+
+from spawn_stats import SpawnStats, action_context, install_audit_hook, program_name, run, spawn_stats
+
+
+def test_program_name_handles_shell_strings_and_argv():
+    assert program_name('"C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe" "https://a"') == "chrome.exe"
+    assert program_name("wsl --list --quiet") == "wsl"
+    assert program_name(["/usr/bin/Firefox", "-new-tab"]) == "firefox"
+    assert program_name([]) == ""
+
+
+def test_spawns_are_counted_per_action_once_each():
+    install_audit_hook()
+    spawn_stats.reset()
+    python = [sys.executable, "-c", "pass"]
+
+    with action_context("getBrowserVersion"):
+        run(python, check=True)
+        # Spawned outside the wrappers: seen by the audit hook, without a duration
+        subprocess.run(python, check=True)
+    run(python, check=True)
+
+    stats = spawn_stats.snapshot()
+    version = stats["byAction"]["getBrowserVersion"]
+    assert version["count"] == 2
+    assert version["timed"] == 1
+    assert version["avgMs"] > 0
+    assert stats["byAction"]["background"]["count"] == 1
+    assert stats["total"] == 3
+    assert [spawn["action"] for spawn in stats["recent"]] == ["getBrowserVersion", "getBrowserVersion", "background"]
+
+
+def test_recent_spawns_are_bounded():
+    stats = SpawnStats(recent=2)
+    for _ in range(5):
+        stats.record("wsl", 0.01, action="getWSLInstances")
+    snapshot = stats.snapshot()
+    assert snapshot["byAction"]["getWSLInstances"]["count"] == 5
+    assert len(snapshot["recent"]) == 2
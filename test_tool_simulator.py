@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+import time
+
+import pytest
+
+import native_messaging
+import platform_backend
+from platform_backend import WindowsBackend
+from process_tree import tree_stats
+from tool_simulator import ToolSimulator
+
+posix_only = pytest.mark.skipif(os.name == "nt", reason="the real tools exist on Windows")
+
+REGISTRY = {"HKEY_CURRENT_USER": {"Software": {
+    "Google": {"Chrome": {"BLBeacon": {"version": "126.0.6478.127"}}},
+    "Microsoft": {"Windows": {"CurrentVersion": {"Lxss": {"{guid-1}": {"DistributionName": "Ubuntu"}}}}},
+}}}
+
+
+@posix_only
+def test_wsl_list_is_utf16_and_reg_query_renders_a_table(tmp_path):
+    scenario = {"wslDistros": ["Ubuntu", "Debian"], "registry": REGISTRY}
+    with ToolSimulator(scenario, tmp_path) as simulator:
+        raw = subprocess.run(["wsl.exe", "--list", "--quiet"], capture_output=True).stdout
+        assert raw == "Ubuntu\r\nDebian\r\n".encode("utf-16-le")
+        # The host's real parsing path, through run_command and a shell
+        assert native_messaging.get_wsl_instances() == ["Ubuntu", "Debian"]
+
+        table = subprocess.run(["reg", "query", r"HKCU\Software\Google\Chrome\BLBeacon", "/v", "version"],
+                               capture_output=True, text=True)
+        assert table.returncode == 0
+        assert "    version    REG_SZ    126.0.6478.127" in table.stdout
+        missing = subprocess.run(["reg", "query", r"HKCU\Software\Google\Chrome Beta\BLBeacon"],
+                                 capture_output=True, text=True)
+        assert missing.returncode == 1 and "unable to find" in missing.stderr
+
+        assert [call["args"] for call in simulator.calls("wsl")] == [["--list", "--quiet"]] * 2
+
+
+@posix_only
+def test_windows_hardware_probes_and_registry_run_against_the_fakes(tmp_path, monkeypatch):
+    scenario = {"registry": REGISTRY, "tools": {
+        "fsutil": {"responses": [{"stdout": "Volume Name :\r\nVolume Serial Number : A1B2-C3D4\r\n"}]},
+        "wmic": {"latencyMs": 50, "responses": [
+            {"args": ["bios", "get", "serialnumber"], "stdout": "SerialNumber  \r\nBIOS-42  \r\n"},
+            {"args": ["cpu", "get", "processorid"], "failFirst": 2, "stdout": "ProcessorId\r\nBFEBFBFF000906EA\r\n"},
+        ]},
+    }}
+    with ToolSimulator(scenario, tmp_path) as simulator:
+        monkeypatch.setattr(platform_backend, "winreg", simulator.winreg())
+        backend = WindowsBackend()
+
+        info = backend.get_hardware_info()
+        assert (info["volume_serial"], info["bios_serial"]) == ("A1B2-C3D4", "BIOS-42")
+        assert "cpu_id" not in info
+        assert backend.get_browser_version(r"HKCU\Software\Google\Chrome\BLBeacon") == "126.0.6478.127"
+        assert backend.get_wsl_distros() == ["Ubuntu"]
+        # failFirst counts every wmic call: only the first CPU ID probe (call #2) failed
+        assert backend.get_cpu_id() == "BFEBFBFF000906EA"
+        assert len(simulator.calls("wmic")) == 3
+
+
+@posix_only
+def test_launch_retries_through_injected_failures(tmp_path, monkeypatch):
+    scenario = {"tools": {"wsl": {"responses": [
+        {"argsPrefix": ["-d", "Ubuntu"], "failFirst": 2, "failure": {"stderr": "Catastrophic failure"}},
+    ]}}}
+    monkeypatch.setattr(native_messaging, "get_platform_backend", WindowsBackend)
+    with ToolSimulator(scenario, tmp_path) as simulator:
+        result = native_messaging.run_command_with_retry("wsl -d Ubuntu google-chrome", "https://a", retry_delay=0.01)
+
+        assert "Error" not in result
+        assert [call["invocation"] for call in simulator.calls("wsl")] == [0, 1, 2]
+        assert simulator.calls("wsl")[0]["args"] == ["-d", "Ubuntu", "google-chrome", "--no-sandbox", "https://a"]
+
+
+@posix_only
+def test_hung_tool_times_out_and_its_tree_is_reaped(tmp_path):
+    tree_stats.reset()
+    with ToolSimulator({"tools": {"wsl": {"hang": True}}}, tmp_path):
+        start = time.monotonic()
+        result = native_messaging.run_command("wsl -d Ubuntu true", timeout=0.5)
+
+    assert result == "Error: Command timed out"
+    assert time.monotonic() - start < 3
+    assert tree_stats.snapshot()["leaked"] == 0
+
+
+@posix_only
+def test_seeded_failure_rate_and_jitter_are_repeatable(tmp_path):
+    scenario = {"seed": 7, "tools": {"wmic": {"failureRate": 0.5, "jitterMs": 20, "latencyMs": 20}}}
+
+    def run(directory):
+        with ToolSimulator(scenario, directory):
+            return [subprocess.run(["wmic", "os"], capture_output=True).returncode for _ in range(8)]
+
+    first = run(tmp_path / "first")
+    assert first == run(tmp_path / "second")
+    assert 0 < sum(first) < 8
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+
+from worker_pool import WorkerPool, PRIORITY_INTERACTIVE, PRIORITY_MAINTENANCE
+
+def test_interactive_work_does_not_wait_for_maintenance():
+    """A busy maintenance class does not delay interactive work."""
+    pool = WorkerPool({PRIORITY_INTERACTIVE: 1, PRIORITY_MAINTENANCE: 1})
+    release = threading.Event()
+    pool.submit(release.wait, 5, priority=PRIORITY_MAINTENANCE)
+    pool.submit(release.wait, 5, priority=PRIORITY_MAINTENANCE)
+
+    start = time.monotonic()
+    assert pool.submit(lambda: "launched").result(timeout=1) == "launched"
+    assert time.monotonic() - start < 1
+
+    stats = pool.stats()["classes"]
+    assert stats[PRIORITY_MAINTENANCE]["queued"] == 1
+    assert stats[PRIORITY_INTERACTIVE]["completed"] == 1
+    release.set()
+    pool.shutdown()
+
+def test_exclusive_key_serializes_work():
+    """Two tasks holding the same distro key never overlap."""
+    pool = WorkerPool({PRIORITY_MAINTENANCE: 4})
+    active = []
+    overlaps = []
+    lock = threading.Lock()
+
+    def operation():
+        with lock:
+            active.append(1)
+            overlaps.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+
+    futures = [pool.submit(operation, priority=PRIORITY_MAINTENANCE, keys=["wsl:ubuntu"])
+               for _ in range(3)]
+    for future in futures:
+        future.result(timeout=5)
+    assert max(overlaps) == 1
+    assert pool.stats()["lockedResources"] == []
+    pool.shutdown()
+
+def test_shared_keys_overlap_but_wait_for_exclusive():
+    """Launches share a distro key with each other but not with a reinstall."""
+    pool = WorkerPool({PRIORITY_INTERACTIVE: 4, PRIORITY_MAINTENANCE: 1})
+    release = threading.Event()
+    both_running = threading.Barrier(2, timeout=2)
+
+    first = pool.submit(both_running.wait, shared_keys=["wsl:ubuntu"])
+    second = pool.submit(both_running.wait, shared_keys=["wsl:ubuntu"])
+    first.result(timeout=5)
+    second.result(timeout=5)
+
+    reinstall = pool.submit(release.wait, 5, priority=PRIORITY_MAINTENANCE, keys=["wsl:ubuntu"])
+    time.sleep(0.05)
+    launch = pool.submit(lambda: "launched", shared_keys=["wsl:ubuntu"])
+    time.sleep(0.05)
+    assert not launch.done()
+    release.set()
+    assert reinstall.result(timeout=5)
+    assert launch.result(timeout=5) == "launched"
+    pool.shutdown()
+
+def test_shutdown_waits_for_work_submitted_by_tasks():
+    """Work queued by a running task still completes before shutdown returns."""
+    pool = WorkerPool()
+    done = threading.Event()
+
+    def handler():
+        time.sleep(0.05)
+        pool.submit(done.set, priority=PRIORITY_MAINTENANCE)
+
+    pool.submit(handler)
+    pool.shutdown(wait=True)
+    assert done.is_set()
+
+def test_submitted_work_sees_the_submitters_context():
+    """Context variables (e.g. the action spawns are counted against) follow the work."""
+    from spawn_stats import action_context, current_action
+
+    pool = WorkerPool({PRIORITY_INTERACTIVE: 1})
+    with action_context("openUrls"):
+        future = pool.submit(current_action.get)
+    assert future.result(timeout=1) == "openUrls"
+    assert pool.submit(current_action.get).result(timeout=1) == "background"
+    pool.shutdown()
+
+def test_tasks_waiting_for_a_key_do_not_hold_workers():
+    """Launches blocked behind a reinstall stay queued and leave workers free."""
+    pool = WorkerPool({PRIORITY_INTERACTIVE: 4, PRIORITY_MAINTENANCE: 1})
+    release = threading.Event()
+    reinstall = pool.submit(release.wait, 5, priority=PRIORITY_MAINTENANCE, keys=["wsl:ubuntu"])
+    time.sleep(0.05)
+    launches = [pool.submit(lambda: "launched", shared_keys=["wsl:ubuntu"]) for _ in range(4)]
+
+    assert pool.submit(lambda: "hw").result(timeout=1) == "hw"
+    stats = pool.stats()["classes"][PRIORITY_INTERACTIVE]
+    assert stats["queued"] == 4
+    assert stats["running"] == 0
+    assert not any(launch.done() for launch in launches)
+
+    release.set()
+    assert reinstall.result(timeout=5)
+    assert [launch.result(timeout=5) for launch in launches] == ["launched"] * 4
+    pool.shutdown()
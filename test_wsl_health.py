@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import os
+import stat
+import sys
+from contextlib import contextmanager
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "wslscripts"))
+import wsl_health
+
+WSL_LIST = "  NAME                   STATE           VERSION\r\n" \
+           "* Ubuntu-22.04           Running         2\r\n" \
+           "  Debian                 Stopped         2\r\n" \
+           "  Legacy                 Stopped         1\r\n" \
+           "  docker-desktop         Running         2\r\n"
+
+FAKE_WSL = '''#!{python}
+import json, sys
+args = sys.argv[1:]
+if args[:2] == ["-l", "-v"]:
+    sys.stdout.buffer.write({wsl_list!r}.encode("utf-16-le"))
+    sys.exit(0)
+distro = args[1]
+if "python3" in args:
+    sys.stdin.read()
+    online = distro != "Debian"
+    print(json.dumps({{"online": online, "diagnosis": "online" if online else "dns_failure", "probes": []}}))
+else:
+    print("google-chrome=/usr/bin/google-chrome" if distro == "Ubuntu-22.04" else "google-chrome=")
+    print("microsoft-edge=")
+    print("firefox=")
+'''
+
+def make_fake_wsl(tmp_path):
+    script = tmp_path / "wsl"
+    script.write_text(FAKE_WSL.format(python=sys.executable, wsl_list=WSL_LIST))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+def test_parse_wsl_list_verbose_handles_utf16():
+    text = wsl_health.decode_wsl_output(("\ufeff" + WSL_LIST).encode("utf-16-le"))
+    distros = wsl_health.parse_wsl_list_verbose(text)
+    assert [d["name"] for d in distros] == ["Ubuntu-22.04", "Debian", "Legacy", "docker-desktop"]
+    assert distros[0]["default"] and distros[2]["version"] == 1
+
+def test_sweep_checks_every_wsl2_distro(tmp_path):
+    wsl = make_fake_wsl(tmp_path)
+    assert wsl_health.list_wsl2_distros(wsl) == ["Ubuntu-22.04", "Debian"]
+
+    held = []
+
+    @contextmanager
+    def hold(distro):
+        held.append(distro)
+        yield
+
+    report = wsl_health.sweep(workers=2, wsl_executable=wsl, hold=hold)
+    assert sorted(held) == ["Debian", "Ubuntu-22.04"]
+    ubuntu, debian = report["distros"]["Ubuntu-22.04"], report["distros"]["Debian"]
+    assert ubuntu["online"] and ubuntu["browsersReady"]
+    assert not debian["online"] and debian["diagnosis"] == "dns_failure"
+    assert not debian["browsersReady"]
+    assert wsl_health.broken_distros(report) == ["Debian"]
+
+    cache = str(tmp_path / "health.json")
+    wsl_health.write_cache(report, cache)
+    cached = wsl_health.read_cache(cache)
+    assert cached["distros"].keys() == report["distros"].keys()
+    assert cached["ageSeconds"] >= 0
+    assert wsl_health.read_cache(str(tmp_path / "missing.json")) is None
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import importlib.util
+import json
+import os
+import socket
+import stat
+import sys
+import threading
+import time
+
+import pytest
+
+AGENT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wslscripts", "wsl-launcher-agent.py")
+spec = importlib.util.spec_from_file_location("wsl_launcher_agent", AGENT_PATH)
+agent = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(agent)
+
+def start_agent(token="secret"):
+    server = agent.AgentServer(("127.0.0.1", 0), "Ubuntu", token)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def request(server, message):
+    with socket.create_connection(server.server_address, timeout=5) as sock:
+        sock.sendall((json.dumps(message) + "\n").encode("utf-8"))
+        return json.loads(sock.makefile("rb").readline().decode("utf-8"))
+
+def test_open_hands_urls_to_browser(tmp_path, monkeypatch):
+    """The agent starts the browser with all URLs in one invocation."""
+    output = tmp_path / "argv.json"
+    browser = tmp_path / "google-chrome"
+    browser.write_text(
+        f"#!{sys.executable}\n"
+        "import json, sys\n"
+        f"open({str(output)!r}, 'w').write(json.dumps(sys.argv[1:]))\n"
+    )
+    browser.chmod(browser.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+    server = start_agent()
+    try:
+        reply = request(server, {"action": "open", "distro": "ubuntu", "browser": "google-chrome", "token": "secret",
+                                 "urls": ["https://example.com", "https://example.org"]})
+        assert reply["ok"] and reply["count"] == 2
+        deadline = time.time() + 5
+        while not output.exists() and time.time() < deadline:
+            time.sleep(0.05)
+        assert json.loads(output.read_text()) == ["--no-sandbox", "https://example.com", "https://example.org"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_agent_rejects_unsafe_requests():
+    """Unknown browsers, flag-like URLs, other distros and bad tokens are refused."""
+    server = start_agent()
+    try:
+        assert request(server, {"action": "ping"})["error"] == "Invalid token"
+        assert request(server, {"action": "ping", "token": ""})["error"] == "Invalid token"
+        assert request(server, {"action": "ping", "token": "secret"})["distro"] == "Ubuntu"
+        base = {"action": "open", "token": "secret", "browser": "google-chrome"}
+        assert not request(server, dict(base, browser="sh", urls=["https://example.com"]))["ok"]
+        assert not request(server, dict(base, urls=["--renderer-cmd-prefix=x"]))["ok"]
+        assert not request(server, dict(base, distro="Debian", urls=["https://example.com"]))["ok"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_agent_requires_a_token():
+    with pytest.raises(ValueError):
+        agent.AgentServer(("127.0.0.1", 0), "Ubuntu", "")
+
+def test_host_generates_and_keeps_a_token(tmp_path, monkeypatch):
+    import native_messaging
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(native_messaging, "WSL_AGENT_TOKEN", "")
+    monkeypatch.setattr(native_messaging, "wsl_agent_token", None)
+
+    token = native_messaging.get_wsl_agent_token()
+    assert len(token) >= 32
+    assert (tmp_path / native_messaging.WSL_AGENT_TOKEN_FILENAME).read_text() == token
+    monkeypatch.setattr(native_messaging, "wsl_agent_token", None)
+    assert native_messaging.get_wsl_agent_token() == token
+
+    monkeypatch.setattr(native_messaging, "WSL_AGENT_TOKEN", "configured")
+    assert native_messaging.get_wsl_agent_token() == "configured"
+
+def test_host_starts_the_agent_on_the_configured_port(monkeypatch):
+    import native_messaging
+    started = []
+    monkeypatch.setattr(native_messaging, "WSL_AGENT_BASE_PORT", 50000)
+    monkeypatch.setattr(native_messaging, "wsl_agent_started", set())
+    monkeypatch.setattr(native_messaging, "get_wsl_agent_token", lambda: "secret")
+    monkeypatch.setattr(native_messaging.subprocess, "Popen", lambda command, **kwargs: started.append(command))
+
+    native_messaging.start_wsl_agent("Ubuntu")
+
+    port = native_messaging.get_wsl_agent_port("Ubuntu")
+    assert 50000 <= port < 51000
+    assert started[0][-2:] == ["--port", str(port)]
+
+def test_firefox_uses_new_tab_per_url():
+    assert agent.build_browser_argv("/usr/bin/firefox", ["a", "b"]) == ["firefox", "-new-tab", "a", "-new-tab", "b"]
+    assert agent.get_agent_port("Ubuntu") == agent.get_agent_port("UBUNTU")
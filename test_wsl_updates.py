@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+from wsl_updates import VersionInventory, WSLBrowserUpdater, is_current, parse_inventory
+
+posix_only = pytest.mark.skipif(os.name == "nt", reason="uses /bin/sh scripts as wsl.exe and the update")
+
+# Stands in for the update script: Slow hangs, Broken fails, NoSudo cannot
+# run sudo but exits 0, others upgrade Chrome
+UPDATE_SCRIPT = """
+distro=$1; versions=$2/$1.versions
+echo "Updating browsers in $distro"
+case $distro in
+  Slow) sleep 30 ;;
+  Broken) echo "E: Could not get lock"; exit 100 ;;
+  NoSudo) echo "sudo: a terminal is required to read the password"; exit 0 ;;
+esac
+sleep 0.3
+echo "google-chrome-stable|127.0|127.0" > "$versions"
+printf '\\033[1mDone!\\033[0m\\n'
+"""
+
+
+@pytest.fixture
+def fake_wsl(tmp_path):
+    """A wsl.exe whose inventory probe prints <distro>.versions from the state directory."""
+    wsl = tmp_path / "wsl"
+    wsl.write_text(f'#!/bin/sh\ncat "{tmp_path}/$2.versions" 2>/dev/null\n')
+    wsl.chmod(wsl.stat().st_mode | stat.S_IXUSR)
+    for distro in ("Ubuntu", "Slow", "Broken", "Debian", "NoSudo"):
+        (tmp_path / f"{distro}.versions").write_text("google-chrome-stable|126.0|127.0\nfirefox|||\n")
+    return str(wsl)
+
+
+def make_updater(tmp_path, fake_wsl, distros, **kwargs):
+    return WSLBrowserUpdater(distros, lambda distro: ["sh", "-c", UPDATE_SCRIPT, "sh", distro, str(tmp_path)],
+                             wsl_executable=fake_wsl, inventory=VersionInventory(str(tmp_path / "inventory.json")),
+                             **kwargs)
+
+
+def test_inventory_parsing_and_currency():
+    browsers = parse_inventory("google-chrome-stable|127.0|127.0\nfirefox||128.0\nopera|1.0|(none)\n")
+    assert browsers == {"google-chrome-stable": {"installed": "127.0", "candidate": "127.0"},
+                        "opera": {"installed": "1.0", "candidate": None}}
+
+    now = time.time()
+    assert is_current({"checked": now - 10, "browsers": browsers}, max_age=60, now=now)
+    assert not is_current({"checked": now - 120, "browsers": browsers}, max_age=60, now=now)
+    outdated = dict(browsers, firefox={"installed": "127.0", "candidate": "128.0"})
+    assert not is_current({"checked": now, "browsers": outdated}, max_age=60, now=now)
+
+
+@posix_only
+def test_updates_distros_in_parallel_and_skips_current_ones(tmp_path, fake_wsl):
+    reports = []
+    inventory = VersionInventory(str(tmp_path / "inventory.json"))
+    inventory.put("Debian", {"google-chrome-stable": {"installed": "127.0", "candidate": "127.0"}})
+    updater = make_updater(tmp_path, fake_wsl, ["Ubuntu", "Slow", "Broken", "Debian"], workers=3,
+                           distro_timeout=1.5, on_progress=reports.append)
+    updater.inventory = inventory
+
+    start = time.monotonic()
+    summary = updater.run()
+
+    assert time.monotonic() - start < 5
+    distros = summary["distros"]
+    assert {name: state["status"] for name, state in distros.items()} == {
+        "Ubuntu": "updated", "Slow": "timedOut", "Broken": "failed", "Debian": "skipped"}
+    assert distros["Ubuntu"]["before"] == {"google-chrome-stable": "126.0"}
+    assert distros["Ubuntu"]["changed"] == {"google-chrome-stable": {"from": "126.0", "to": "127.0"}}
+    assert distros["Ubuntu"]["output"] == ["Updating browsers in Ubuntu", "Done!"]
+    assert distros["Broken"]["exitCode"] == 100
+    assert [failure["name"] for failure in summary["failures"]] == ["Slow", "Broken"]
+
+    # Output was reported while the updates ran, with several distros running at once
+    assert any(report["counts"].get("running", 0) >= 2 for report in reports)
+    assert any(report["distros"]["Slow"]["output"] and report["distros"]["Slow"]["status"] == "running"
+               for report in reports)
+    # The after-state is remembered, so the next run skips Ubuntu
+    assert is_current(VersionInventory(str(tmp_path / "inventory.json")).get("ubuntu"), max_age=60)
+
+
+@posix_only
+def test_cancel_stops_running_and_pending_distros(tmp_path, fake_wsl):
+    cancel = threading.Event()
+    updater = make_updater(tmp_path, fake_wsl, ["Slow", "Ubuntu"], workers=1, cancel_event=cancel)
+    threading.Timer(0.5, cancel.set).start()
+
+    start = time.monotonic()
+    summary = updater.run()
+
+    assert time.monotonic() - start < 5
+    assert summary["counts"] == {"cancelled": 2}
+    assert summary["failures"] == []
+
+
+@posix_only
+def test_update_without_sudo_fails(tmp_path, fake_wsl):
+    summary = make_updater(tmp_path, fake_wsl, ["NoSudo"]).run()
+
+    state = summary["distros"]["NoSudo"]
+    assert (state["status"], state["exitCode"]) == ("failed", 0)
+    assert "a terminal is required" in state["error"]
+    assert [failure["name"] for failure in summary["failures"]] == ["NoSudo"]
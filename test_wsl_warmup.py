@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import stat
+import sys
+import time
+
+from worker_pool import KeyedLocks
+from wsl_warmup import WSLWarmupManager, WSL_STATE_WARM, WSL_STATE_FAILED, WSL_STATE_COLD
+
+def make_fake_wsl(tmp_path, failing=()):
+    """Writes a fake `wsl` executable that logs its arguments and fails for some distros."""
+    log_path = tmp_path / "wsl_calls.log"
+    script = tmp_path / "wsl"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        f"open({str(log_path)!r}, 'a').write(' '.join(sys.argv[1:]) + '\\n')\n"
+        f"sys.exit(1 if sys.argv[2] in {list(failing)!r} else 0)\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script), log_path
+
+def test_boot_marks_distros_warm_or_failed(tmp_path):
+    """Booting runs a no-op in each distro and records the outcome."""
+    wsl, log_path = make_fake_wsl(tmp_path, failing=["Broken"])
+    manager = WSLWarmupManager(["Ubuntu", "Broken"], wsl_executable=wsl)
+
+    assert manager.state_of("Ubuntu") == WSL_STATE_COLD
+    assert manager.boot("Ubuntu")
+    assert not manager.boot("Broken")
+
+    assert manager.state_of("ubuntu") == WSL_STATE_WARM
+    assert manager.state_of("Broken") == WSL_STATE_FAILED
+    assert "-d Ubuntu -- true" in log_path.read_text()
+
+def test_keepalive_only_pings_recently_used_distros(tmp_path):
+    """Distros unused for longer than the idle timeout are allowed to go cold."""
+    wsl, log_path = make_fake_wsl(tmp_path)
+    manager = WSLWarmupManager(["Ubuntu", "Debian"], wsl_executable=wsl, idle_timeout=60)
+    manager._set("Debian", lastUsed=time.time() - 120)
+    manager.touch("UBUNTU")
+
+    manager.keepalive_once()
+
+    calls = log_path.read_text().splitlines()
+    assert calls == ["-d Ubuntu -- true"]
+    assert manager.state_of("Ubuntu") == WSL_STATE_WARM
+    assert manager.state_of("Debian") == WSL_STATE_COLD
+    assert sorted(manager.status()) == ["Debian", "Ubuntu"]
+
+def test_start_boots_in_background(tmp_path):
+    """start() returns immediately and the distros become warm shortly after."""
+    wsl, _ = make_fake_wsl(tmp_path)
+    manager = WSLWarmupManager(["Ubuntu"], wsl_executable=wsl, keepalive_interval=60)
+    manager.start()
+    deadline = time.time() + 10
+    while manager.state_of("Ubuntu") != WSL_STATE_WARM and time.time() < deadline:
+        time.sleep(0.05)
+    manager.stop()
+    assert manager.state_of("Ubuntu") == WSL_STATE_WARM
+    assert manager.status()["Ubuntu"]["bootSeconds"] is not None
+
+def test_busy_distros_are_not_booted_or_pinged(tmp_path):
+    """A distro held exclusively (e.g. by a reinstall) is skipped, not booted."""
+    wsl, log_path = make_fake_wsl(tmp_path)
+    locks = KeyedLocks()
+    manager = WSLWarmupManager(["Ubuntu", "Debian"], wsl_executable=wsl,
+                               hold=lambda distro: locks.hold_if_free(shared_keys=[f"wsl:{distro.lower()}"]))
+
+    with locks.hold(keys=["wsl:ubuntu"]):
+        assert not manager.boot("Ubuntu")
+        manager.touch("Debian")
+        manager.keepalive_once()
+
+    assert log_path.read_text().splitlines() == ["-d Debian -- true"]
+    assert manager.state_of("Ubuntu") == WSL_STATE_COLD
+    assert locks.busy_keys() == []
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Simulated Windows tool environment for the Browser Launcher Pro host.
+
+The host's real code paths run reg, wsl, wmic, fsutil, powershell and
+WindowsSandbox, none of which exist on a Linux CI box. ToolSimulator puts
+fake executables with those names on PATH; each one replays the response a
+scenario scripts for it, with latency, jitter and failure injection, so
+benchmarks and timeout/retry tests go through the host's real subprocess
+calls. fake_winreg() stands in for the winreg module.
+
+    with ToolSimulator(scenario, tmp_path) as simulator:
+        instances = native_messaging.get_wsl_instances()
+        assert len(simulator.calls("wsl")) == 1
+
+A scenario is a JSON-compatible dict:
+
+    {
+      "seed": 1,
+      "wslDistros": ["Ubuntu", "Debian"],
+      "registry": {"HKEY_CURRENT_USER": {"Software": {"Google": {"Chrome": {
+          "BLBeacon": {"version": "126.0.6478.127"}}}}}},
+      "tools": {
+        "wsl": {
+          "latencyMs": 150, "jitterMs": 50,
+          "responses": [
+            {"argsPrefix": ["-d", "Ubuntu"], "failFirst": 2,
+             "failure": {"exitCode": 1, "stderr": "Catastrophic failure"}}
+          ]
+        },
+        "wmic": {"responses": [{"args": ["bios", "get", "serialnumber"],
+                                "stdout": "SerialNumber\\r\\nABC123\\r\\n"}]}
+      }
+    }
+
+A response matches on `args` (the exact argument list), `argsPrefix` or
+`argsContain` (a substring of the joined arguments); one without any of
+these matches every call. It replies with `stdout`, `stderr`, `exitCode`
+and `encoding` (`utf-16-le` for wsl.exe-style output). `latencyMs` and
+`jitterMs` delay the reply (on top of the fake's own Python startup) and
+`hang` never replies. Failures are injected into the first `failFirst`
+calls of the tool, or at random with `failureRate` (seeded, so runs are repeatable);
+they reply with `failure` instead. Latency, jitter and failure settings on
+the tool apply to all its responses.
+
+When nothing matches, `reg query <key> [/v <name>]` renders the registry as
+reg.exe's table, `wsl --list --quiet` prints `wslDistros` in UTF-16-LE like
+wsl.exe, and any other call succeeds with no output.
+"""
+
+import json
+import os
+import random
+import stat
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# Tools the host runs; a fake is installed for each (and each one a scenario names)
+DEFAULT_TOOLS = ("wsl", "reg", "wmic", "fsutil", "powershell", "WindowsSandbox", "cmd")
+SCENARIO_FILENAME = "scenario.json"
+CALLS_FILENAME = "calls.jsonl"
+COUNTERS_FILENAME = "counters.json"
+LOCK_FILENAME = "simulator.lock"
+
+REGISTRY_ROOTS = ("HKEY_CURRENT_USER", "HKEY_LOCAL_MACHINE", "HKEY_CLASSES_ROOT", "HKEY_USERS")
+REGISTRY_ROOT_ALIASES = {"HKCU": "HKEY_CURRENT_USER", "HKLM": "HKEY_LOCAL_MACHINE",
+                         "HKCR": "HKEY_CLASSES_ROOT", "HKU": "HKEY_USERS"}
+
+
+def _tool_key(name: str) -> str:
+    name = os.path.basename(name).lower()
+    return name[:-4] if name.endswith(".exe") else name
+
+
+class ToolSimulator:
+    """Installs fake tools on PATH for the duration of a with block."""
+
+    def __init__(self, scenario: Dict[str, Any], directory, tools: Iterable[str] = DEFAULT_TOOLS):
+        self.scenario = scenario
+        self.directory = os.path.abspath(str(directory))
+        self.bin_dir = os.path.join(self.directory, "bin")
+        names = {_tool_key(name): name for name in tools}
+        for name in scenario.get("tools", {}):
+            names.setdefault(_tool_key(name), name)
+        self.tools = sorted(set(names.values()))
+        self._saved_path = None
+
+    def __enter__(self) -> "ToolSimulator":
+        self.install()
+        self._saved_path = os.environ.get("PATH", "")
+        os.environ["PATH"] = self.bin_dir + os.pathsep + self._saved_path
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        os.environ["PATH"] = self._saved_path
+        return False
+
+    def install(self) -> None:
+        """Writes the scenario and a fake (with and without .exe) for every tool."""
+        os.makedirs(self.bin_dir, exist_ok=True)
+        with open(os.path.join(self.directory, SCENARIO_FILENAME), "w", encoding="utf-8") as f:
+            json.dump(self.scenario, f)
+        for name in self.tools:
+            for filename in (name, name + ".exe"):
+                self._write_fake(filename, _tool_key(name))
+
+    def _write_fake(self, filename: str, tool: str) -> None:
+        script = os.path.abspath(__file__)
+        if os.name == "nt":
+            path = os.path.join(self.bin_dir, os.path.splitext(filename)[0] + ".cmd")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f'@"{sys.executable}" "{script}" "{self.directory}" {tool} %*\r\n')
+            return
+        path = os.path.join(self.bin_dir, filename)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "{self.directory}" {tool} "$@"\n')
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+    def calls(self, tool: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Returns the recorded calls (oldest first), optionally for one tool."""
+        path = os.path.join(self.directory, CALLS_FILENAME)
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        return [record for record in records if tool is None or record["tool"] == _tool_key(tool)]
+
+    def winreg(self):
+        """A fake winreg over the scenario's registry, with its registryLatencyMs."""
+        return fake_winreg(self.scenario.get("registry", {}),
+                           latency_ms=self.scenario.get("registryLatencyMs", 0))
+
+
+class FakeRegistryKey:
+    """A registry key built from a dict: nested dicts are subkeys, anything else a value."""
+
+    def __init__(self, tree: Dict[str, Any]):
+        self.subkeys = {name: FakeRegistryKey(value) for name, value in tree.items() if isinstance(value, dict)}
+        self.values = {name: value for name, value in tree.items() if not isinstance(value, dict)}
+
+    def find(self, path: str) -> "FakeRegistryKey":
+        key = self
+        for part in filter(None, path.split("\\")):
+            match = next((name for name in key.subkeys if name.lower() == part.lower()), None)
+            if match is None:
+                raise FileNotFoundError(2, "The system cannot find the file specified", path)
+            key = key.subkeys[match]
+        return key
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def fake_winreg(registry: Dict[str, Any], latency_ms: float = 0):
+    """
+    Returns a stand-in for the winreg module over a nested dict with the
+    root keys (HKEY_CURRENT_USER, ...) at the top. Names are matched
+    case-insensitively, like the registry; every call takes latency_ms.
+    """
+    def delay():
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+
+    def open_key(key, sub_key, reserved=0, access=0):
+        delay()
+        return key.find(sub_key)
+
+    def query_value(key, name):
+        delay()
+        for value_name, value in key.values.items():
+            if value_name.lower() == (name or "").lower():
+                return value, REG_DWORD if isinstance(value, int) else REG_SZ
+        raise FileNotFoundError(2, "The system cannot find the file specified", name)
+
+    def enum_key(key, index):
+        names = list(key.subkeys)
+        if index >= len(names):
+            raise OSError(259, "No more data is available")
+        return names[index]
+
+    REG_SZ, REG_DWORD = 1, 4
+    roots = {name: FakeRegistryKey(registry.get(name, {})) for name in REGISTRY_ROOTS}
+    return SimpleNamespace(
+        OpenKey=open_key, OpenKeyEx=open_key, QueryValueEx=query_value, EnumKey=enum_key,
+        CloseKey=lambda key: None, KEY_READ=0x20019, KEY_WOW64_64KEY=0x0100, KEY_WOW64_32KEY=0x0200,
+        REG_SZ=REG_SZ, REG_DWORD=REG_DWORD, **roots)
+
+
+@contextmanager
+def _locked(directory: str):
+    """An exclusive lock on the simulator directory, shared by concurrent fakes."""
+    with open(os.path.join(directory, LOCK_FILENAME), "a+b") as handle:
+        if os.name == "nt":
+            import msvcrt
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _record_call(directory: str, tool: str, args: Sequence[str]) -> int:
+    """Logs the call and returns how many calls the tool had before it."""
+    with _locked(directory):
+        path = os.path.join(directory, COUNTERS_FILENAME)
+        try:
+            with open(path, encoding="utf-8") as f:
+                counters = json.load(f)
+        except (OSError, ValueError):
+            counters = {}
+        invocation = counters.get(tool, 0)
+        counters[tool] = invocation + 1
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(counters, f)
+        with open(os.path.join(directory, CALLS_FILENAME), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"tool": tool, "args": list(args), "invocation": invocation,
+                                "pid": os.getpid(), "time": time.time()}) + "\n")
+    return invocation
+
+
+def _matches(response: Dict[str, Any], args: Sequence[str]) -> bool:
+    if "args" in response:
+        return list(response["args"]) == list(args)
+    if "argsPrefix" in response:
+        prefix = list(response["argsPrefix"])
+        return list(args[:len(prefix)]) == prefix
+    if "argsContain" in response:
+        return response["argsContain"] in " ".join(args)
+    return True
+
+
+def _builtin_response(scenario: Dict[str, Any], tool: str, args: Sequence[str]) -> Dict[str, Any]:
+    lowered = [arg.lower() for arg in args]
+    if tool == "wsl" and lowered[:1] in (["--list"], ["-l"]):
+        distros = scenario.get("wslDistros", [])
+        return {"stdout": "".join(f"{name}\r\n" for name in distros), "encoding": "utf-16-le"}
+    if tool == "reg" and lowered[:1] == ["query"] and len(args) >= 2:
+        value_name = args[3] if lowered[2:3] == ["/v"] and len(args) > 3 else None
+        return _reg_query(scenario.get("registry", {}), args[1], value_name)
+    return {}
+
+
+def _reg_query(registry: Dict[str, Any], key_path: str, value_name: Optional[str]) -> Dict[str, Any]:
+    root, _, sub_key = key_path.partition("\\")
+    root = REGISTRY_ROOT_ALIASES.get(root.upper(), root.upper())
+    not_found = {"exitCode": 1, "stderr": "ERROR: The system was unable to find the specified registry key or value.\r\n"}
+    if root not in REGISTRY_ROOTS:
+        return {"exitCode": 1, "stderr": "ERROR: Invalid key name.\r\n"}
+    try:
+        key = FakeRegistryKey(registry.get(root, {})).find(sub_key)
+    except FileNotFoundError:
+        return not_found
+    values = key.values
+    if value_name is not None:
+        values = {name: value for name, value in values.items() if name.lower() == value_name.lower()}
+        if not values:
+            return not_found
+    lines = ["", f"{root}\\{sub_key}" if sub_key else root]
+    for name, value in values.items():
+        if isinstance(value, int):
+            lines.append(f"    {name}    REG_DWORD    {value:#x}")
+        else:
+            lines.append(f"    {name}    REG_SZ    {value}")
+    lines.append("")
+    if value_name is None:
+        for name in key.subkeys:
+            lines.append(f"{root}\\{sub_key}\\{name}")
+    return {"stdout": "\r\n".join(lines) + "\r\n"}
+
+
+def simulate(directory: str, tool: str, args: Sequence[str]) -> int:
+    """Replays the scripted response for one call of a fake tool; returns its exit code."""
+    with open(os.path.join(directory, SCENARIO_FILENAME), encoding="utf-8") as f:
+        scenario = json.load(f)
+    invocation = _record_call(directory, tool, args)
+    settings = next((value for name, value in scenario.get("tools", {}).items() if _tool_key(name) == tool), {})
+    response = next((r for r in settings.get("responses", []) if _matches(r, args)), None)
+    if response is None:
+        response = _builtin_response(scenario, tool, args)
+    options = dict(settings, **response)
+    rng = random.Random(f"{scenario.get('seed', 0)}:{tool}:{invocation}")
+
+    delay = options.get("latencyMs", 0) + rng.uniform(-1, 1) * options.get("jitterMs", 0)
+    if options.get("hang"):
+        # Until the host times out and kills the tree
+        threading.Event().wait()
+    if delay > 0:
+        time.sleep(delay / 1000)
+    if invocation < options.get("failFirst", 0) or rng.random() < options.get("failureRate", 0):
+        default_failure = {"exitCode": 1, "stderr": f"{tool}: simulated failure\r\n"}
+        response = dict(options.get("failure", default_failure))
+        response.setdefault("exitCode", 1)
+    else:
+        response = options
+    encoding = response.get("encoding", "utf-8")
+    for stream, text in ((sys.stdout, response.get("stdout", "")), (sys.stderr, response.get("stderr", ""))):
+        if text:
+            stream.buffer.write(text.encode(encoding))
+            stream.buffer.flush()
+    return int(response.get("exitCode", 0))
+
+
+if __name__ == "__main__":
+    sys.exit(simulate(sys.argv[1], sys.argv[2], sys.argv[3:]))
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Priority-aware worker pool for the Browser Launcher Pro native messaging host.
+
+Work is submitted to a named priority class. Each class has its own bounded
+thread pool, so interactive work such as a browser launch never waits behind
+maintenance work such as a WSL reinstall or a long PowerShell scan. Tasks may
+also name resource keys (e.g. 'wsl:Ubuntu'); a task holding a key exclusively
+never runs at the same time as another task using that key, whichever class
+either was submitted to. Keys are acquired before a task is given a worker,
+so tasks waiting for a busy resource stay queued and never tie up a class's
+workers while unrelated work is waiting.
+"""
+
+import contextvars
+import logging
+from collections import deque
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Priority classes
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_MAINTENANCE = "maintenance"
+
+DEFAULT_CLASS_LIMITS = {
+    PRIORITY_INTERACTIVE: 4,
+    PRIORITY_MAINTENANCE: 2,
+}
+
+# Number of recent wait times kept per class for percentile statistics
+WAIT_SAMPLE_SIZE = 256
+
+logger = logging.getLogger('BrowserLauncher')
+
+
+class _KeyLock:
+    """A reader/writer lock for one resource key (writers are preferred)."""
+
+    def __init__(self):
+        self.cond = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+        self.users = 0
+
+    def acquire(self, exclusive: bool) -> None:
+        with self.cond:
+            if exclusive:
+                self.waiting_writers += 1
+                while self.writer or self.readers:
+                    self.cond.wait()
+                self.waiting_writers -= 1
+                self.writer = True
+            else:
+                while self.writer or self.waiting_writers:
+                    self.cond.wait()
+                self.readers += 1
+
+    def try_acquire(self, exclusive: bool) -> bool:
+        """Acquires the lock if that is possible without waiting."""
+        with self.cond:
+            if self.writer or (self.readers if exclusive else self.waiting_writers):
+                return False
+            if exclusive:
+                self.writer = True
+            else:
+                self.readers += 1
+            return True
+
+    def release(self, exclusive: bool) -> None:
+        with self.cond:
+            if exclusive:
+                self.writer = False
+            else:
+                self.readers -= 1
+            self.cond.notify_all()
+
+
+class KeyedLocks:
+    """
+    A set of named locks that are created on demand and dropped when idle.
+
+    Keys can be held exclusively (e.g. a WSL reinstall owns 'wsl:Ubuntu') or
+    shared (e.g. browser launches into that distro, which may overlap with
+    each other but not with a reinstall).
+    """
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks: Dict[str, _KeyLock] = {}
+        self._release_listeners: List[Callable[[], None]] = []
+
+    @staticmethod
+    def modes(keys: Iterable[str] = (), shared_keys: Iterable[str] = ()) -> Dict[str, bool]:
+        """Maps each key to whether it is wanted exclusively."""
+        modes = {key: False for key in shared_keys if key}
+        modes.update({key: True for key in keys if key})
+        return modes
+
+    def add_release_listener(self, listener: Callable[[], None]) -> None:
+        """Registers a callable run after keys are released (e.g. to dispatch waiting work)."""
+        self._release_listeners.append(listener)
+
+    @contextmanager
+    def hold(self, keys: Iterable[str] = (), shared_keys: Iterable[str] = ()):
+        """Acquires all given keys in sorted order to avoid deadlocks."""
+        modes = self.modes(keys, shared_keys)
+        acquired = []
+        try:
+            for key in sorted(modes):
+                with self._guard:
+                    lock = self._locks.setdefault(key, _KeyLock())
+                    lock.users += 1
+                try:
+                    lock.acquire(modes[key])
+                except BaseException:
+                    self._drop(key)
+                    raise
+                acquired.append(key)
+            yield
+        finally:
+            self.release({key: modes[key] for key in acquired})
+
+    @contextmanager
+    def hold_if_free(self, keys: Iterable[str] = (), shared_keys: Iterable[str] = ()):
+        """Like hold(), but never waits: yields False, holding nothing, if a key is busy."""
+        modes = self.modes(keys, shared_keys)
+        if not self.try_hold(modes):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            self.release(modes)
+
+    def try_hold(self, modes: Dict[str, bool]) -> bool:
+        """
+        Acquires all keys of modes (see modes()) without waiting, or none of them.
+
+        Returns:
+            True if the keys are now held and must be passed to release()
+        """
+        acquired = []
+        with self._guard:
+            for key in sorted(modes):
+                lock = self._locks.setdefault(key, _KeyLock())
+                lock.users += 1
+                if not lock.try_acquire(modes[key]):
+                    lock.users -= 1
+                    if lock.users == 0:
+                        del self._locks[key]
+                    break
+                acquired.append(key)
+            else:
+                return True
+        # Nothing was held long enough for anyone to be waiting on it
+        self._unlock({key: modes[key] for key in acquired})
+        return False
+
+    def release(self, modes: Dict[str, bool]) -> None:
+        """Releases keys acquired through hold() or try_hold()."""
+        self._unlock(modes)
+        if modes:
+            for listener in self._release_listeners:
+                listener()
+
+    def _unlock(self, modes: Dict[str, bool]) -> None:
+        for key in sorted(modes, reverse=True):
+            self._locks[key].release(modes[key])
+            self._drop(key)
+
+    def _drop(self, key: str) -> None:
+        with self._guard:
+            lock = self._locks[key]
+            lock.users -= 1
+            if lock.users == 0:
+                del self._locks[key]
+
+    def busy_keys(self):
+        """Returns the keys that are currently held or waited on."""
+        with self._guard:
+            return sorted(self._locks)
+
+
+class _ClassStats:
+    """Counters for a single priority class."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.queued = 0
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_samples = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self.max_wait = 0.0
+
+    def record_wait(self, wait: float) -> None:
+        self.wait_samples.append(wait)
+        self.max_wait = max(self.max_wait, wait)
+
+    def to_dict(self) -> Dict[str, Any]:
+        samples = sorted(self.wait_samples)
+        if samples:
+            avg_wait = sum(samples) / len(samples)
+            p95_wait = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        else:
+            avg_wait = p95_wait = 0.0
+        return {
+            "limit": self.limit,
+            "queued": self.queued,
+            "running": self.running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avgWaitMs": round(avg_wait * 1000, 3),
+            "p95WaitMs": round(p95_wait * 1000, 3),
+            "maxWaitMs": round(self.max_wait * 1000, 3),
+        }
+
+
+class _Task:
+    """A submitted callable waiting for a worker and its resource keys."""
+
+    def __init__(self, priority: str, modes: Dict[str, bool], run: Callable[[], None], future: Future):
+        self.priority = priority
+        self.modes = modes
+        self.run = run
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class WorkerPool:
+    """Runs callables on per-priority-class thread pools with keyed resource locks."""
+
+    def __init__(self, class_limits: Optional[Dict[str, int]] = None):
+        limits = dict(DEFAULT_CLASS_LIMITS)
+        limits.update(class_limits or {})
+        self.locks = KeyedLocks()
+        self.locks.add_release_listener(self._dispatch)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._closed = False
+        # Tasks not yet given a worker, oldest first, over all classes
+        self._waiting: List[_Task] = []
+        self._stats = {name: _ClassStats(limit) for name, limit in limits.items()}
+        self._executors = {
+            name: ThreadPoolExecutor(max_workers=max(1, limit), thread_name_prefix=f"pool-{name}")
+            for name, limit in limits.items()
+        }
+
+    def submit(self, fn: Callable[..., Any], *args,
+               priority: str = PRIORITY_INTERACTIVE,
+               keys: Iterable[str] = (), shared_keys: Iterable[str] = (),
+               **kwargs) -> Future:
+        """
+        Queues a callable on the given priority class.
+
+        The callable is handed to a worker only once its resource keys are
+        free; until then it counts as queued.
+
+        Args:
+            fn: The callable to run
+            priority: Name of the priority class
+            keys: Resource keys that must be held exclusively while fn runs
+            shared_keys: Resource keys held in shared mode while fn runs
+
+        Returns:
+            A Future with the callable's result
+        """
+        if priority not in self._executors:
+            raise ValueError(f"Unknown priority class: {priority}")
+        stats = self._stats[priority]
+        future = Future()
+        # Context variables set by the submitter (e.g. the action spawns are
+        # counted against) stay visible to fn on the worker thread
+        context = contextvars.copy_context()
+
+        def run():
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = context.run(fn, *args, **kwargs)
+                    except BaseException as e:
+                        with self._lock:
+                            stats.failed += 1
+                        future.set_exception(e)
+                    else:
+                        with self._lock:
+                            stats.completed += 1
+                        future.set_result(result)
+            finally:
+                self._finish(task)
+
+        task = _Task(priority, KeyedLocks.modes(keys, shared_keys), run, future)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            stats.queued += 1
+            stats.submitted += 1
+            self._pending += 1
+            self._waiting.append(task)
+        # A task cancelled while waiting gives up its place right away
+        future.add_done_callback(lambda f: f.cancelled() and self._dispatch())
+        self._dispatch()
+        return future
+
+    def _dispatch(self) -> None:
+        """Hands waiting tasks whose class has a free worker and whose keys are free to a worker."""
+        started = []
+        with self._lock:
+            free = {name: stats.limit - stats.running for name, stats in self._stats.items()}
+            # Keys a waiting task wants exclusively are not given to later tasks,
+            # so a stream of shared users cannot starve a reinstall
+            reserved = set()
+            for task in list(self._waiting):
+                if task.future.cancelled():
+                    self._waiting.remove(task)
+                    self._stats[task.priority].queued -= 1
+                    self._pending -= 1
+                    continue
+                if free[task.priority] <= 0:
+                    continue
+                if reserved.intersection(task.modes) or not self.locks.try_hold(task.modes):
+                    reserved.update(key for key, exclusive in task.modes.items() if exclusive)
+                    continue
+                self._waiting.remove(task)
+                stats = self._stats[task.priority]
+                stats.queued -= 1
+                stats.running += 1
+                stats.record_wait(time.monotonic() - task.enqueued)
+                free[task.priority] -= 1
+                started.append(task)
+            self._idle.notify_all()
+        for task in started:
+            try:
+                self._executors[task.priority].submit(task.run)
+            except RuntimeError as e:
+                # The pool was shut down without waiting
+                task.future.set_exception(e)
+                self._finish(task)
+
+    def _finish(self, task: _Task) -> None:
+        with self._lock:
+            self._stats[task.priority].running -= 1
+            self._pending -= 1
+            self._idle.notify_all()
+        # Releasing the keys dispatches waiting work; do it for the freed worker too
+        self.locks.release(task.modes)
+        self._dispatch()
+
+    def queued(self) -> int:
+        """Returns the number of tasks waiting for a worker, over all classes."""
+        with self._lock:
+            return sum(stats.queued for stats in self._stats.values())
+
+    def active(self, priority: str) -> int:
+        """Returns the number of tasks of a priority class that are queued or running."""
+        with self._lock:
+            stats = self._stats[priority]
+            return stats.queued + stats.running
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns queue depth and wait-time statistics per priority class."""
+        with self._lock:
+            classes = {name: stats.to_dict() for name, stats in self._stats.items()}
+        return {"classes": classes, "lockedResources": self.locks.busy_keys()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops accepting work; optionally waits for queued work to finish.
+
+        Work submitted by running tasks (e.g. a handler starting a job) is
+        waited for as well.
+        """
+        if wait:
+            with self._idle:
+                while self._pending:
+                    self._idle.wait()
+        with self._lock:
+            self._closed = True
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait)
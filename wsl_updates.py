@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Parallel browser updates across WSL distros for the Browser Launcher Pro host.
+
+Updating browsers used to mean running update-wsl-browsers.sh (or a full
+reinstate) in one distro at a time while the host waited. The updater runs
+the update in several distros at once, capped at `workers`:
+
+- Each distro's output is read line by line as it arrives, and the latest
+  lines are reported through `on_progress`, so a job status query shows
+  how far every distro has got.
+- An update whose sudo could not run (no password prompt without a
+  terminal) fails even though the script exits 0; the host runs the script
+  as root so it does not need sudo's password.
+- Every distro has its own timeout. A distro that runs past it has its
+  process tree killed, without holding up the others.
+- The browser packages' installed and candidate versions are read before
+  and after each update. The after-state goes into a version inventory
+  (`WSLBrowserVersions.json`). A distro whose inventory entry is recent and
+  shows every browser at its candidate version is skipped without starting
+  anything, unless `force` is set.
+
+`run()` returns a summary: per-distro status, versions before and after,
+duration and output tail, plus counts and the failures.
+"""
+
+import json
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Sequence
+
+from process_tree import ConfinedPopen, kill_tree
+from spawn_stats import account_spawn, run as run_accounted
+
+VERSION_INVENTORY_FILENAME = "WSLBrowserVersions.json"
+DEFAULT_UPDATE_WORKERS = 2
+DEFAULT_DISTRO_TIMEOUT = 20 * 60
+# How long an inventory entry can be trusted to skip a distro
+DEFAULT_INVENTORY_MAX_AGE = 6 * 60 * 60
+INVENTORY_TIMEOUT = 60
+OUTPUT_TAIL_LINES = 40
+# Minimum seconds between progress reports while output streams in
+PROGRESS_INTERVAL = 0.5
+POLL_INTERVAL = 0.2
+
+# The browser packages update-wsl-browsers.sh updates; keep the lists in sync
+BROWSER_PACKAGES = (
+    "google-chrome-stable", "google-chrome-beta", "google-chrome-unstable",
+    "microsoft-edge-stable", "microsoft-edge-beta", "microsoft-edge-dev",
+    "brave-browser", "firefox", "opera-stable", "opera",
+)
+
+# Distro statuses
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_UPDATED = "updated"
+STATUS_CURRENT = "current"
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+STATUS_TIMED_OUT = "timedOut"
+STATUS_CANCELLED = "cancelled"
+
+FAILED_STATUSES = (STATUS_FAILED, STATUS_TIMED_OUT)
+
+# Prints "package|installed version|candidate version" for every package
+INVENTORY_SCRIPT = (
+    'for p; do '
+    'i=$(dpkg-query -W -f=\'${Status} ${Version}\\n\' "$p" 2>/dev/null | awk \'$3 == "installed" {print $4}\'); '
+    'c=$(apt-cache policy "$p" 2>/dev/null | awk \'/Candidate:/ {print $2}\'); '
+    'printf "%s|%s|%s\\n" "$p" "$i" "$c"; '
+    'done'
+)
+
+# Output of a sudo that could not run: the script carries on and exits 0 anyway
+_SUDO_FAILURE = re.compile(r"\bsudo: (?:a terminal is required|a password is required|no tty present"
+                           r"|\d+ incorrect password|command not found|.*not in the sudoers)")
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]|\x1b[()][A-Za-z0-9]")
+
+logger = logging.getLogger('BrowserLauncher')
+
+
+def parse_inventory(output: str) -> Dict[str, Dict[str, Optional[str]]]:
+    """Parses INVENTORY_SCRIPT output into {package: {installed, candidate}} for installed packages."""
+    browsers = {}
+    for line in output.splitlines():
+        parts = line.strip().split("|")
+        if len(parts) != 3 or not parts[1]:
+            continue
+        package, installed, candidate = parts
+        # "(none)" when the package is not in any configured repository
+        browsers[package] = {"installed": installed,
+                             "candidate": candidate if candidate and candidate != "(none)" else None}
+    return browsers
+
+
+def is_current(entry: Optional[Dict[str, Any]], max_age: float, now: Optional[float] = None) -> bool:
+    """True if an inventory entry is recent and every installed browser is at its candidate version."""
+    if not entry or (now if now is not None else time.time()) - entry.get("checked", 0) > max_age:
+        return False
+    return all(not versions["candidate"] or versions["installed"] == versions["candidate"]
+               for versions in entry.get("browsers", {}).values())
+
+
+class VersionInventory:
+    """Browser versions per distro, kept in a JSON file; thread-safe."""
+
+    def __init__(self, path: str = VERSION_INVENTORY_FILENAME):
+        self.path = path
+        self._lock = threading.Lock()
+        self._distros: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._distros = json.load(f).get("distros", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def get(self, distro: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._distros.get(distro.lower())
+            return json.loads(json.dumps(entry)) if entry else None
+
+    def put(self, distro: str, browsers: Dict[str, Dict[str, Optional[str]]]) -> None:
+        """Records a distro's versions as of now and saves the inventory."""
+        with self._lock:
+            self._distros[distro.lower()] = {"name": distro, "checked": time.time(), "browsers": browsers}
+            snapshot = {"timestamp": time.time(), "distros": self._distros}
+            temp_path = f"{self.path}.tmp"
+            try:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                logger.error(f"Error writing WSL browser inventory {self.path}: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return json.loads(json.dumps(self._distros))
+
+
+def inventory_argv(wsl_executable: str, distro: str) -> List[str]:
+    return [wsl_executable, "-d", distro, "--", "sh", "-c", INVENTORY_SCRIPT, "sh"] + list(BROWSER_PACKAGES)
+
+
+def installed_versions(browsers: Dict[str, Dict[str, Optional[str]]]) -> Dict[str, str]:
+    return {package: versions["installed"] for package, versions in browsers.items()}
+
+
+class WSLBrowserUpdater:
+    """Runs a browser update in several distros at once and summarizes the outcome."""
+
+    def __init__(self, distros: Sequence[str], update_argv: Callable[[str], List[str]],
+                 wsl_executable: str = "wsl", workers: int = DEFAULT_UPDATE_WORKERS,
+                 distro_timeout: float = DEFAULT_DISTRO_TIMEOUT, inventory: Optional[VersionInventory] = None,
+                 max_age: float = DEFAULT_INVENTORY_MAX_AGE, force: bool = False,
+                 on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 cancel_event: Optional[threading.Event] = None,
+                 hold: Callable[[str], ContextManager] = lambda distro: nullcontext()):
+        """
+        Args:
+            distros: The distros to update
+            update_argv: Returns the command that updates one distro
+            workers: How many distros update at once
+            distro_timeout: Seconds one distro's update may take
+            inventory: Versions from earlier runs; a fresh one is used if None
+            max_age: Seconds an inventory entry can be trusted to skip a distro
+            force: Updates distros the inventory says are current
+            on_progress: Called with progress() whenever a distro moves on
+            cancel_event: Stops the run when set: running updates are killed
+            hold: Returns a context manager held while a distro updates
+        """
+        self.distros = list(dict.fromkeys(distros))
+        self.update_argv = update_argv
+        self.wsl_executable = wsl_executable
+        self.workers = max(1, workers)
+        self.distro_timeout = distro_timeout
+        self.inventory = inventory if inventory is not None else VersionInventory()
+        self.max_age = max_age
+        self.force = force
+        self.on_progress = on_progress
+        self.cancel_event = cancel_event or threading.Event()
+        self.hold = hold
+        self._lock = threading.Lock()
+        self._last_report = 0.0
+        # First sudo error seen per distro
+        self._sudo_failures: Dict[str, str] = {}
+        self._started = time.time()
+        self._states = {distro: {"name": distro, "status": STATUS_PENDING, "lines": 0,
+                                 "output": deque(maxlen=OUTPUT_TAIL_LINES)} for distro in self.distros}
+
+    def run(self) -> Dict[str, Any]:
+        """Updates every distro (workers at a time) and returns the summary."""
+        start = time.monotonic()
+        self._report(force=True)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="wsl-update") as executor:
+            list(executor.map(self._update_distro, self.distros))
+        summary = self.progress()
+        summary["elapsed"] = round(time.monotonic() - start, 3)
+        summary["failures"] = [{"name": state["name"], "status": state["status"], "error": state.get("error")}
+                               for state in summary["distros"].values() if state["status"] in FAILED_STATUSES]
+        return summary
+
+    def progress(self) -> Dict[str, Any]:
+        """Returns every distro's state and output tail so far, with counts per status."""
+        with self._lock:
+            distros = {name: dict(state, output=list(state["output"])) for name, state in self._states.items()}
+        counts: Dict[str, int] = {}
+        for state in distros.values():
+            counts[state["status"]] = counts.get(state["status"], 0) + 1
+        return {"started": round(self._started, 3), "workers": self.workers, "force": self.force,
+                "counts": counts, "distros": distros}
+
+    def _update_distro(self, distro: str) -> None:
+        state = self._states[distro]
+        if self.cancel_event.is_set():
+            self._set(state, status=STATUS_CANCELLED)
+            return
+        entry = self.inventory.get(distro)
+        if not self.force and is_current(entry, self.max_age):
+            versions = installed_versions(entry["browsers"])
+            self._set(state, status=STATUS_SKIPPED, before=versions, after=versions, changed={},
+                      reason=f"Browsers current as of {time.ctime(entry['checked'])}", elapsed=0.0)
+            return
+        start = time.monotonic()
+        with self.hold(distro):
+            self._set(state, status=STATUS_RUNNING)
+            before = self._read_versions(distro)
+            returncode, outcome, error = self._run_update(distro, state)
+            # A killed update may have left packages half installed: look again either way
+            after = self._read_versions(distro) if outcome != STATUS_CANCELLED else None
+        if after is not None:
+            self.inventory.put(distro, after)
+        before_versions = installed_versions(before) if before is not None else None
+        after_versions = installed_versions(after) if after is not None else None
+        changed = {}
+        if before_versions is not None and after_versions is not None:
+            changed = {package: {"from": before_versions.get(package), "to": version}
+                       for package, version in after_versions.items() if before_versions.get(package) != version}
+        if outcome == STATUS_UPDATED and not changed:
+            outcome = STATUS_CURRENT
+        self._set(state, status=outcome, exitCode=returncode, error=error, before=before_versions,
+                  after=after_versions, changed=changed, elapsed=round(time.monotonic() - start, 3))
+
+    def _read_versions(self, distro: str) -> Optional[Dict[str, Dict[str, Optional[str]]]]:
+        try:
+            result = run_accounted(inventory_argv(self.wsl_executable, distro), capture_output=True,
+                                   timeout=INVENTORY_TIMEOUT,
+                                   creationflags=subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Could not read browser versions in {distro}: {e}")
+            return None
+        if result.returncode != 0:
+            logger.warning(f"Could not read browser versions in {distro}: exit code {result.returncode}")
+            return None
+        return parse_inventory(result.stdout.decode("utf-8", errors="replace").replace("\x00", ""))
+
+    def _run_update(self, distro: str, state: Dict[str, Any]):
+        """Runs one distro's update, streaming its output; returns (exit code, status, error)."""
+        argv = self.update_argv(distro)
+        kwargs = {"creationflags": subprocess.CREATE_NO_WINDOW} if os.name == "nt" else {}
+        with account_spawn(argv):
+            try:
+                process = ConfinedPopen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, **kwargs)
+            except OSError as e:
+                return None, STATUS_FAILED, f"Could not start the update: {e}"
+            reader = threading.Thread(target=self._read_output, args=(process.stdout, state),
+                                      name=f"wsl-update-{distro}", daemon=True)
+            reader.start()
+            deadline = time.monotonic() + self.distro_timeout
+            outcome = None
+            while process.poll() is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    outcome = STATUS_TIMED_OUT
+                elif self.cancel_event.wait(min(POLL_INTERVAL, remaining)):
+                    outcome = STATUS_CANCELLED
+                if outcome:
+                    kill_tree(process)
+                    break
+            process.wait()
+            reader.join(timeout=5)
+            process.stdout.close()
+        if outcome == STATUS_TIMED_OUT:
+            logger.warning(f"Browser update in {distro} timed out after {self.distro_timeout} seconds")
+            return process.returncode, outcome, f"Timed out after {self.distro_timeout} seconds"
+        if outcome == STATUS_CANCELLED:
+            return process.returncode, outcome, "Cancelled"
+        if process.returncode != 0:
+            return process.returncode, STATUS_FAILED, f"Update exited with code {process.returncode}"
+        if distro in self._sudo_failures:
+            return process.returncode, STATUS_FAILED, f"Could not run apt-get: {self._sudo_failures[distro]}"
+        return process.returncode, STATUS_UPDATED, None
+
+    def _read_output(self, stream, state: Dict[str, Any]) -> None:
+        for raw in iter(stream.readline, b""):
+            line = _ANSI_ESCAPE.sub("", raw.decode("utf-8", errors="replace").replace("\x00", "")).rstrip()
+            if not line:
+                continue
+            with self._lock:
+                state["output"].append(line)
+                state["lines"] += 1
+                if _SUDO_FAILURE.search(line):
+                    self._sudo_failures.setdefault(state["name"], line)
+            self._report()
+
+    def _set(self, state: Dict[str, Any], **fields) -> None:
+        with self._lock:
+            state.update(fields)
+        logger.info(f"WSL browser update in {state['name']}: {state['status']}")
+        self._report(force=True)
+
+    def _report(self, force: bool = False) -> None:
+        if self.on_progress is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_report < PROGRESS_INTERVAL:
+                return
+            self._last_report = now
+        try:
+            self.on_progress(self.progress())
+        except Exception as e:
+            logger.error(f"Error reporting WSL update progress: {e}")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+WSL pre-warm and keepalive manager for the Browser Launcher Pro native host.
+
+The first `wsl -d <distro> ...` after the WSL2 utility VM has gone idle pays
+for booting the VM and the distro, which can take several seconds and used to
+happen on the user's click. When enabled, this manager boots the configured
+distros in the background as soon as the host starts, keeps them alive with a
+cheap periodic no-op while they are in use, and tracks whether each one is
+warm or cold so launches can report it. A distro that is busy (e.g. being
+unregistered or reinstalled, see `hold`) is not booted or pinged.
+"""
+
+import logging
+import os
+import subprocess
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, Optional
+
+from spawn_stats import run as run_accounted
+
+# Distro states
+WSL_STATE_COLD = "cold"
+WSL_STATE_BOOTING = "booting"
+WSL_STATE_WARM = "warm"
+WSL_STATE_FAILED = "failed"
+
+DEFAULT_KEEPALIVE_INTERVAL = 30
+DEFAULT_IDLE_TIMEOUT = 15 * 60
+DEFAULT_BOOT_TIMEOUT = 60
+
+logger = logging.getLogger('BrowserLauncher')
+
+
+class WSLWarmupManager:
+    """Boots WSL distros ahead of use and keeps recently used ones running."""
+
+    def __init__(self, distros: Iterable[str], wsl_executable: str = "wsl",
+                 keepalive_interval: float = DEFAULT_KEEPALIVE_INTERVAL,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 boot_timeout: float = DEFAULT_BOOT_TIMEOUT,
+                 hold: Callable[[str], ContextManager[bool]] = lambda distro: nullcontext(True)):
+        """
+        Args:
+            distros: Names of the distros to pre-warm
+            wsl_executable: wsl.exe to run (a fake one can be passed in tests)
+            keepalive_interval: Seconds between keepalive no-ops
+            idle_timeout: Stop keeping a distro alive this many seconds after its last use
+            boot_timeout: Timeout for a single boot or keepalive command
+            hold: Returns a context manager held around each boot or ping; it
+                yields False when the distro is busy, and the ping is skipped
+        """
+        self.wsl_executable = wsl_executable
+        self.hold = hold
+        self.keepalive_interval = keepalive_interval
+        self.idle_timeout = idle_timeout
+        self.boot_timeout = boot_timeout
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        now = time.time()
+        self._distros: Dict[str, Dict[str, Any]] = {
+            name: {"state": WSL_STATE_COLD, "lastUsed": now, "lastPing": None,
+                   "bootSeconds": None, "error": None}
+            for name in distros if name
+        }
+
+    def _run_noop(self, distro: str) -> Optional[str]:
+        """Runs a no-op inside the distro. Returns None on success or an error string."""
+        command = [self.wsl_executable, "-d", distro, "--", "true"]
+        try:
+            result = run_accounted(
+                command,
+                capture_output=True,
+                timeout=self.boot_timeout,
+                creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+            )
+        except subprocess.TimeoutExpired:
+            return f"Timed out after {self.boot_timeout} seconds"
+        except OSError as e:
+            return str(e)
+        if result.returncode != 0:
+            stderr = result.stderr.decode("utf-16-le" if b"\x00" in result.stderr else "utf-8",
+                                          errors="replace").strip()
+            return f"Exit code {result.returncode}: {stderr}"
+        return None
+
+    def _set(self, distro: str, **fields) -> None:
+        with self._lock:
+            # Reuse the configured spelling, WSL distro names are case-insensitive
+            distro = next((name for name in self._distros if name.lower() == distro.lower()), distro)
+            self._distros.setdefault(distro, {"state": WSL_STATE_COLD, "lastUsed": time.time(),
+                                              "lastPing": None, "bootSeconds": None,
+                                              "error": None}).update(fields)
+
+    def boot(self, distro: str) -> bool:
+        """Boots a distro synchronously and records the result."""
+        with self.hold(distro) as free:
+            if not free:
+                logger.info(f"Not pre-warming WSL distro {distro}: it is busy")
+                return False
+            self._set(distro, state=WSL_STATE_BOOTING)
+            start = time.monotonic()
+            error = self._run_noop(distro)
+        if error:
+            logger.warning(f"Failed to pre-warm WSL distro {distro}: {error}")
+            self._set(distro, state=WSL_STATE_FAILED, error=error)
+            return False
+        elapsed = time.monotonic() - start
+        logger.info(f"Pre-warmed WSL distro {distro} in {elapsed:.2f}s")
+        self._set(distro, state=WSL_STATE_WARM, error=None, lastPing=time.time(),
+                  bootSeconds=round(elapsed, 3))
+        return True
+
+    def keepalive_once(self) -> None:
+        """Pings every recently used distro once; idle distros are left to shut down."""
+        now = time.time()
+        with self._lock:
+            targets = [name for name, info in self._distros.items()
+                       if now - info["lastUsed"] <= self.idle_timeout]
+            idle = [name for name in self._distros if name not in targets]
+        for name in idle:
+            self._set(name, state=WSL_STATE_COLD)
+        for name in targets:
+            with self.hold(name) as free:
+                if not free:
+                    continue
+                error = self._run_noop(name)
+            if error:
+                self._set(name, state=WSL_STATE_COLD, error=error)
+            else:
+                self._set(name, state=WSL_STATE_WARM, error=None, lastPing=time.time())
+
+    def _loop(self) -> None:
+        boot_threads = [threading.Thread(target=self.boot, args=(name,), daemon=True)
+                        for name in self.distros()]
+        for thread in boot_threads:
+            thread.start()
+        for thread in boot_threads:
+            thread.join()
+        while not self._stop.wait(self.keepalive_interval):
+            self.keepalive_once()
+
+    def start(self) -> None:
+        """Starts booting the distros and the keepalive loop in the background."""
+        if self._thread is not None:
+            return
+        # Daemon thread: pre-warming must never keep the host process alive
+        self._thread = threading.Thread(target=self._loop, name="wsl-warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the keepalive loop."""
+        self._stop.set()
+
+    def touch(self, distro: str) -> None:
+        """Records that a distro was just used (a successful launch leaves it warm)."""
+        self._set(distro, lastUsed=time.time(), state=WSL_STATE_WARM)
+
+    def state_of(self, distro: str) -> str:
+        """Returns the tracked state of a distro (names are matched case-insensitively)."""
+        with self._lock:
+            for name, info in self._distros.items():
+                if name.lower() == distro.lower():
+                    return info["state"]
+        return WSL_STATE_COLD
+
+    def distros(self) -> List[str]:
+        with self._lock:
+            return list(self._distros)
+
+    def status(self) -> Dict[str, Any]:
+        """Returns a snapshot of every tracked distro."""
+        with self._lock:
+            return {name: dict(info) for name, info in self._distros.items()}
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Fast parallel connectivity probe engine for Browser Launcher Pro.
+
+Runs DNS resolution, TCP connects to several internet targets and a default
+gateway reachability check at the same time, each with its own timeout. It
+returns as soon as connectivity is proven (one successful DNS lookup and one
+successful internet TCP connect) and otherwise waits for the remaining probes
+and reports a structured diagnosis that tells DNS failures apart from routing
+failures.
+
+It is used by network-fix.py and by the native messaging host, either
+in-process or inside a WSL distro (see probe_in_wsl), and can also be run
+directly:
+
+  python3 connectivity_probe.py [--timeout 3] [--json]
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+DEFAULT_TIMEOUT = 3.0
+DEFAULT_DNS_NAMES = ["google.com", "cloudflare.com"]
+# Internet targets given as IP literals so routing is tested independently of DNS
+DEFAULT_TCP_TARGETS = [("1.1.1.1", 443), ("8.8.8.8", 443), ("9.9.9.9", 443)]
+GATEWAY_PORT = 53
+
+# Diagnoses
+DIAGNOSIS_ONLINE = "online"
+DIAGNOSIS_DNS_FAILURE = "dns_failure"
+DIAGNOSIS_NO_ROUTE = "no_internet_route"
+DIAGNOSIS_NO_GATEWAY = "gateway_unreachable"
+DIAGNOSIS_OFFLINE = "offline"
+
+
+def get_default_gateway():
+    """Returns the IPv4 default gateway from /proc/net/route, or None."""
+    try:
+        with open("/proc/net/route") as f:
+            for line in f.readlines()[1:]:
+                fields = line.split()
+                if len(fields) >= 4 and fields[1] == "00000000" and int(fields[3], 16) & 2:
+                    return socket.inet_ntoa(struct.pack("<L", int(fields[2], 16)))
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def probe_dns(name, timeout):
+    """Resolves a host name. getaddrinfo has no timeout; the caller enforces it."""
+    addresses = socket.getaddrinfo(name, 443, proto=socket.IPPROTO_TCP)
+    return addresses[0][4][0]
+
+
+def probe_tcp(host, port, timeout):
+    """Opens and closes a TCP connection."""
+    with socket.create_connection((host, port), timeout=timeout):
+        return f"{host}:{port}"
+
+
+def probe_gateway(host, port, timeout):
+    """
+    Checks that the gateway answers on the local network.
+
+    A refused connection still proves the gateway is reachable, so only
+    timeouts and unreachable errors count as failures.
+    """
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return "open"
+    except ConnectionRefusedError:
+        return "refused"
+
+
+def diagnose(probes):
+    """Derives a diagnosis from the finished probes."""
+    def any_ok(kind):
+        return any(p["ok"] for p in probes if p["kind"] == kind)
+
+    dns_ok, tcp_ok = any_ok("dns"), any_ok("tcp")
+    gateway = [p for p in probes if p["kind"] == "gateway"]
+    if dns_ok and tcp_ok:
+        return DIAGNOSIS_ONLINE
+    if tcp_ok:
+        return DIAGNOSIS_DNS_FAILURE
+    if gateway and not any_ok("gateway"):
+        return DIAGNOSIS_NO_GATEWAY
+    if gateway or dns_ok:
+        return DIAGNOSIS_NO_ROUTE
+    return DIAGNOSIS_OFFLINE
+
+
+def run_probes(dns_names=None, tcp_targets=None, gateway=None, timeout=DEFAULT_TIMEOUT,
+               gateway_port=GATEWAY_PORT):
+    """
+    Runs all probes in parallel and returns a diagnosis dictionary.
+
+    Args:
+        dns_names: Host names to resolve
+        tcp_targets: (host, port) pairs on the internet to connect to
+        gateway: Gateway address; None detects it, False skips the check
+        timeout: Per-probe timeout in seconds
+        gateway_port: Port used for the gateway check
+
+    Returns:
+        {"online", "diagnosis", "elapsed", "gateway", "probes": [...]}
+    """
+    dns_names = DEFAULT_DNS_NAMES if dns_names is None else dns_names
+    tcp_targets = DEFAULT_TCP_TARGETS if tcp_targets is None else tcp_targets
+    if gateway is None:
+        gateway = get_default_gateway()
+
+    start = time.monotonic()
+    jobs = [("dns", name, probe_dns, (name, timeout)) for name in dns_names]
+    jobs += [("tcp", f"{host}:{port}", probe_tcp, (host, port, timeout)) for host, port in tcp_targets]
+    if gateway:
+        jobs.append(("gateway", f"{gateway}:{gateway_port}", probe_gateway,
+                     (gateway, gateway_port, timeout)))
+
+    # Daemon threads, not an executor: getaddrinfo cannot be interrupted, and
+    # executor workers would be joined at interpreter exit, holding the CLI
+    # (and so probe_in_wsl) until the slowest lookup gives up
+    results = queue.Queue()
+
+    def run(index, func, args):
+        try:
+            results.put((index, time.monotonic(), func(*args), None))
+        except Exception as e:
+            results.put((index, time.monotonic(), None, e))
+
+    probes = []
+    pending = {}
+    for index, (kind, target, func, args) in enumerate(jobs):
+        pending[index] = (kind, target, time.monotonic())
+        threading.Thread(target=run, args=(index, func, args), name=f"probe-{kind}", daemon=True).start()
+    # Small grace period so probes that hit their own timeout report it
+    deadline = start + timeout + 0.5
+    while pending:
+        try:
+            index, finished, detail, error = results.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            break
+        kind, target, submitted = pending.pop(index)
+        probe = {"kind": kind, "target": target, "ok": error is None,
+                 "elapsed": round(finished - submitted, 3)}
+        if error is None:
+            probe["detail"] = detail
+        else:
+            probe["error"] = str(error) or type(error).__name__
+        probes.append(probe)
+        if diagnose(probes) == DIAGNOSIS_ONLINE:
+            break
+
+    # Probes still in flight are left to finish on their own (their sockets
+    # carry the same timeout) and reported without waiting.
+    online = diagnose(probes) == DIAGNOSIS_ONLINE
+    for kind, target, _ in pending.values():
+        probes.append({"kind": kind, "target": target, "ok": False,
+                       "elapsed": round(time.monotonic() - start, 3),
+                       "error": "not needed" if online else "timed out"})
+
+    diagnosis = diagnose(probes)
+    return {
+        "online": diagnosis == DIAGNOSIS_ONLINE,
+        "diagnosis": diagnosis,
+        "elapsed": round(time.monotonic() - start, 3),
+        "gateway": gateway or None,
+        "probes": probes,
+    }
+
+
+def probe_in_wsl(distro, timeout=DEFAULT_TIMEOUT, wsl_executable="wsl", run=subprocess.run):
+    """
+    Runs this probe engine inside a WSL distro and returns its diagnosis.
+
+    The module source is piped to `python3 -` in the distro, so no path
+    translation is needed. Returns None if python3 is not available there.
+    run is called like subprocess.run; the native host passes
+    spawn_stats.run so the request's deadline and cancellation apply and
+    a timeout kills the whole wsl.exe tree.
+    """
+    source_path = os.path.abspath(__file__)
+    if not os.path.exists(source_path):
+        # Frozen host: use the copy shipped in wslscripts next to the executable
+        source_path = os.path.join(os.getcwd(), "wslscripts", "connectivity_probe.py")
+    with open(source_path, "rb") as f:
+        source = f.read()
+    command = [wsl_executable, "-d", distro, "--", "python3", "-", "--json", "--timeout", str(timeout)]
+    result = run(
+        command,
+        input=source,
+        capture_output=True,
+        timeout=timeout * 2 + 30,
+        creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+    )
+    try:
+        return json.loads(result.stdout.decode("utf-8", errors="replace").strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel connectivity probe")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Per-probe timeout in seconds")
+    parser.add_argument("--json", action="store_true", help="Print the diagnosis as JSON")
+    args = parser.parse_args()
+
+    report = run_probes(timeout=args.timeout)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(f"Diagnosis: {report['diagnosis']} ({report['elapsed']}s)")
+        for probe in report["probes"]:
+            status = "ok" if probe["ok"] else f"failed: {probe.get('error')}"
+            print(f"  {probe['kind']:<8} {probe['target']:<24} {status}")
+    sys.exit(0 if report["online"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
+import argparse
+import os
 import subprocess
-import re
 import time
 
+from connectivity_probe import probe_in_wsl
+import wsl_health
+
+# Sweep results go next to the native host so it can serve them to the extension
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  wsl_health.WSL_HEALTH_CACHE_FILENAME)
+
 # Function to log and execute commands
 def invoke_logged_command(command):
     print(f"Executing: {command}")
@@ -9,15 +17,13 @@ def invoke_logged_command(command):
 
 # Function to get or start a WSL2 instance
 def get_or_start_wsl2_instance():
-    wsl_output = subprocess.check_output(["wsl", "-l", "-v"], text=True)
-    wsl_instances = [re.sub(r'\s+', '', line.split()[1]) for line in wsl_output.splitlines()[1:] if "2" in line and "docker" not in line]
+    wsl_instances = wsl_health.list_wsl2_distros()
     
     if not wsl_instances:
         print("No WSL2 instance found.")
         return None
     else:
         instance_name = wsl_instances[0]
-        instance_name = re.sub(r'\s+', '', instance_name)  # Remove all whitespace
         print(f"Using WSL2 instance: {instance_name}")
         return instance_name
 
@@ -25,20 +31,26 @@ def get_or_start_wsl2_instance():
 def test_wsl2_internet(instance):
     try:
         instance = instance.replace(" ", "")  # Remove spaces from the instance name
-        command = f'wsl.exe -d "{instance}" -- ping -c 4 -W 10 google.com'
-        print(f"Executing: {command}")
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
-        
-        if "bytes from" in result.stdout:
+        print(f"Probing connectivity inside WSL2 instance '{instance}'...")
+        report = probe_in_wsl(instance)
+
+        if report is None:
+            # python3 is not available in the distro, fall back to a single quick ping
+            print("Probe engine unavailable in the instance, falling back to ping.")
+            result = subprocess.run(["wsl.exe", "-d", instance, "--", "ping", "-c", "1", "-W", "3", "google.com"],
+                                    capture_output=True, text=True)
+            return "bytes from" in result.stdout
+
+        print(f"Diagnosis: {report['diagnosis']} ({report['elapsed']}s)")
+        for probe in report["probes"]:
+            status = "ok" if probe["ok"] else f"failed: {probe.get('error')}"
+            print(f"  {probe['kind']:<8} {probe['target']:<24} {status}")
+
+        if report["online"]:
             print(f"WSL2 instance '{instance}' has internet connectivity.")
-            print("Ping result:")
-            print(result.stdout)
             return True
-        else:
-            print(f"WSL2 instance '{instance}' does not have internet connectivity.")
-            print("Ping result:")
-            print(result.stdout)
-            return False
+        print(f"WSL2 instance '{instance}' does not have internet connectivity.")
+        return False
     except Exception as e:
         print(f"Error occurred while testing WSL2 internet connection for instance '{instance}'.")
         print(f"Error details: {str(e)}")
@@ -96,6 +108,48 @@ def test_and_repair_wsl2_internet():
         else:
             print(f"WSL2 internet connection for instance '{instance}' is still not working after reset.")
 
+# Function to print one line per distro of a sweep report
+def print_sweep_report(report):
+    print(f"Checked {len(report['distros'])} WSL2 instance(s) in {report['elapsed']}s")
+    for name, result in report["distros"].items():
+        browsers = ", ".join(b for b, path in result["browsers"].items() if path) or "none"
+        print(f"  {name:<24} {result['diagnosis']:<20} browsers: {browsers}")
+
+# Function to check every WSL2 instance concurrently and repair only broken ones
+def sweep_and_repair_wsl2(workers=wsl_health.DEFAULT_SWEEP_WORKERS, cache_path=DEFAULT_CACHE_PATH, repair=True):
+    report = wsl_health.sweep(workers=workers)
+    print_sweep_report(report)
+
+    broken = wsl_health.broken_distros(report)
+    report["repaired"] = []
+    if broken and repair:
+        print(f"Instances without connectivity: {', '.join(broken)}")
+        # The reset is global (wsl --shutdown), so it runs once for all broken instances
+        reset_wsl2_networking()
+        recheck = wsl_health.sweep(distros=broken, workers=workers)
+        report["distros"].update(recheck["distros"])
+        report["repaired"] = [name for name in broken if recheck["distros"][name]["online"]]
+        report["timestamp"] = recheck["timestamp"]
+        print_sweep_report(recheck)
+    elif not broken:
+        print("All WSL2 instances have internet connectivity.")
+
+    wsl_health.write_cache(report, cache_path)
+    print(f"Health report written to {cache_path}")
+    return report
+
 # Run the script
 if __name__ == "__main__":
-    test_and_repair_wsl2_internet()
+    parser = argparse.ArgumentParser(description="Check and repair WSL2 internet connectivity")
+    parser.add_argument("--sweep", action="store_true",
+                        help="Check every WSL2 instance concurrently instead of only the first one")
+    parser.add_argument("--workers", type=int, default=wsl_health.DEFAULT_SWEEP_WORKERS,
+                        help="Maximum number of instances checked at the same time")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Where to write the sweep results")
+    parser.add_argument("--no-repair", action="store_true", help="Only report, do not reset networking")
+    args = parser.parse_args()
+
+    if args.sweep:
+        sweep_and_repair_wsl2(args.workers, args.cache, repair=not args.no_repair)
+    else:
+        test_and_repair_wsl2_internet()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Browser Launcher Pro - in-distro launcher agent
+
+Runs inside a WSL distro and listens on a localhost TCP port, which WSL2
+forwards to Windows. The native messaging host sends it URLs and the agent
+hands them to the browser inside the distro directly, so opening a URL costs
+a socket write instead of a fresh `wsl.exe -d <distro> <browser> <url>`
+interop session per click.
+
+Protocol: one JSON object per line in each direction.
+  {"action": "ping"}
+  {"action": "open", "distro": "Ubuntu", "browser": "google-chrome",
+   "urls": ["https://example.com"], "token": "..."}
+
+Every request must carry the token the agent was started with: the port is
+reachable from any process on the machine, not just the native host.
+
+Usage:
+  python3 wsl-launcher-agent.py [--port PORT] [--token TOKEN]
+  (or the token in $BROWSER_LAUNCHER_AGENT_TOKEN, which keeps it off the
+  command line)
+"""
+
+import argparse
+import hmac
+import json
+import os
+import shutil
+import signal
+import socketserver
+import subprocess
+import sys
+import zlib
+
+AGENT_HOST = "127.0.0.1"
+AGENT_BASE_PORT = 47600
+MAX_REQUEST_BYTES = 1024 * 1024
+
+# Browsers the agent is allowed to start, and how each takes URLs
+CHROMIUM_BROWSERS = {
+    "google-chrome", "google-chrome-stable", "google-chrome-beta", "google-chrome-unstable",
+    "microsoft-edge", "microsoft-edge-stable", "microsoft-edge-beta", "microsoft-edge-dev",
+    "chromium", "chromium-browser", "brave-browser", "opera",
+}
+FIREFOX_BROWSERS = {"firefox", "firefox-esr"}
+URL_SCHEMES = ("http://", "https://", "file://", "about:")
+
+
+def get_agent_port(distro):
+    """Returns the port for a distro. Keep in sync with native_messaging.get_wsl_agent_port."""
+    return AGENT_BASE_PORT + zlib.crc32(distro.lower().encode("utf-8")) % 1000
+
+
+def build_browser_argv(browser, urls):
+    """Builds the argv that hands the URLs to (a possibly running) browser."""
+    name = os.path.basename(browser)
+    if name in FIREFOX_BROWSERS:
+        argv = [name]
+        for url in urls:
+            argv += ["-new-tab", url]
+        return argv
+    if name in CHROMIUM_BROWSERS:
+        return [name, "--no-sandbox"] + list(urls)
+    raise ValueError(f"Browser not allowed: {browser}")
+
+
+def open_urls(browser, urls):
+    """Starts the browser launcher for the URLs without waiting for it."""
+    for url in urls:
+        if not url.lower().startswith(URL_SCHEMES):
+            raise ValueError(f"Unsupported URL: {url}")
+    argv = build_browser_argv(browser, urls)
+    if shutil.which(argv[0]) is None:
+        raise ValueError(f"Browser not installed: {argv[0]}")
+    process = subprocess.Popen(
+        argv,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    return process.pid
+
+
+class AgentHandler(socketserver.StreamRequestHandler):
+    """Handles one request line and writes one reply line."""
+
+    def handle(self):
+        line = self.rfile.readline(MAX_REQUEST_BYTES)
+        try:
+            request = json.loads(line.decode("utf-8"))
+            reply = self.server.dispatch(request)
+        except Exception as e:
+            reply = {"ok": False, "error": str(e)}
+        self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+
+
+class AgentServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, distro, token):
+        if not token:
+            raise ValueError("A token is required")
+        super().__init__(address, AgentHandler)
+        self.distro = distro
+        self.token = token
+
+    def dispatch(self, request):
+        if not isinstance(request, dict):
+            raise ValueError("Request must be a JSON object")
+        token = request.get("token")
+        if not isinstance(token, str) or \
+                not hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8")):
+            return {"ok": False, "error": "Invalid token"}
+        action = request.get("action")
+        if action == "ping":
+            return {"ok": True, "distro": self.distro, "pid": os.getpid()}
+        if action == "open":
+            distro = request.get("distro")
+            if distro and distro.lower() != self.distro.lower():
+                return {"ok": False, "error": f"Agent serves {self.distro}, not {distro}"}
+            urls = request.get("urls")
+            if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+                raise ValueError("'urls' must be a list of strings")
+            pid = open_urls(str(request.get("browser", "")), urls)
+            return {"ok": True, "pid": pid, "count": len(urls)}
+        raise ValueError(f"Unknown action: {action}")
+
+
+def main():
+    distro = os.environ.get("WSL_DISTRO_NAME", "")
+    parser = argparse.ArgumentParser(description="Browser Launcher Pro in-distro launcher agent")
+    parser.add_argument("--port", type=int, default=None,
+                        help="Port to listen on (defaults to one derived from the distro name)")
+    parser.add_argument("--distro", default=distro,
+                        help="Distro name reported by the agent (defaults to $WSL_DISTRO_NAME)")
+    parser.add_argument("--token", default=os.environ.get("BROWSER_LAUNCHER_AGENT_TOKEN", ""),
+                        help="Shared token the host must send")
+    args = parser.parse_args()
+
+    if not args.distro:
+        print("Error: not running inside WSL and no --distro given")
+        sys.exit(1)
+    if not args.token:
+        print("Error: no --token or $BROWSER_LAUNCHER_AGENT_TOKEN given")
+        sys.exit(1)
+    port = args.port if args.port is not None else get_agent_port(args.distro)
+
+    # Let finished browser launchers be reaped automatically
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    try:
+        server = AgentServer((AGENT_HOST, port), args.distro, args.token)
+    except OSError as e:
+        # Most likely another agent for this distro is already listening
+        print(f"Could not listen on {AGENT_HOST}:{port}: {e}")
+        sys.exit(1)
+    print(f"Launcher agent for {args.distro} listening on {AGENT_HOST}:{port}")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Fleet-wide WSL2 health sweep for Browser Launcher Pro.
+
+Checks connectivity (with connectivity_probe) and browser readiness on every
+WSL2 distro concurrently with a bounded number of workers, and writes the
+results to a timestamped JSON cache that the native host can return to the
+extension without running anything.
+"""
+
+import json
+import os
+import re
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from connectivity_probe import probe_in_wsl, DEFAULT_TIMEOUT
+
+WSL_HEALTH_CACHE_FILENAME = "WSLHealthCache.json"
+DEFAULT_SWEEP_WORKERS = 4
+BROWSER_COMMANDS = ["google-chrome", "microsoft-edge", "firefox"]
+
+# "* Ubuntu-22.04    Running    2" (the leading * marks the default distro)
+WSL_LIST_LINE = re.compile(r'^\s*(\*)?\s*(\S+)\s+(\w+)\s+(\d+)\s*$')
+
+
+def decode_wsl_output(raw):
+    """Decodes wsl.exe output, which is UTF-16-LE for its own messages."""
+    if b"\x00" in raw:
+        return raw.decode("utf-16-le", errors="replace").lstrip("\ufeff")
+    return raw.decode("utf-8", errors="replace")
+
+
+def parse_wsl_list_verbose(text):
+    """Parses `wsl -l -v` output into a list of {name, state, version, default} dicts."""
+    distros = []
+    for line in text.splitlines()[1:]:
+        match = WSL_LIST_LINE.match(line.replace("\x00", ""))
+        if match:
+            distros.append({
+                "name": match.group(2),
+                "state": match.group(3),
+                "version": int(match.group(4)),
+                "default": bool(match.group(1)),
+            })
+    return distros
+
+
+def run_wsl(args, wsl_executable="wsl", timeout=60, run=subprocess.run):
+    """Runs wsl.exe with arguments and returns (returncode, decoded stdout)."""
+    result = run(
+        [wsl_executable] + list(args),
+        capture_output=True,
+        timeout=timeout,
+        creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+    )
+    return result.returncode, decode_wsl_output(result.stdout)
+
+
+def list_wsl2_distros(wsl_executable="wsl", run=subprocess.run):
+    """Returns the names of all WSL2 distros, excluding Docker Desktop's internal ones."""
+    returncode, output = run_wsl(["-l", "-v"], wsl_executable, run=run)
+    if returncode != 0:
+        return []
+    return [d["name"] for d in parse_wsl_list_verbose(output)
+            if d["version"] == 2 and not d["name"].lower().startswith("docker-desktop")]
+
+
+def check_browsers(distro, wsl_executable="wsl", timeout=60, run=subprocess.run):
+    """Returns {browser: path or None} for the browsers the extension can launch in a distro."""
+    script = "; ".join(f'printf "%s=%s\\n" {b} "$(command -v {b})"' for b in BROWSER_COMMANDS)
+    returncode, output = run_wsl(["-d", distro, "--", "sh", "-c", script], wsl_executable, timeout, run)
+    browsers = {browser: None for browser in BROWSER_COMMANDS}
+    for line in output.splitlines():
+        name, _, path = line.partition("=")
+        if name in browsers and path.strip():
+            browsers[name] = path.strip()
+    return browsers
+
+
+def check_distro(distro, timeout=DEFAULT_TIMEOUT, wsl_executable="wsl", run=subprocess.run):
+    """Checks connectivity and browser readiness of one distro; run is used like subprocess.run."""
+    start = time.monotonic()
+    result = {"name": distro}
+    try:
+        report = probe_in_wsl(distro, timeout=timeout, wsl_executable=wsl_executable, run=run)
+        result["browsers"] = check_browsers(distro, wsl_executable, run=run)
+    except Exception as e:
+        report = None
+        result["error"] = str(e)
+        result.setdefault("browsers", {})
+    result["connectivity"] = report
+    if report is not None:
+        result["online"] = bool(report.get("online"))
+        result["diagnosis"] = report["diagnosis"]
+    else:
+        # python3 missing in the distro: fall back to a single quick ping
+        try:
+            _, output = run_wsl(["-d", distro, "--", "ping", "-c", "1", "-W", str(int(timeout)), "google.com"],
+                                wsl_executable, run=run)
+            result["online"] = "bytes from" in output
+        except Exception as e:
+            result["online"] = False
+            result.setdefault("error", str(e))
+        result["diagnosis"] = "online" if result["online"] else "ping_failed"
+    result["browsersReady"] = any(result["browsers"].values())
+    result["elapsed"] = round(time.monotonic() - start, 3)
+    return result
+
+
+def sweep(distros=None, workers=DEFAULT_SWEEP_WORKERS, timeout=DEFAULT_TIMEOUT, wsl_executable="wsl",
+          hold=lambda distro: nullcontext(), run=subprocess.run):
+    """
+    Checks every WSL2 distro concurrently.
+
+    hold(distro) returns a context manager held while that distro is checked
+    (the native host uses it to keep out a reinstall of the same distro).
+    run replaces subprocess.run for the wsl.exe calls (the host passes
+    spawn_stats.run, which kills the whole tree on a timeout).
+
+    Returns:
+        {"timestamp", "elapsed", "distros": {name: check_distro result}}
+    """
+    start = time.monotonic()
+    if distros is None:
+        distros = list_wsl2_distros(wsl_executable, run)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        def check(distro):
+            with hold(distro):
+                return check_distro(distro, timeout, wsl_executable, run)
+        results = list(executor.map(check, distros))
+    return {
+        "timestamp": time.time(),
+        "elapsed": round(time.monotonic() - start, 3),
+        "distros": {result["name"]: result for result in results},
+    }
+
+
+def broken_distros(report):
+    """Returns the names of distros in a sweep report whose connectivity check failed."""
+    return [name for name, result in report["distros"].items() if not result["online"]]
+
+
+def write_cache(report, path=WSL_HEALTH_CACHE_FILENAME):
+    """Atomically writes a sweep report to the cache file."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f)
+    os.replace(temp_path, path)
+
+
+def read_cache(path=WSL_HEALTH_CACHE_FILENAME):
+    """Returns the cached sweep report with its age in seconds, or None."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return None
+    report["ageSeconds"] = round(time.time() - report.get("timestamp", 0), 1)
+    return report